@@ -0,0 +1,60 @@
+import asyncio
+import random
+import sys
+import time
+
+print("🔍 Billy Replica Balancer Benchmark")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent.balancer import ReplicaBalancer
+
+# Simulated service time of each replica; one of them is slow
+LATENCIES_MS = {"http://fast-1/mcp": 5, "http://fast-2/mcp": 5, "http://slow/mcp": 40}
+REQUESTS = 2000
+CONCURRENCY = 50
+CHOICES = 200_000
+
+
+async def _run(strategy):
+    """Send REQUESTS simulated calls through the balancer, CONCURRENCY at a time"""
+    balancer = ReplicaBalancer(list(LATENCIES_MS), strategy=strategy)
+    served = {url: 0 for url in LATENCIES_MS}
+    queue = iter(range(REQUESTS))
+
+    async def worker():
+        for _ in queue:
+            replica = balancer.choose()
+            started = balancer.started(replica)
+            await asyncio.sleep(LATENCIES_MS[replica.mcp_url] / 1000)
+            balancer.finished(replica, started, ok=True)
+            served[replica.mcp_url] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    return time.perf_counter() - started, served
+
+
+def main():
+    random.seed(0)
+    for strategy in ("p2c", "least"):
+        elapsed, served = asyncio.run(_run(strategy))
+        spread = ", ".join(f"{url.split('/')[2]} {count}" for url, count in served.items())
+        print(f"   ⏱️  {strategy}: {REQUESTS:,} requests in {elapsed * 1000:.0f} ms "
+              f"({REQUESTS / elapsed:,.0f} req/s; {spread})")
+
+    # Cost of a choice itself, with affinity keys beyond the remembered limit
+    balancer = ReplicaBalancer(list(LATENCIES_MS), max_affinity_keys=10_000)
+    started = time.perf_counter()
+    for i in range(CHOICES):
+        balancer.choose(f"session-{i % 50_000}")
+    elapsed = time.perf_counter() - started
+    print(f"   ⏱️  choose: {CHOICES / elapsed:,.0f} choices/s, {len(balancer._affinity):,} affinity keys kept")
+    assert len(balancer._affinity) == 10_000
+    print("✅ Balancer benchmark finished")
+
+
+if __name__ == "__main__":
+    main()
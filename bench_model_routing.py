@@ -0,0 +1,106 @@
+import asyncio
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+from google.genai import types
+
+print("🔍 Billy Model Routing Benchmark")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from google.adk.agents import LlmAgent
+from google.adk.models.lite_llm import LiteLlm
+from google.adk.runners import InMemoryRunner
+
+from billy_agent.models import RoutedLlm
+
+load_dotenv()
+
+SMALL = os.getenv("BENCH_TOOL_MODEL", "openai/gpt-4o-mini")
+LARGE = os.getenv("BENCH_ANSWER_MODEL", "openai/gpt-4o")
+
+CONFIGS = {
+    f"{SMALL} only": (SMALL, SMALL),
+    f"{LARGE} only": (LARGE, LARGE),
+    "routed": (SMALL, LARGE),
+}
+
+# Scripted conversations: lookups, and questions that need analysis
+CONVERSATIONS = [
+    ["List my invoices", "Which of them are still drafts?"],
+    ["Show invoice abc123", "Who is the customer?"],
+    ["How did invoicing in Q1 2024 compare to Q2 2024?", "What explains the difference?"],
+    ["Compare the totals of 2023 and 2024 and describe the trend"],
+]
+
+TOTALS = {"2023": 141000, "2024": 157500}
+
+
+async def list_invoices() -> str:
+    """List all invoices from Billy.dk"""
+    return ("Found 4 invoices:\n• Invoice abc123: 1000 DKK - paid\n• Invoice def456: 2500 DKK - draft\n"
+            "• Invoice ghi789: 750 DKK - sent\n• Invoice jkl012: 4200 DKK - draft")
+
+
+async def get_invoice(invoice_id: str) -> str:
+    """Get a specific invoice by ID"""
+    return f"Invoice #{invoice_id}: 1000 DKK - Status: paid\nContact: customer-456\nEntry Date: 2024-01-15"
+
+
+async def list_customers() -> str:
+    """List all customers from Billy.dk"""
+    return "Found 2 customers:\n• John Doe (customer-456)\n• Jane Smith (customer-789)"
+
+
+async def total_invoice_amount(start_date: str, end_date: str) -> str:
+    """Get total invoice amount for a date range (YYYY-MM-DD format)"""
+    months = int(end_date[5:7]) - int(start_date[5:7]) + 1
+    amount = TOTALS.get(start_date[:4], 150000) * months // 12 + int(start_date[5:7]) * 900
+    return f"Total invoice amount from {start_date} to {end_date}: {amount} DKK ({months * 4} invoices)"
+
+
+def _agent(tool_model, answer_model):
+    api_key = os.getenv("OPENAI_API_KEY")
+    model = RoutedLlm(model=tool_model, tool_model=LiteLlm(model=tool_model, api_key=api_key),
+                      answer_model=LiteLlm(model=answer_model, api_key=api_key))
+    return LlmAgent(model=model, name="billy_bench", tools=[list_invoices, get_invoice, list_customers,
+                                                            total_invoice_amount],
+                    instruction="You are Billy, an assistant for Billy.dk invoices and customers. "
+                                "Use the tools. For dates, use YYYY-MM-DD format.")
+
+
+async def _run_conversation(runner, turns):
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id="bench")
+    for text in turns:
+        message = types.Content(role="user", parts=[types.Part(text=text)])
+        async for _ in runner.run_async(user_id="bench", session_id=session.id, new_message=message):
+            pass
+
+
+async def bench():
+    print(f"   Per conversation, averaged over {len(CONVERSATIONS)} conversations:")
+    print(f"   {'config':32}{'seconds':>9}{'calls':>7}{'tokens':>9}{'cost $':>11}")
+    for label, (tool_model, answer_model) in CONFIGS.items():
+        agent = _agent(tool_model, answer_model)
+        runner = InMemoryRunner(agent=agent, app_name="billy_bench")
+        started = time.perf_counter()
+        for turns in CONVERSATIONS:
+            await _run_conversation(runner, turns)
+        elapsed = time.perf_counter() - started
+        routes = agent.model.stats().values()
+        calls = sum(stats["calls"] for stats in routes)
+        tokens = sum(stats["prompt_tokens"] + stats["completion_tokens"] for stats in routes)
+        cost = sum(stats["cost"] for stats in routes)
+        n = len(CONVERSATIONS)
+        print(f"   {label:32}{elapsed / n:>9.2f}{calls / n:>7.1f}{tokens / n:>9.0f}{cost / n:>11.5f}")
+
+
+if __name__ == "__main__":
+    if not os.getenv("OPENAI_API_KEY"):
+        print("   ⚠️  OPENAI_API_KEY not set, skipping the model routing benchmark")
+    else:
+        asyncio.run(bench())
@@ -0,0 +1,72 @@
+import sys
+import time
+
+print("🔍 Billy Tool Text Parsing Benchmark")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent.parsing import Customer, Invoice, Product, parse_tool_text
+
+LINES = 100_000
+RUNS = 5
+STATES = ("paid", "approved", "draft", "overdue")
+
+
+def _invoice_text(count):
+    lines = [f"Found {count} invoices:"]
+    for i in range(count):
+        lines.append(f"• Invoice inv{i:06d}: {1000 + i % 5000},{i % 100:02d} DKK - {STATES[i % 4]} "
+                     f"(contact: c{i % 997}, 2024-{1 + i % 12:02d}-{1 + i % 28:02d})")
+    return "\n".join(lines)
+
+
+def _customer_text(count):
+    lines = [f"Found {count} customers:"]
+    for i in range(count):
+        lines.append(f"• Customer {i} ApS (ID: c{i}) - info{i}@example.dk")
+    return "\n".join(lines)
+
+
+def _product_text(count):
+    lines = [f"Found {count} products:"]
+    for i in range(count):
+        lines.append(f"• Product {i}: {10 + i % 990}.50 DKK (ID: p{i})")
+    return "\n".join(lines)
+
+
+def _bench(tool_name, text):
+    """Return the best parse time of RUNS runs and the last result"""
+    best = float("inf")
+    result = None
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        result = parse_tool_text(tool_name, text)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    cases = [
+        ("listInvoices", _invoice_text(LINES), Invoice),
+        ("listCustomers", _customer_text(LINES), Customer),
+        ("listProducts", _product_text(LINES), Product),
+    ]
+    for tool_name, text, record_type in cases:
+        elapsed, result = _bench(tool_name, text)
+        assert result is not None and len(result.records) == LINES == result.declared_count
+        assert isinstance(result.records[0], record_type) and not result.unparsed
+        print(f"   ⏱️  {tool_name}: {LINES:,} lines in {elapsed * 1000:.0f} ms "
+              f"({LINES / elapsed:,.0f} lines/s, {len(text) / elapsed / 1e6:.1f} MB/s)")
+
+    # Unknown formats fall back to None instead of raising
+    assert parse_tool_text("listInvoices", "❌ Error: Billy API unavailable") is None
+    assert parse_tool_text("someOtherTool", _invoice_text(3)) is None
+    mixed = parse_tool_text("listInvoices", _invoice_text(2) + "\n• something unexpected")
+    assert len(mixed.records) == 2 and mixed.unparsed == ("• something unexpected",)
+    print("✅ Unrecognized text falls back gracefully")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import os
+import sys
+
+from dotenv import load_dotenv
+
+print("🔍 Billy Tool Result Format Benchmark")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent.budget import count_tokens
+from billy_agent.parsing import parse_tool_text
+from billy_agent.tables import CSV, TEXT, TSV, render_table
+
+load_dotenv()
+
+ROWS = 100
+STATES = ("paid", "approved", "draft", "overdue")
+MODEL = os.getenv("BENCH_MODEL", "openai/gpt-4o-mini")
+
+
+def _invoice_text(detailed):
+    lines = [f"Found {ROWS} invoices:"]
+    for i in range(ROWS):
+        extra = f" (contact: c{i % 13}, 2024-{1 + i % 12:02d}-{1 + i % 28:02d})" if detailed else ""
+        lines.append(f"• Invoice inv{i:04d}: {1000 + i * 37} DKK - {STATES[i % 4]}{extra}")
+    return "\n".join(lines)
+
+
+def _customer_text():
+    lines = [f"Found {ROWS} customers:"]
+    lines += [f"• Customer {i} ApS (customer-{i:04d}) - info{i}@example.dk" for i in range(ROWS)]
+    return "\n".join(lines)
+
+
+def _product_text():
+    lines = [f"Found {ROWS} products:"]
+    lines += [f"• Product {i}: {10 + i * 3}.50 DKK (ID: p{i:04d})" for i in range(ROWS)]
+    return "\n".join(lines)
+
+
+CASES = [
+    ("invoices", "listInvoices", _invoice_text(False)),
+    ("invoices+contact+date", "listInvoices", _invoice_text(True)),
+    ("customers", "listCustomers", _customer_text()),
+    ("products", "listProducts", _product_text()),
+]
+
+# Questions about the detailed invoice list, with their exact answers
+QUESTIONS = [
+    ("What is the amount of invoice inv0042? Answer with the number only.", str(1000 + 42 * 37)),
+    ("How many invoices have the state overdue? Answer with the number only.", str(ROWS // 4)),
+    ("Which invoice has the largest amount? Answer with the invoice id only.", f"inv{ROWS - 1:04d}"),
+    ("What is the contact of invoice inv0020? Answer with the contact id only.", f"c{20 % 13}"),
+    ("How many invoices belong to contact c3? Answer with the number only.",
+     str(sum(1 for i in range(ROWS) if i % 13 == 3))),
+]
+
+
+def _render(tool_name, text, fmt):
+    if fmt == TEXT:
+        return text
+    return render_table(parse_tool_text(tool_name, text), fmt)
+
+
+def bench_tokens():
+    print(f"   Tokens for {ROWS} rows:")
+    print(f"   {'result':24}{'text':>8}{'tsv':>8}{'csv':>8}   saving (tsv)")
+    for label, tool_name, text in CASES:
+        tokens = {fmt: count_tokens(_render(tool_name, text, fmt)) for fmt in (TEXT, TSV, CSV)}
+        saving = 1 - tokens[TSV] / tokens[TEXT]
+        print(f"   {label:24}{tokens[TEXT]:>8}{tokens[TSV]:>8}{tokens[CSV]:>8}   {saving:.0%}")
+
+
+def bench_accuracy():
+    if not os.getenv("OPENAI_API_KEY"):
+        print("   ⚠️  OPENAI_API_KEY not set, skipping the answer accuracy benchmark")
+        return
+    import litellm
+
+    text = CASES[1][2]
+    print(f"   Answer accuracy with {MODEL}:")
+    for fmt in (TEXT, TSV, CSV):
+        rendered = _render("listInvoices", text, fmt)
+        correct = 0
+        for question, answer in QUESTIONS:
+            response = litellm.completion(model=MODEL, temperature=0, messages=[
+                {"role": "system", "content": "Answer questions about the Billy.dk tool result. Be exact."},
+                {"role": "user", "content": f"Tool result:\n{rendered}\n\n{question}"},
+            ])
+            reply = response.choices[0].message.content.strip().rstrip(".")
+            correct += reply.replace(",", "").replace(" DKK", "") == answer
+        print(f"   {fmt:6} {correct}/{len(QUESTIONS)} correct")
+
+
+if __name__ == "__main__":
+    bench_tokens()
+    bench_accuracy()
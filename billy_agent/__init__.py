@@ -1,3 +1,3 @@
-from .agent import create_billy_agent, root_agent
+from .agent import create_billy_agent, create_billy_agent_async, root_agent
 
-__all__ = ['create_billy_agent', 'root_agent'] 
\ No newline at end of file
+__all__ = ['create_billy_agent', 'create_billy_agent_async', 'root_agent']
\ No newline at end of file
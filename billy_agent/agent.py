@@ -1,213 +1,371 @@
 import os
 import json
 import asyncio
-import aiohttp
-from typing import Any, Dict, List
+import contextlib
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
 from google.adk.agents import LlmAgent
 from google.adk.models.lite_llm import LiteLlm
 from google.adk.tools.function_tool import FunctionTool
+from google.adk.tools.tool_context import ToolContext
+
+from .budget import get_result_budgeter
+from .console import run_console
+from .context import get_context_tracker
+from .degraded import get_last_known_good, stale_note
+from .delta import get_delta_renderer
+from .federation import get_mcp_federation
+from .health import DEGRADED, DOWN, get_health_prober
+from .history import get_history_compactor
+from .llm_cache import get_llm_cache
+from .mcp_tool import McpFunctionTool
+from .models import create_billy_model
+from .outbox import IDEMPOTENCY_META, get_write_outbox, get_write_status
+from .query import get_billy_replica, local_query_tools
+from .result_store import read_result_page
+from .parsing import parse_tool_text
+from .prefetch import get_prefetcher
+from .prompt import get_prompt_cache_stats, stable_prefix_callback
+from .results import render_tool_result, result_text
+from .router import IntentRouter
+from .speculation import get_speculative_dispatcher
+from .tables import TEXT, render_table, result_format_for
+from .tool_kinds import is_read_only_tool, is_write_tool
+from .warmer import get_cache_warmer
+from .mcp_client import BillyDkMcpClient
 
 # Load environment variables
 load_dotenv()
 
-class BillyDkMcpClient:
+# Pin each ADK session to one MCP replica (for replicas that keep per-client state)
+STICKY_SESSIONS = os.getenv("MCP_STICKY_SESSIONS", "false").lower() in ("1", "true", "yes")
+
+# Model of the Billy agent; LiteLLM requires the provider prefix
+DEFAULT_MODEL = "openai/gpt-4o-mini"
+
+# Send repeated list results of a session as a diff against the previous one
+DELTA_RESULTS = os.getenv("BILLY_DELTA_RESULTS", "true").lower() in ("1", "true", "yes")
+
+# Answer unambiguous read commands ("list invoices") without calling the model
+INTENT_ROUTER = os.getenv("BILLY_INTENT_ROUTER", "true").lower() in ("1", "true", "yes")
+
+# Compact the history of long sessions into a memory and stubbed tool results
+HISTORY_COMPACTION = os.getenv("BILLY_HISTORY_COMPACTION", "true").lower() in ("1", "true", "yes")
+
+# Track the conversation's topic and recent IDs instead of long instruction rules
+CONTEXT_TRACKING = os.getenv("BILLY_CONTEXT_TRACKING", "true").lower() in ("1", "true", "yes")
+
+# Start read-only tool calls as soon as their streamed arguments are complete
+SPECULATIVE_TOOLS = os.getenv("BILLY_SPECULATIVE_TOOLS", "true").lower() in ("1", "true", "yes")
+
+# Call the read-only tools likely to come next in the background, so they are ready when asked for
+PREFETCH = os.getenv("BILLY_PREFETCH", "true").lower() in ("1", "true", "yes")
+
+# Keep the hot list tools (invoices, customers, products) warm and answer them from the cache
+CACHE_WARMER = os.getenv("BILLY_CACHE_WARMER", "true").lower() in ("1", "true", "yes")
+
+# Serve reads from their last known good result while the MCP server or Billy.dk is slow or down
+DEGRADED_MODE = os.getenv("BILLY_DEGRADED_MODE", "true").lower() in ("1", "true", "yes")
+
+# Send write tools through a durable outbox with idempotency keys, reconciling lost responses
+WRITE_OUTBOX = os.getenv("BILLY_WRITE_OUTBOX", "true").lower() in ("1", "true", "yes")
+
+def _affinity_key(tool_context: ToolContext = None):
+    """Return the replica affinity key for a tool call, if sessions are sticky"""
+    if STICKY_SESSIONS and tool_context is not None:
+        return tool_context._invocation_context.session.id
+    return None
+
+def _invocation_id(tool_context: ToolContext = None):
+    """Return the ADK invocation (turn) a tool call belongs to, for the per-turn token budget"""
+    return tool_context.invocation_id if tool_context is not None else None
+
+def _session_id(tool_context: ToolContext = None):
+    """Return the ADK session a tool call belongs to, for per-session result storage and diffs"""
+    return tool_context._invocation_context.session.id if tool_context is not None else None
+
+def _model_name(tool_context: ToolContext = None):
+    """Return the name of the model the calling agent uses"""
+    if tool_context is None:
+        return None
+    model = tool_context._invocation_context.agent.model
+    return model if isinstance(model, str) else getattr(model, "model", None)
+
+def _track_result(tool_name: str, arguments: Optional[Dict[str, Any]], result: Any, tool_context=None):
     """
-    Custom Billy.dk MCP client using standard HTTP/JSON-RPC protocol.
-    This follows the official MCP specification, not the custom SSE protocol.
+    Record the records a tool result names, for context tracking and history
+    compaction, from its MCP text before it is rendered as a table or diff.
     """
-    
-    def __init__(self, mcp_url: str = "http://localhost:3000/mcp"):
-        self.mcp_url = mcp_url
-        self._request_id = 1
-    
-    async def _make_request(self, method: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Make a JSON-RPC request to the MCP server"""
-        request_data = {
-            "jsonrpc": "2.0",
-            "id": self._request_id,
-            "method": method,
-            "params": params or {}
-        }
-        self._request_id += 1
-        
-        # Use a fresh session for each request to avoid event loop issues
-        async with aiohttp.ClientSession() as session:
+    if tool_context is None:
+        return
+    text = result_text(result)
+    if CONTEXT_TRACKING:
+        get_context_tracker().observe(tool_context.state, tool_name, arguments, text)
+    if HISTORY_COMPACTION:
+        get_history_compactor().observe(getattr(tool_context, "function_call_id", None), tool_name, text)
+
+def _fit_result(tool_name: str, result: Any, tool_context: ToolContext = None,
+                arguments: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Render a tool result for the model: as a diff when it repeats an earlier list
+    result of the session, as a table when the model's result format asks for one,
+    and fitted into the tool's and the turn's token budget. Last known good
+    results served while Billy.dk is unavailable start with a warning and their age.
+    """
+    note = stale_note(result)
+    if note is not None:
+        live = {key: value for key, value in result.items() if key != "_meta"}
+        return f"{note}\n{_fit_result(tool_name, live, tool_context, arguments)}"
+    _track_result(tool_name, arguments, result, tool_context)
+    text = render_tool_result(result)
+    parsed = parse_tool_text(tool_name, text)
+    session_id = _session_id(tool_context)
+    rendered = diff = get_delta_renderer().render(tool_name, text, session_id, parsed) if DELTA_RESULTS else text
+    table = None
+    if diff == text:
+        fmt = result_format_for(_model_name(tool_context) or DEFAULT_MODEL)
+        if parsed is not None and fmt != TEXT:
+            table = render_table(parsed, fmt)
+        rendered = table or text
+    fitted = get_result_budgeter().fit(tool_name, rendered, _invocation_id(tool_context), session_id,
+                                       parsed if table else None)
+    if DELTA_RESULTS and fitted != rendered:
+        # The model did not see every row; a later diff against this result would count rows
+        # it never saw as unchanged, so the next result of the tool is sent in full again
+        get_delta_renderer().forget(session_id, tool_name)
+    return fitted
+
+def _observe_result(tool_name: str, result: Any):
+    """Update local state from a tool result: the list replica, the write outbox and the LLM response cache"""
+    get_billy_replica().observe(tool_name, result)
+    if WRITE_OUTBOX:
+        # List results are the snapshots lost creates are reconciled against
+        get_write_outbox().observe(tool_name, result)
+    llm_cache = get_llm_cache()
+    if llm_cache is not None and not is_read_only_tool(tool_name):
+        # Cached answers may describe data this call just changed
+        llm_cache.invalidate()
+
+async def _call_routed_tool(tool_name: str, arguments: Dict[str, Any], callback_context=None):
+    """Call a tool for the intent router, outside the model's tool loop"""
+    result = await _call_tool(tool_name, arguments, callback_context)
+    _observe_result(tool_name, result)
+    _track_result(tool_name, arguments, result, callback_context)
+    return result
+
+async def _call_speculative_tool(tool_name: str, arguments: Dict[str, Any], session_id: str = None):
+    """Call a tool ahead of the model, for the speculative dispatcher and the prefetcher"""
+    affinity_key = session_id if STICKY_SESSIONS else None
+    return await get_mcp_federation().call_tool(tool_name, arguments, affinity_key=affinity_key)
+
+async def _call_warm_tool(tool_name: str):
+    """Refresh a hot list tool for the cache warmer"""
+    result = await get_mcp_federation().call_tool(tool_name)
+    _observe_result(tool_name, result)
+    if DEGRADED_MODE:
+        get_last_known_good().store(tool_name, None, result)
+    return result
+
+async def _call_outbox_tool(tool_name: str, arguments: Dict[str, Any], key: str):
+    """Send a write, or read the list that reconciles it, for the write outbox"""
+    meta = {IDEMPOTENCY_META: key} if is_write_tool(tool_name) else None
+    return await get_mcp_federation().call_tool(tool_name, arguments, meta=meta)
+
+def _write_completed(tool_name: str, arguments: Dict[str, Any], result: Any):
+    """Update local state for a write the outbox finished after its tool call returned"""
+    _observe_result(tool_name, result)
+    if CACHE_WARMER:
+        get_cache_warmer().invalidate()
+    if PREFETCH:
+        get_prefetcher().invalidate()
+
+async def _fetch_tool(tool_name: str, arguments: Dict[str, Any] = None, tool_context: ToolContext = None):
+    """
+    Call an MCP tool on its server. Writes go through the outbox; reads fall
+    back to their last known good result when the server is down, degraded
+    or too slow.
+    """
+    federation = get_mcp_federation()
+    if WRITE_OUTBOX and get_write_outbox().handles(tool_name):
+        # While the server is down the write is only queued; the caller hears so at once
+        return await get_write_outbox().call(tool_name, arguments, _session_id(tool_context) or "",
+                                             getattr(tool_context, "function_call_id", None),
+                                             wait=federation.server_state(tool_name) != DOWN)
+    fetch = lambda: federation.call_tool(tool_name, arguments, affinity_key=_affinity_key(tool_context))
+    if not DEGRADED_MODE:
+        return await fetch()
+    degraded = federation.server_state(tool_name) in (DOWN, DEGRADED)
+    return await get_last_known_good().call(tool_name, arguments, fetch, degraded)
+
+async def _call_tool(tool_name: str, arguments: Dict[str, Any] = None, tool_context: ToolContext = None):
+    """
+    Call an MCP tool. A call already started from the model's streamed
+    arguments, or prefetched after the previous tool, is taken over instead,
+    and hot lists are answered from the cache warmer.
+    """
+    result = None
+    if SPECULATIVE_TOOLS and tool_context is not None:
+        speculative = get_speculative_dispatcher().claim(tool_context.invocation_id, tool_name, arguments)
+        if speculative is not None:
             try:
-                async with session.post(
-                    self.mcp_url,
-                    headers={"Content-Type": "application/json"},
-                    json=request_data,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    response.raise_for_status()
-                    result = await response.json()
-                    
-                    if "error" in result:
-                        raise Exception(f"MCP Error: {result['error']}")
-                    
-                    return result.get("result", {})
-            
+                result = await speculative
             except Exception as e:
-                print(f"❌ Billy.dk MCP request failed: {e}")
-                raise
-    
-    async def initialize(self):
-        """Initialize the MCP session"""
-        try:
-            result = await self._make_request("initialize", {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {},
-                "clientInfo": {
-                    "name": "adk-billy-client",
-                    "version": "1.0.0"
-                }
-            })
-            print("✅ Billy.dk MCP session initialized")
-            return result
-        except Exception as e:
-            print(f"⚠️  Billy.dk MCP initialization failed: {e}")
-            raise
-    
-    async def list_tools(self):
-        """List available tools"""
-        return await self._make_request("tools/list")
-    
-    async def call_tool(self, name: str, arguments: Dict[str, Any] = None):
-        """Call a specific tool"""
-        return await self._make_request("tools/call", {
-            "name": name,
-            "arguments": arguments or {}
-        })
-    
-    async def close(self):
-        """Close the session - no longer needed with fresh sessions"""
-        pass
+                print(f"⚠️  Speculative {tool_name} call failed ({e}), calling it again")
+    prefetcher = get_prefetcher() if PREFETCH else None
+    if result is None and prefetcher is not None:
+        result = await prefetcher.take(tool_name, arguments)
+    if result is not None and DEGRADED_MODE:
+        get_last_known_good().store(tool_name, arguments, result)
+    warmer = get_cache_warmer() if CACHE_WARMER else None
+    if result is None and warmer is not None and not arguments:
+        result = warmer.get(tool_name)
+    if result is None:
+        with warmer.interactive() if warmer is not None else contextlib.nullcontext():
+            result = await _fetch_tool(tool_name, arguments, tool_context)
+        if warmer is not None and not is_read_only_tool(tool_name):
+            warmer.invalidate()
+        elif warmer is not None and not arguments and stale_note(result) is None:
+            warmer.store(tool_name, result)
+    if prefetcher is not None:
+        prefetcher.after_call(_session_id(tool_context), tool_name, arguments, result)
+    return result
 
-# Global MCP client instance
-_billy_mcp_client = None
+def _install_callbacks(agent: LlmAgent, discovery: asyncio.Task = None):
+    """
+    Attach background services, the intent router, context tracking, history
+    compaction, the stable prompt layout, speculative tool dispatch and
+    prefetching, the write outbox, the LLM response cache and prompt cache
+    reporting to the agent's model and tool calls.
+    """
+    before_model = [_background_services_callback(agent, discovery)]
+    after_model = [get_prompt_cache_stats().after_model]
+    if INTENT_ROUTER:
+        before_model.append(IntentRouter(_call_routed_tool,
+                                         int(os.getenv("BILLY_ROUTER_MAX_ROWS", "50"))).before_model)
+    if CONTEXT_TRACKING:
+        tracker = get_context_tracker()
+        before_model.append(tracker.before_model)
+        after_model.append(tracker.after_model)
+    if HISTORY_COMPACTION:
+        before_model.append(get_history_compactor().before_model)
+    before_model.append(stable_prefix_callback)
+    if SPECULATIVE_TOOLS:
+        dispatcher = get_speculative_dispatcher()
+        dispatcher.call_tool = _call_speculative_tool
+        before_model.append(dispatcher.before_model)
+    if PREFETCH:
+        get_prefetcher().call_tool = _call_speculative_tool
+    if CACHE_WARMER:
+        get_cache_warmer().call_tool = _call_warm_tool
+    if WRITE_OUTBOX:
+        outbox = get_write_outbox()
+        outbox.call_tool = _call_outbox_tool
+        outbox.on_complete = _write_completed
+    llm_cache = get_llm_cache()
+    if llm_cache is not None:
+        before_model.append(llm_cache.before_model)
+        after_model.append(llm_cache.after_model)
+    agent.before_model_callback = before_model
+    agent.after_model_callback = after_model
 
 async def get_billy_mcp_client():
-    """Get or create the Billy.dk MCP client"""
-    global _billy_mcp_client
-    
-    # Always create a fresh client to avoid session issues
-    base_url = os.getenv("MCP_SERVER_URL", "http://localhost:3000")
-    # Handle case where MCP_SERVER_URL already includes /mcp
-    if base_url.endswith("/mcp"):
-        mcp_url = base_url
-    else:
-        mcp_url = f"{base_url}/mcp"
-    
-    client = BillyDkMcpClient(mcp_url)
-    await client.initialize()
+    """Get the initialized MCP client of the primary (Billy.dk) server"""
+    federation = get_mcp_federation()
+    federation.check_available(federation.primary.name)
+    client = federation.primary_client()
+    await client.ensure_initialized()
     return client
 
-# Billy.dk MCP Tool Functions
-async def list_invoices() -> str:
+# Billy.dk MCP Tool Functions, used when tool discovery fails; they take the same path as discovered tools
+FALLBACK_TOOLS = ("listInvoices", "getInvoice", "createInvoice", "listCustomers", "totalInvoiceAmount")
+
+async def list_invoices(tool_context: ToolContext = None) -> str:
     """List all invoices from Billy.dk. Use this when user asks about invoices, not customers."""
     try:
-        client = await get_billy_mcp_client()
-        result = await client.call_tool("listInvoices")
+        result = await _call_tool("listInvoices", tool_context=tool_context)
+        _observe_result("listInvoices", result)
         
-        # Extract human-readable text from MCP response
-        if "content" in result and result["content"]:
-            return result["content"][0].get("text", str(result))
-        return str(result)
+        # Render every content part of the MCP response, within the token budget
+        return _fit_result("listInvoices", result, tool_context)
     except Exception as e:
         return f"❌ Error listing invoices: {e}"
 
-async def get_invoice(invoice_id: str) -> str:
+async def get_invoice(invoice_id: str, tool_context: ToolContext = None) -> str:
     """Get a specific invoice by ID"""
     try:
-        client = await get_billy_mcp_client()
-        result = await client.call_tool("getInvoice", {"id": invoice_id})
+        result = await _call_tool("getInvoice", {"id": invoice_id}, tool_context)
+        _observe_result("getInvoice", result)
         
-        if "content" in result and result["content"]:
-            return result["content"][0].get("text", str(result))
-        return str(result)
+        return _fit_result("getInvoice", result, tool_context, {"id": invoice_id})
     except Exception as e:
         return f"❌ Error getting invoice {invoice_id}: {e}"
 
-async def create_invoice(contact_id: str, amount: float, state: str = "draft") -> str:
+async def create_invoice(contact_id: str, amount: float, state: str = "draft",
+                         tool_context: ToolContext = None) -> str:
     """Create a new invoice"""
     try:
-        client = await get_billy_mcp_client()
-        result = await client.call_tool("createInvoice", {
+        arguments = {
             "contactId": contact_id,
             "amount": amount,
             "state": state
-        })
+        }
+        result = await _call_tool("createInvoice", arguments, tool_context)
+        _observe_result("createInvoice", result)
         
-        if "content" in result and result["content"]:
-            return result["content"][0].get("text", str(result))
-        return str(result)
+        return _fit_result("createInvoice", result, tool_context, arguments)
     except Exception as e:
         return f"❌ Error creating invoice: {e}"
 
-async def list_customers() -> str:
+async def list_customers(tool_context: ToolContext = None) -> str:
     """List all customers from Billy.dk. Use this when user asks about customers, not invoices."""
     try:
-        client = await get_billy_mcp_client()
-        result = await client.call_tool("listCustomers")
+        result = await _call_tool("listCustomers", tool_context=tool_context)
+        _observe_result("listCustomers", result)
         
-        if "content" in result and result["content"]:
-            return result["content"][0].get("text", str(result))
-        return str(result)
+        return _fit_result("listCustomers", result, tool_context)
     except Exception as e:
         return f"❌ Error listing customers: {e}"
 
-async def total_invoice_amount(start_date: str, end_date: str) -> str:
+async def total_invoice_amount(start_date: str, end_date: str, tool_context: ToolContext = None) -> str:
     """Get total invoice amount for a date range (YYYY-MM-DD format)"""
     try:
-        client = await get_billy_mcp_client()
-        result = await client.call_tool("totalInvoiceAmount", {
+        arguments = {
             "startDate": start_date,
             "endDate": end_date
-        })
+        }
+        result = await _call_tool("totalInvoiceAmount", arguments, tool_context)
         
-        if "content" in result and result["content"]:
-            return result["content"][0].get("text", str(result))
-        return str(result)
+        return _fit_result("totalInvoiceAmount", result, tool_context, arguments)
     except Exception as e:
         return f"❌ Error getting total amount: {e}"
 
+def _function_tools_for(entries: List[Dict[str, Any]]) -> List[FunctionTool]:
+    """Create FunctionTool objects for federated catalog entries, declared with their inputSchema"""
+    function_tools = []
+    for entry in entries:
+        print(f"   📋 {entry['name']}: {entry['description']}")
+        dynamic_func = create_dynamic_tool_function(entry["name"], entry["description"], entry["inputSchema"])
+        function_tools.append(McpFunctionTool(dynamic_func, entry["description"], entry["inputSchema"]))
+    return function_tools
+
 async def create_dynamic_mcp_tools():
     """
-    Dynamically discover all available tools from the MCP server
+    Dynamically discover all available tools from the federated MCP servers
     and create FunctionTool objects for each one.
     """
     try:
-        # Get MCP client
-        client = await get_billy_mcp_client()
+        federation = get_mcp_federation()
         
-        # Discover all available tools
-        tools_result = await client.list_tools()
+        # Discover all servers concurrently; slow servers are retried later
+        entries = await federation.discover()
         
-        if "tools" not in tools_result:
-            print("⚠️  No tools found in MCP server response")
-            return []
+        if not federation.catalog:
+            raise Exception("no MCP server answered tool discovery")
         
-        discovered_tools = tools_result["tools"]
-        print(f"🔍 Discovered {len(discovered_tools)} tools from MCP server")
+        print(f"🔍 Discovered {len(entries)} tools from {len(federation.servers) - len(federation.pending)} MCP server(s)")
         
         # Create dynamic FunctionTool objects for each discovered tool
-        function_tools = []
-        
-        for tool_info in discovered_tools:
-            tool_name = tool_info.get("name", "unknown")
-            tool_description = tool_info.get("description", f"Tool: {tool_name}")
-            tool_schema = tool_info.get("inputSchema", {})
-            
-            print(f"   📋 {tool_name}: {tool_description}")
-            
-            # Create dynamic function for this tool
-            dynamic_func = create_dynamic_tool_function(tool_name, tool_description, tool_schema)
-            
-            # Create FunctionTool wrapper
-            function_tools.append(FunctionTool(dynamic_func))
-        
-        return function_tools
+        return _function_tools_for(entries)
         
     except Exception as e:
         print(f"❌ Error discovering MCP tools: {e}")
@@ -216,6 +374,9 @@ async def create_dynamic_mcp_tools():
         traceback.print_exc()
         
         # Fallback to hardcoded tools
+        if WRITE_OUTBOX:
+            for tool_name in FALLBACK_TOOLS:
+                get_write_outbox().register(tool_name)
         return [
             FunctionTool(list_invoices),
             FunctionTool(get_invoice),
@@ -224,26 +385,64 @@ async def create_dynamic_mcp_tools():
             FunctionTool(total_invoice_amount)
         ]
 
+def _background_services_callback(agent: LlmAgent, discovery: asyncio.Task = None):
+    """
+    Create a before-model callback that keeps background services running on
+    the serving loop: MCP health probing, warming the hot list caches, sending
+    queued writes, and adding tools from MCP servers which missed startup
+    discovery.
+    
+    If the agent was created while its startup discovery still runs as a task,
+    the first model calls wait for that task. Only those calls wait; the event
+    loop keeps serving every other session.
+    """
+    def add_tools(entries: List[Dict[str, Any]]):
+        existing = {getattr(tool, "name", None) for tool in agent.tools}
+        agent.tools.extend(_function_tools_for([e for e in entries if e["name"] not in existing]))
+        print(f"✅ Added {len(entries)} late-discovered MCP tools")
+    
+    async def before_model(callback_context, llm_request):
+        loop = asyncio.get_running_loop()
+        if discovery is not None and not discovery.done() and discovery.get_loop() is loop:
+            await asyncio.shield(discovery)
+            # The request was assembled before the tools existed
+            llm_request.append_tools([tool for tool in agent.tools if tool.name not in llm_request.tools_dict])
+        get_health_prober().ensure_started()
+        if CACHE_WARMER:
+            get_cache_warmer().ensure_started()
+        if WRITE_OUTBOX:
+            get_write_outbox().ensure_started()
+        federation = get_mcp_federation()
+        if federation.pending:
+            federation.schedule_refresh(add_tools)
+        return None
+    
+    return before_model
+
 def create_dynamic_tool_function(tool_name: str, description: str, schema: Dict[str, Any]):
     """
-    Create a dynamic function for an MCP tool.
+    Create a dynamic function for an MCP tool from the federated catalog.
     """
     
     # Extract parameter info from schema
     properties = schema.get("properties", {})
     required_params = schema.get("required", [])
+    get_speculative_dispatcher().register(tool_name, schema)
+    # Hot lists are already kept warm; prefetching them too would fetch them twice
+    if not (CACHE_WARMER and get_cache_warmer().register(tool_name)):
+        get_prefetcher().register(tool_name, schema)
+    if WRITE_OUTBOX:
+        get_write_outbox().register(tool_name)
     
     # Create function signature dynamically
     if not properties:
         # No parameters
-        async def dynamic_tool() -> str:
+        async def dynamic_tool(tool_context: ToolContext = None) -> str:
             try:
-                client = await get_billy_mcp_client()
-                result = await client.call_tool(tool_name)
+                result = await _call_tool(tool_name, tool_context=tool_context)
+                _observe_result(tool_name, result)
                 
-                if "content" in result and result["content"]:
-                    return result["content"][0].get("text", str(result))
-                return str(result)
+                return _fit_result(tool_name, result, tool_context)
             except Exception as e:
                 return f"❌ Error calling {tool_name}: {e}"
         
@@ -253,14 +452,12 @@ def create_dynamic_tool_function(tool_name: str, description: str, schema: Dict[
     
     else:
         # Has parameters - create function with **kwargs
-        async def dynamic_tool(**kwargs) -> str:
+        async def dynamic_tool(tool_context: ToolContext = None, **kwargs) -> str:
             try:
-                client = await get_billy_mcp_client()
-                result = await client.call_tool(tool_name, kwargs)
+                result = await _call_tool(tool_name, kwargs, tool_context)
+                _observe_result(tool_name, result)
                 
-                if "content" in result and result["content"]:
-                    return result["content"][0].get("text", str(result))
-                return str(result)
+                return _fit_result(tool_name, result, tool_context, kwargs)
             except Exception as e:
                 return f"❌ Error calling {tool_name}: {e}"
         
@@ -268,51 +465,30 @@ def create_dynamic_tool_function(tool_name: str, description: str, schema: Dict[
         dynamic_tool.__doc__ = description
         return dynamic_tool
 
-def create_billy_agent():
-    """
-    Create a Billy.dk agent with proper MCP integration using standard HTTP protocol.
-    This follows the official MCP specification.
-    """
-    
-    # Get configuration
+async def _discover_billy_tools() -> List[FunctionTool]:
+    """Discover the Billy.dk MCP tools on the running event loop"""
     mcp_server_url = os.getenv("MCP_SERVER_URL", "http://localhost:3000")
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    
-    
-    # Check API key
-    if not openai_api_key:
-        print("⚠️  Warning: OPENAI_API_KEY not found in environment")
-        print("   Please set OPENAI_API_KEY in your .env file")
-    
-    # Prepare tools list
     tools = []
     
     # Add Billy.dk MCP tools using standard HTTP protocol - DYNAMIC DISCOVERY
     if mcp_server_url:
         try:
             print(f"🔧 Billy.dk MCP integration using standard HTTP protocol")
-            # Handle case where MCP_SERVER_URL already includes /mcp
-            if mcp_server_url.endswith("/mcp"):
-                server_display = mcp_server_url
-            else:
-                server_display = f"{mcp_server_url}/mcp"
-            print(f"📡 Server: {server_display}")
+            for server_name, client in get_mcp_federation().clients.items():
+                print(f"📡 Server '{server_name}': {client.mcp_url}")
             
             # Dynamically discover all available tools from MCP server
-            # Check if we're in an event loop
-            try:
-                loop = asyncio.get_running_loop()
-                # We're in an event loop, create a task instead
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(asyncio.run, create_dynamic_mcp_tools())
-                    billy_tools = future.result()
-            except RuntimeError:
-                # No event loop running, safe to use asyncio.run
-                billy_tools = asyncio.run(create_dynamic_mcp_tools())
-            
+            billy_tools = await create_dynamic_mcp_tools()
             tools.extend(billy_tools)
             
+            # Local query tools over the replicated Billy.dk lists
+            federation = get_mcp_federation()
+            available = federation.catalog if federation.catalog else ("listInvoices", "listCustomers")
+            tools.extend(local_query_tools(available))
+            tools.append(FunctionTool(read_result_page))
+            if WRITE_OUTBOX and any(is_write_tool(name) for name in federation.catalog):
+                tools.append(FunctionTool(get_write_status))
+            
             print("✅ Billy.dk MCP tools added using standard protocol")
             print(f"📋 Discovered {len(billy_tools)} tools from MCP server")
             
@@ -323,77 +499,142 @@ def create_billy_agent():
         print("⚠️  MCP_SERVER_URL not configured")
         print("   Set MCP_SERVER_URL=http://localhost:3000 in your .env file")
     
-    # Create LiteLLM model for OpenAI support
-    model = LiteLlm(
-        model="openai/gpt-4o-mini",  # LiteLLM requires provider prefix format
-        api_key=openai_api_key
-    )
-    
-    # Create the agent using the official ADK pattern
-    agent = LlmAgent(
-        model=model,  # Use LiteLlm object for OpenAI model support
-        name="billy_agent",   # Required: Unique agent name
-        description="A helpful AI assistant specialized in managing business invoices, customers, and products using Billy.dk tools via standard MCP protocol.",  # Required: Agent description
-        instruction="""You are Billy, a helpful AI assistant specialized in managing business invoices, customers, and products.
+    return tools
+
+BILLY_INSTRUCTION = """You are Billy, a helpful AI assistant specialized in managing business invoices, customers, and products.
 
 You have access to Billy.dk business management tools via the standard MCP protocol that allow you to:
 - 📋 List, view, and create invoices
 - 👥 Manage customer information  
 - 💰 Analyze financial data and totals
 
-CRITICAL: Always maintain conversation context and understand what data type you're working with.
-
 When users ask about invoices, customers, or financial data, use the appropriate tools to provide accurate, up-to-date information.
 
-You have access to Billy.dk business management tools that will be automatically available to you. Use the tools as needed based on user requests.
-
-Context Awareness Rules:
-1. If the user just showed/discussed CUSTOMERS, follow-up questions about "latest", "recent", "show me X" refer to CUSTOMERS
-2. If the user just showed/discussed INVOICES, follow-up questions about "latest", "recent", "show me X" refer to INVOICES
-3. If unclear, ask for clarification: "Do you mean customers or invoices?"
-4. Pay attention to the current conversation topic - don't switch between customers and invoices randomly
+%s
 
 Always:
 - Be helpful and professional
-- MAINTAIN CONVERSATION CONTEXT - remember what data type we're discussing
 - Use tools when relevant to the user's request
 - Explain what you're doing when using tools
 - Format responses in a clear, readable way
 - For dates, use YYYY-MM-DD format
-- If asked for "latest X" or "recent X", understand this refers to the current topic of conversation
 
 If a tool fails, inform the user politely and suggest alternatives.
 
-Keep responses concise and focused, but always stay contextually aware.""",
+Keep responses concise and focused."""
+
+# With context tracking, a note on each user message replaces the rules below
+CONTEXT_NOTE = ('User messages may end with a [Context: ...] note giving the current topic and the IDs referenced last. '
+                'Follow it for follow-up questions; if there is no note and the data type is unclear, ask: '
+                '"Do you mean customers or invoices?"')
+
+CONTEXT_RULES = """CRITICAL: Always maintain conversation context and understand what data type you're working with.
+
+Context Awareness Rules:
+1. If the user just showed/discussed CUSTOMERS, follow-up questions about "latest", "recent", "show me X" refer to CUSTOMERS
+2. If the user just showed/discussed INVOICES, follow-up questions about "latest", "recent", "show me X" refer to INVOICES
+3. If unclear, ask for clarification: "Do you mean customers or invoices?"
+4. Pay attention to the current conversation topic - don't switch between customers and invoices randomly
+5. If asked for "latest X" or "recent X", understand this refers to the current topic of conversation"""
+
+def _billy_instruction() -> str:
+    """The agent instruction, with context rules only when context tracking is off"""
+    return BILLY_INSTRUCTION % (CONTEXT_NOTE if CONTEXT_TRACKING else CONTEXT_RULES)
+
+def _build_billy_agent(tools: List[FunctionTool]) -> LlmAgent:
+    """Create the LLM agent around an already discovered tool list"""
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    
+    # Check API key
+    if not openai_api_key:
+        print("⚠️  Warning: OPENAI_API_KEY not found in environment")
+        print("   Please set OPENAI_API_KEY in your .env file")
+    
+    # Route tool selection to a small model and analysis answers to a stronger one
+    model = create_billy_model(DEFAULT_MODEL, openai_api_key)
+    
+    # Create the agent using the official ADK pattern
+    agent = LlmAgent(
+        model=model,  # LiteLlm-backed models for OpenAI model support
+        name="billy_agent",   # Required: Unique agent name
+        description="A helpful AI assistant specialized in managing business invoices, customers, and products using Billy.dk tools via standard MCP protocol.",  # Required: Agent description
+        instruction=_billy_instruction(),
         tools=tools  # Billy.dk tools using standard MCP protocol
     )
     
     return agent
 
+async def _discover_into(agent: LlmAgent):
+    """Discover the MCP tools in the background and add them to an existing agent"""
+    agent.tools.extend(await _discover_billy_tools())
+
+async def create_billy_agent_async():
+    """
+    Create a Billy.dk agent with proper MCP integration using standard HTTP protocol.
+    
+    Tool discovery runs on the caller's event loop and only awaits network I/O,
+    so other sessions served by the same loop keep running meanwhile.
+    """
+    agent = _build_billy_agent(await _discover_billy_tools())
+    _install_callbacks(agent)
+    return agent
+
+async def _create_billy_agent_and_close():
+    """Create the agent on a temporary event loop and release its connections"""
+    try:
+        return await create_billy_agent_async()
+    finally:
+        await get_mcp_federation().close()
+
+def create_billy_agent():
+    """
+    Create a Billy.dk agent with proper MCP integration using standard HTTP protocol.
+    This follows the official MCP specification.
+    
+    Without a running event loop, discovery runs to completion first. Inside a
+    running loop (e.g. the ADK web server) the agent is returned immediately and
+    discovery continues as a task on that loop; the first model call waits for it.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # No event loop running, safe to use asyncio.run
+        return asyncio.run(_create_billy_agent_and_close())
+    
+    agent = _build_billy_agent([])
+    discovery = loop.create_task(_discover_into(agent))
+    _install_callbacks(agent, discovery)
+    if CACHE_WARMER:
+        # Warm the hot lists as soon as the tools are known, before the first user asks
+        discovery.add_done_callback(lambda _: get_cache_warmer().ensure_started())
+    return agent
+
+async def _run_console():
+    """Create the agent and chat with it on one event loop, then release its connections"""
+    try:
+        agent = await create_billy_agent_async()
+        if CACHE_WARMER:
+            get_cache_warmer().ensure_started()
+        print("✅ Agent created successfully!")
+        print("💬 You can now interact with Billy (responses stream as they are generated)...")
+        print("   Type 'exit' to quit, or 'health' for the MCP server health")
+        print()
+        get_health_prober().ensure_started()
+        await run_console(agent, commands={"health": get_health_prober().report})
+    finally:
+        await get_mcp_federation().close()
+
 def main():
     """Main function for console testing"""
     print("🚀 Billy.dk ADK Agent - Console Mode")
     print("=" * 50)
     
     try:
-        agent = create_billy_agent()
-        print("✅ Agent created successfully!")
-        print("💬 You can now interact with Billy...")
-        print("   Type 'exit' to quit")
-        print()
-        
-        # Simple console chat loop
-        while True:
-            user_input = input("User: ").strip()
-            if user_input.lower() in ['exit', 'quit', 'bye']:
-                print("👋 Goodbye!")
-                break
-            
-            if user_input:
-                print("Agent: I'm ready to help with Billy.dk tools!")
-                
+        asyncio.run(_run_console())
+    except KeyboardInterrupt:
+        print("\n👋 Goodbye!")
     except Exception as e:
-        print(f"❌ Error creating agent: {e}")
+        print(f"❌ Error running agent: {e}")
         import traceback
         traceback.print_exc()
 
@@ -416,7 +657,7 @@ except Exception as e:
     try:
         # Create LiteLLM model for fallback
         fallback_model = LiteLlm(
-            model="openai/gpt-3.5-turbo",  # LiteLLM requires provider prefix format
+            model=os.getenv("BILLY_FALLBACK_MODEL") or "openai/gpt-3.5-turbo",  # LiteLLM requires provider prefix format
             api_key=os.getenv("OPENAI_API_KEY")
         )
         
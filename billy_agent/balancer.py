@@ -0,0 +1,127 @@
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from typing import List, Optional, Set
+
+# Weight of the newest sample in the rolling latency average
+_LATENCY_ALPHA = 0.3
+
+
+class Replica:
+    """One instance of an MCP server and its live load statistics"""
+
+    def __init__(self, mcp_url: str):
+        self.mcp_url = mcp_url
+        self.base_url = mcp_url[:-len("/mcp")] if mcp_url.endswith("/mcp") else mcp_url
+        self.outstanding = 0
+        self.latency_ms = 0.0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.initialized = False
+        self.init_future: Optional[asyncio.Future] = None
+        # MCP-Session-Id issued by this replica, if it uses sessions
+        self.session_id: Optional[str] = None
+
+    def score(self, default_latency_ms: float) -> float:
+        """Expected wait on this replica; lower is better"""
+        return (self.outstanding + 1) * (self.latency_ms or default_latency_ms)
+
+    def record(self, latency_ms: float, ok: bool):
+        """Fold a finished request into the rolling statistics"""
+        if not ok:
+            # Failures say nothing about how fast the replica serves requests
+            self.consecutive_failures += 1
+            return
+        self.consecutive_failures = 0
+        if self.latency_ms:
+            self.latency_ms += _LATENCY_ALPHA * (latency_ms - self.latency_ms)
+        else:
+            self.latency_ms = latency_ms
+
+    def __repr__(self):
+        return (f"Replica({self.mcp_url!r}, outstanding={self.outstanding}, "
+                f"latency_ms={self.latency_ms:.1f}, healthy={self.healthy})")
+
+
+class ReplicaBalancer:
+    """
+    Spreads requests over equivalent MCP server replicas.
+
+    Selection uses power-of-two-choices ("p2c") or least-outstanding-requests
+    ("least"), both weighted by live latency. Requests carrying an affinity key
+    stick to the replica that first served that key for as long as it stays
+    healthy; only the max_affinity_keys most recently used keys are remembered.
+    Replicas are ejected after repeated failures or a failed /health probe and
+    restored once a probe succeeds again.
+    """
+
+    def __init__(self, mcp_urls: List[str], strategy: str = "p2c", max_failures: int = 3,
+                 max_affinity_keys: int = 10_000):
+        if not mcp_urls:
+            raise ValueError("ReplicaBalancer needs at least one replica")
+        if strategy not in ("p2c", "least"):
+            raise ValueError(f"Unknown balancing strategy: {strategy}")
+        self.replicas = [Replica(url) for url in mcp_urls]
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.max_affinity_keys = max_affinity_keys
+        # affinity key -> replica, least recently used first
+        self._affinity: "OrderedDict[str, Replica]" = OrderedDict()
+
+    def healthy_replicas(self) -> List[Replica]:
+        return [replica for replica in self.replicas if replica.healthy]
+
+    def choose(self, affinity_key: Optional[str] = None, exclude: Set[str] = frozenset()) -> Replica:
+        """Pick the replica for the next request, skipping URLs in exclude"""
+        if affinity_key is not None:
+            pinned = self._affinity.get(affinity_key)
+            if pinned is not None and pinned.healthy and pinned.mcp_url not in exclude:
+                self._affinity.move_to_end(affinity_key)
+                return pinned
+
+        remaining = [replica for replica in self.replicas if replica.mcp_url not in exclude] or self.replicas
+        # With every replica ejected, trying one beats refusing the request
+        candidates = [replica for replica in remaining if replica.healthy] or remaining
+        if len(candidates) == 1:
+            replica = candidates[0]
+        elif self.strategy == "p2c":
+            # Unmeasured replicas are assumed to be as fast as the measured average
+            measured = [r.latency_ms for r in candidates if r.latency_ms]
+            default_latency = sum(measured) / len(measured) if measured else 1.0
+            first, second = random.sample(candidates, 2)
+            replica = first if first.score(default_latency) <= second.score(default_latency) else second
+        else:
+            replica = min(candidates, key=lambda r: (r.outstanding, r.latency_ms))
+
+        if affinity_key is not None:
+            self._affinity[affinity_key] = replica
+            self._affinity.move_to_end(affinity_key)
+            while len(self._affinity) > self.max_affinity_keys:
+                self._affinity.popitem(last=False)
+        return replica
+
+    def started(self, replica: Replica) -> float:
+        """Mark a request as in flight and return its start time"""
+        replica.outstanding += 1
+        return time.monotonic()
+
+    def finished(self, replica: Replica, started: float, ok: Optional[bool]):
+        """Mark a request as done and eject the replica if it keeps failing"""
+        replica.outstanding -= 1
+        if ok is None:
+            # Cancelled by the caller; neither a success nor a replica failure
+            return
+        replica.record((time.monotonic() - started) * 1000, ok)
+        if replica.consecutive_failures >= self.max_failures and replica.healthy:
+            print(f"⚠️  Ejecting MCP replica {replica.base_url} after {replica.consecutive_failures} failures")
+            replica.healthy = False
+
+    def mark_health(self, replica: Replica, healthy: bool):
+        """Apply the result of a /health probe"""
+        if healthy and not replica.healthy:
+            print(f"✅ MCP replica {replica.base_url} is healthy again")
+            replica.consecutive_failures = 0
+        elif not healthy and replica.healthy:
+            print(f"⚠️  Ejecting MCP replica {replica.base_url}: health probe failed")
+        replica.healthy = healthy
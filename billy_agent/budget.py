@@ -0,0 +1,225 @@
+import os
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .parsing import ParsedResult, parse_tool_text
+from .result_store import ResultStore, get_result_store
+
+# Rough characters per token, used when no tokenizer is available
+_CHARS_PER_TOKEN = 4
+# Turns whose token use is remembered for the per-turn budget
+_MAX_TRACKED_TURNS = 256
+
+_encoding = None
+
+
+def _get_encoding():
+    """Load the gpt-4o tokenizer once; None when tiktoken is unavailable"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _truncate_tokens(text: str, budget: int) -> str:
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:budget * _CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:budget])
+
+
+def parse_budgets(spec: str) -> Dict[str, int]:
+    """Parse per-tool budgets given as "listInvoices=1500,listCustomers=800" """
+    budgets = {}
+    for entry in spec.split(","):
+        name, sep, value = entry.partition("=")
+        if sep and name.strip() and value.strip().isdigit():
+            budgets[name.strip()] = int(value)
+    return budgets
+
+
+def summarize(parsed: ParsedResult) -> str:
+    """One-line statistics of a parsed list result"""
+    records = parsed.records
+    parts = [f"count={parsed.declared_count if parsed.declared_count is not None else len(records)}"]
+    if parsed.kind == "invoices":
+        totals: Dict[str, float] = {}
+        for invoice in records:
+            totals[invoice.currency] = totals.get(invoice.currency, 0.0) + invoice.amount
+        parts.append("sum=" + ", ".join(f"{amount:.2f} {currency}" for currency, amount in totals.items()))
+        dates = [invoice.entry_date for invoice in records if invoice.entry_date]
+        if dates:
+            parts.append(f"dates={min(dates)}..{max(dates)}")
+        states = Counter(invoice.state for invoice in records)
+        parts.append("states=" + ", ".join(f"{state}:{count}" for state, count in states.most_common()))
+    elif parsed.kind == "products" and records:
+        prices = [product.price for product in records]
+        parts.append(f"price={min(prices):.2f}..{max(prices):.2f} {records[0].currency}")
+    return "Summary: " + "; ".join(parts)
+
+
+# Local tool that pages through the rows of each list tool
+PAGING_HINTS = {
+    "invoices": "queryInvoices (filters, or sort_by=position with offset)",
+    "customers": "queryCustomers (filters, or sort_by=position with offset)",
+}
+
+
+class ResultBudgeter:
+    """
+    Fits tool results into a token budget before they reach the LLM.
+
+    Every result is measured against the budget of its tool and what is left of
+    the budget of the current turn (ADK invocation). A list result over budget
+    keeps its header and as many head rows as fit, plus a statistical summary of
+    all rows and a hint how to page through the rest. Other results are cut at
+    the budget. With a result store, the full output is kept out of the prompt
+    under a per-session handle for readResultPage. Token savings are counted in
+    stats().
+    """
+
+    def __init__(self, tool_budget: int = 2000, turn_budget: int = 6000,
+                 tool_budgets: Optional[Dict[str, int]] = None, min_budget: int = 200,
+                 store: Optional[ResultStore] = None):
+        self.tool_budget = tool_budget
+        self.turn_budget = turn_budget
+        self.tool_budgets = tool_budgets or {}
+        # Every result may use at least this much, even in an exhausted turn
+        self.min_budget = min_budget
+        # Keeps full results of shortened outputs for readResultPage
+        self.store = store
+        self._turn_used: "OrderedDict[str, int]" = OrderedDict()
+        self.results = 0
+        self.truncated = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+
+    def budget_for(self, tool_name: str, invocation_id: Optional[str] = None) -> int:
+        budget = self.tool_budgets.get(tool_name, self.tool_budget)
+        if invocation_id is not None:
+            remaining = self.turn_budget - self._turn_used.get(invocation_id, 0)
+            budget = min(budget, max(remaining, self.min_budget))
+        return budget
+
+    def _charge(self, invocation_id: Optional[str], tokens: int):
+        if invocation_id is None:
+            return
+        self._turn_used[invocation_id] = self._turn_used.get(invocation_id, 0) + tokens
+        self._turn_used.move_to_end(invocation_id)
+        while len(self._turn_used) > _MAX_TRACKED_TURNS:
+            self._turn_used.popitem(last=False)
+
+    def _split_rows(self, text: str, parsed: Optional[ParsedResult],
+                    table: bool = False) -> Tuple[List[str], List[str]]:
+        """Split a result into header lines and rows (list entries, or plain lines)"""
+        lines = text.splitlines()
+        if parsed is None:
+            return [], lines
+        if table:
+            # Tables end with one line per record
+            count = len(parsed.records)
+            return lines[:len(lines) - count], lines[len(lines) - count:]
+        first_row = next((i for i, line in enumerate(lines) if line.lstrip().startswith(("•", "*", "-"))),
+                         len(lines))
+        return lines[:first_row], [line for line in lines[first_row:] if line.strip()]
+
+    def _fit_rows(self, header: List[str], rows: List[str], footer: List[str], budget: int) -> List[str]:
+        """Header, as many rows as fit the budget, and footer (with {omitted} filled in)"""
+        kept = list(header)
+        used = count_tokens("\n".join(header + [line.format(omitted=len(rows), shown=0) for line in footer]))
+        for row in rows:
+            cost = count_tokens(row) + 1
+            if used + cost > budget:
+                break
+            kept.append(row)
+            used += cost
+        omitted = len(rows) - (len(kept) - len(header))
+        return kept + [line.format(omitted=omitted, shown=len(kept) - len(header)) for line in footer]
+
+    def fit(self, tool_name: str, text: str, invocation_id: Optional[str] = None,
+            session_id: Optional[str] = None, parsed: Optional[ParsedResult] = None) -> str:
+        """
+        Return text, or a shortened version of it that fits the budget.
+
+        With a session_id and a result store, the full result is stored and the
+        shortened version names a handle to page through it with readResultPage.
+        Pass parsed when text is a table rendered from those records; otherwise
+        text is parsed as the tool's own output.
+        """
+        tokens = count_tokens(text)
+        budget = self.budget_for(tool_name, invocation_id)
+        self.results += 1
+        self.tokens_in += tokens
+        if tokens <= budget:
+            self.tokens_out += tokens
+            self._charge(invocation_id, tokens)
+            return text
+
+        table = parsed is not None
+        if parsed is None:
+            parsed = parse_tool_text(tool_name, text)
+        if parsed is not None and parsed.kind not in ("invoices", "customers", "products"):
+            parsed = table = None
+        header, rows = self._split_rows(text, parsed, table)
+        handle = None
+        if self.store is not None and session_id is not None:
+            handle = self.store.put(session_id, tool_name, "\n".join(header), rows)
+
+        if parsed is not None:
+            hint = PAGING_HINTS.get(parsed.kind)
+            if handle:
+                hint = f'readResultPage(handle="{handle}", offset={{shown}})' + (f" or {hint}" if hint else "")
+            footer = ["... {omitted} more rows not shown. Use " + (hint or "the query tools") + " for the rest.",
+                      summarize(parsed)]
+            fitted = "\n".join(self._fit_rows(header, rows, footer, budget))
+        elif handle:
+            footer = [f'... [{{omitted}} more lines, {tokens} tokens in full. '
+                      f'Use readResultPage(handle="{handle}", offset={{shown}}) for the rest]']
+            fitted = "\n".join(self._fit_rows([], rows, footer, budget))
+        else:
+            fitted = _truncate_tokens(text, budget) + f"\n... [truncated, {tokens} tokens in full]"
+
+        fitted_tokens = count_tokens(fitted)
+        self.truncated += 1
+        self.tokens_out += fitted_tokens
+        self._charge(invocation_id, fitted_tokens)
+        print(f"✂️  {tool_name}: {tokens} → {fitted_tokens} tokens (budget {budget})")
+        return fitted
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "results": self.results,
+            "truncated": self.truncated,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "tokens_saved": self.tokens_in - self.tokens_out,
+        }
+
+
+# Global budgeter instance
+_result_budgeter = None
+
+
+def get_result_budgeter() -> ResultBudgeter:
+    """Get or create the result budgeter configured from the environment"""
+    global _result_budgeter
+
+    if _result_budgeter is None:
+        _result_budgeter = ResultBudgeter(
+            tool_budget=int(os.getenv("BILLY_RESULT_TOKEN_BUDGET", "2000")),
+            turn_budget=int(os.getenv("BILLY_TURN_TOKEN_BUDGET", "6000")),
+            tool_budgets=parse_budgets(os.getenv("BILLY_RESULT_TOKEN_BUDGETS", "")),
+            store=get_result_store(),
+        )
+    return _result_budgeter
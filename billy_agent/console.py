@@ -0,0 +1,124 @@
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from google.adk.agents import LlmAgent
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+EXIT_COMMANDS = ("exit", "quit", "bye")
+
+
+async def _read_line(prompt: str) -> str:
+    """Read a line from stdin without blocking the event loop"""
+    return await asyncio.to_thread(input, prompt)
+
+
+def _arguments(args: Optional[dict]) -> str:
+    text = json.dumps(args or {}, ensure_ascii=False, separators=(", ", ": "))
+    return text if len(text) <= 80 else text[:77] + "..."
+
+
+class TurnPrinter:
+    """Prints the events of one turn as they stream in and times them"""
+
+    def __init__(self, started: float):
+        self.started = started
+        self.first_token: Optional[float] = None
+        # Whether text was already printed as partial chunks for the current response
+        self.streamed = False
+        self.at_line_start = True
+        self.calls: Dict[str, float] = {}
+
+    def _text(self, text: str):
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.started
+        if self.at_line_start:
+            print("Billy: ", end="")
+        print(text, end="", flush=True)
+        self.at_line_start = text.endswith("\n")
+
+    def line(self, text: str):
+        if not self.at_line_start:
+            print()
+        print(text, flush=True)
+        self.at_line_start = True
+
+    def event(self, event):
+        if event.content is None or not event.content.parts:
+            return
+        for part in event.content.parts:
+            if part.text and not part.thought:
+                if event.partial:
+                    self.streamed = True
+                    self._text(part.text)
+                elif not self.streamed:
+                    # A complete response (router, cache or a non-streaming model)
+                    self._text(part.text)
+            elif part.function_call and not event.partial:
+                self.calls[part.function_call.id or part.function_call.name] = time.perf_counter()
+                self.line(f"   🔧 {part.function_call.name}({_arguments(part.function_call.args)})")
+            elif part.function_response:
+                response = part.function_response
+                started = self.calls.pop(response.id or response.name, None)
+                took = f" ({time.perf_counter() - started:.2f}s)" if started is not None else ""
+                self.line(f"   ✅ {response.name} done{took}")
+        if not event.partial:
+            self.streamed = False
+
+    def finish(self) -> Optional[float]:
+        total = time.perf_counter() - self.started
+        first = f"first token {self.first_token:.2f}s, " if self.first_token is not None else ""
+        self.line(f"   ⏱️  {first}total {total:.2f}s")
+        return self.first_token
+
+
+async def run_console(agent: LlmAgent, read_line: Callable[[str], Awaitable[str]] = _read_line,
+                      user_id: str = "console",
+                      commands: Optional[Dict[str, Callable[[], str]]] = None) -> List[float]:
+    """
+    Chat with the agent in the terminal through an ADK Runner with streaming on.
+
+    Model tokens are printed as they arrive and tool calls are shown inline.
+    Each turn prints its time to first token; the list of them is returned.
+    A line naming one of commands prints that command's text instead of
+    going to the agent.
+    """
+    runner = InMemoryRunner(agent=agent, app_name="billy_console")
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id=user_id)
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+    first_tokens: List[float] = []
+
+    while True:
+        try:
+            user_input = (await read_line("User: ")).strip()
+        except EOFError:
+            break
+        if user_input.lower() in EXIT_COMMANDS:
+            break
+        if not user_input:
+            continue
+        if commands and user_input.lower() in commands:
+            print(commands[user_input.lower()](), flush=True)
+            continue
+
+        printer = TurnPrinter(time.perf_counter())
+        message = types.Content(role="user", parts=[types.Part(text=user_input)])
+        try:
+            async for event in runner.run_async(user_id=user_id, session_id=session.id, new_message=message,
+                                                run_config=run_config):
+                printer.event(event)
+        except Exception as e:
+            printer.line(f"❌ Error: {e}")
+        first_token = printer.finish()
+        if first_token is not None:
+            first_tokens.append(first_token)
+
+    if first_tokens:
+        print(f"⏱️  Average time to first token: {sum(first_tokens) / len(first_tokens):.2f}s "
+              f"over {len(first_tokens)} turns")
+    print("👋 Goodbye!")
+    await runner.close()
+    return first_tokens
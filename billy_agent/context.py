@@ -0,0 +1,191 @@
+import re
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from .federation import base_tool_name
+from .parsing import Customer, Invoice, Product, parse_tool_text
+
+# Data kind a tool works on, by the noun in its name
+_TOPICS = (("Invoice", "invoices"), ("Customer", "customers"), ("Product", "products"))
+
+# Session state keys
+STATE_TOPIC = "billy_topic"
+STATE_IDS = "billy_recent_ids"
+STATE_TURN = "billy_turn_context"
+
+# Entity nouns in a user message, in English and Danish
+_NOUNS = (
+    ("invoices", re.compile(r"\b(invoices?|faktura(?:er|en|erne)?|bills?)\b", re.I)),
+    ("customers", re.compile(r"\b(customers?|clients?|contacts?|kunder?(?:ne|n)?)\b", re.I)),
+    ("products", re.compile(r"\b(products?|produkt(?:er|et|erne)?|items?)\b", re.I)),
+)
+# Words of a follow-up that refers back instead of naming what it is about
+_FOLLOW_UP = re.compile(
+    r"\b(latest|newest|recent|oldest|first|last|top|bottom|them|those|these|it|that one|this one|the ones?|"
+    r"more|next|previous|again|details|sorted|sort|largest|biggest|smallest|cheapest)\b", re.I)
+
+# A reference to one record shown before: "the second one", "the 3rd invoice", "it", "that one"
+_ORDINALS = {"first": 0, "1st": 0, "second": 1, "2nd": 1, "third": 2, "3rd": 2, "fourth": 3, "4th": 3,
+             "fifth": 4, "5th": 4}
+_ORDINAL_REFERENCE = re.compile(
+    r"\bthe (" + "|".join(_ORDINALS) + r")(?: (?:one|invoice|customer|product)\b|(?=\s*[?.!]?\s*$))", re.I)
+_PRONOUN_REFERENCE = re.compile(r"\b(?:it|(?:that|this) (?:one|invoice|customer|product))\b", re.I)
+
+_CLARIFICATION = re.compile(r"\bdo you mean\b|\bcustomers or invoices\b|\binvoices or customers\b", re.I)
+
+
+def tool_topic(tool_name: str) -> Optional[str]:
+    """Data kind a tool works on (invoices, customers or products), if any"""
+    name = base_tool_name(tool_name)
+    return next((topic for noun, topic in _TOPICS if noun in name), None)
+
+
+def mentioned_topic(text: str) -> Optional[str]:
+    """The one data kind a message names, or None if it names none or several"""
+    topics = [topic for topic, noun in _NOUNS if noun.search(text)]
+    return topics[0] if len(topics) == 1 else None
+
+
+def resolve_reference(text: str, ids: List[str]) -> Optional[Tuple[str, str]]:
+    """
+    The phrase of a message that points at one of the records last referenced,
+    and that record's ID: "the second one" picks the second of ids, "it" or
+    "that one" the only one. None if the message points at none, or it is unclear which.
+    """
+    match = _ORDINAL_REFERENCE.search(text)
+    if match:
+        index = _ORDINALS[match.group(1).lower()]
+        return (match.group(0), ids[index]) if index < len(ids) else None
+    match = _PRONOUN_REFERENCE.search(text)
+    if match and len(ids) == 1:
+        return match.group(0), ids[0]
+    return None
+
+
+def _record_id(record: Any) -> Optional[str]:
+    if isinstance(record, (Invoice, Customer)):
+        return record.id
+    if isinstance(record, Product):
+        return record.id or record.name
+    return None
+
+
+def _current_user_message(contents: List[types.Content]) -> Optional[int]:
+    for index in range(len(contents) - 1, -1, -1):
+        content = contents[index]
+        if content.role == "user" and any(part.text for part in content.parts or ()):
+            return index
+    return None
+
+
+class ContextTracker:
+    """
+    Tracks what the conversation is about, in the ADK session state.
+
+    Every tool call sets the active data kind (invoices, customers or
+    products) and the IDs it last referenced; a user message naming one kind
+    sets it too. At the start of each turn the user's message gets a one-line
+    context note. A follow-up that refers back without naming a kind ("show
+    me the 3 latest") is resolved to the active kind and its tools, and one
+    pointing at a single record ("the second one", "mark it paid") to that
+    record's ID, so the instruction no longer needs long context rules.
+    Clarification questions and tool calls of another kind than the resolved
+    one are counted.
+    """
+
+    def __init__(self, max_ids: int = 5):
+        self.max_ids = max_ids
+        self.resolved = 0
+        self.references = 0
+        self.clarifications = 0
+        self.wrong_tool_calls = 0
+
+    def observe(self, state, tool_name: str, args: Optional[Dict[str, Any]], text: str):
+        """Update the state from one tool call and its result"""
+        topic = tool_topic(tool_name)
+        if topic is None:
+            return
+        state[STATE_TOPIC] = topic
+        parsed = parse_tool_text(base_tool_name(tool_name).replace("query", "list"), text)
+        ids = [record_id for record_id in map(_record_id, parsed.records if parsed is not None else ()) if record_id]
+        if not ids and args and args.get("id"):
+            ids = [str(args["id"])]
+        if ids:
+            recent = dict(state.get(STATE_IDS) or {})
+            recent[topic] = ids[:self.max_ids]
+            state[STATE_IDS] = recent
+
+    def note(self, state, text: str, available: Collection[str]) -> tuple:
+        """The context note for a new user message, and the kind a follow-up was resolved to"""
+        named = mentioned_topic(text)
+        if named is not None:
+            state[STATE_TOPIC] = named
+        topic = state.get(STATE_TOPIC)
+        if topic is None:
+            return None, None
+        ids = (state.get(STATE_IDS) or {}).get(topic) or []
+        reference = resolve_reference(text, ids)
+        if reference and named is not None and reference[0].lower() == "it":
+            # "it" in a message naming its subject is rarely a reference ("can it list invoices?")
+            reference = None
+        resolved = topic if named is None and (reference or _FOLLOW_UP.search(text)) else None
+        parts = [f"[Context: the conversation is about {topic}"]
+        if resolved:
+            tools = sorted(name for name in available if tool_topic(name) == topic)
+            parts.append(f"; this follow-up refers to {topic}" + (f" (use {', '.join(tools)})" if tools else ""))
+        if reference:
+            self.references += 1
+            parts.append(f'; "{reference[0]}" is {topic[:-1]} {reference[1]}')
+        elif ids:
+            parts.append(f"; {topic} last referenced: {', '.join(ids)}")
+        return "".join(parts) + "]", resolved
+
+    async def before_model(self, callback_context, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        index = _current_user_message(llm_request.contents)
+        if callback_context is None or index is None:
+            return None
+        state = callback_context.state
+        turn = state.get(STATE_TURN)
+        if not turn or turn[0] != callback_context.invocation_id:
+            # First model call of the turn: decide its note once
+            text = " ".join(part.text for part in llm_request.contents[index].parts if part.text)
+            note, resolved = self.note(state, text, llm_request.tools_dict)
+            turn = [callback_context.invocation_id, note, resolved]
+            state[STATE_TURN] = turn
+            self.resolved += resolved is not None
+        if turn[1]:
+            content = llm_request.contents[index]
+            llm_request.contents[index] = content.model_copy(
+                update={"parts": list(content.parts) + [types.Part(text=turn[1])]})
+        return None
+
+    async def after_model(self, callback_context, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        if callback_context is None or llm_response.partial or llm_response.content is None:
+            return None
+        turn = callback_context.state.get(STATE_TURN)
+        resolved = turn[2] if turn and turn[0] == callback_context.invocation_id else None
+        for part in llm_response.content.parts or ():
+            if part.function_call and resolved and tool_topic(part.function_call.name) not in (None, resolved):
+                self.wrong_tool_calls += 1
+            elif part.text and _CLARIFICATION.search(part.text):
+                self.clarifications += 1
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        return {"resolved_follow_ups": self.resolved, "resolved_references": self.references,
+                "clarifications": self.clarifications, "wrong_tool_calls": self.wrong_tool_calls}
+
+
+# Global tracker instance
+_context_tracker = None
+
+
+def get_context_tracker() -> ContextTracker:
+    global _context_tracker
+
+    if _context_tracker is None:
+        _context_tracker = ContextTracker()
+    return _context_tracker
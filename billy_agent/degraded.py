@@ -0,0 +1,159 @@
+import asyncio
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .results import result_text
+from .tool_kinds import is_read_only_tool
+
+# Key in an MCP result's _meta giving the age of a last known good result served instead of a live one
+STALE_META = "billy/staleSeconds"
+
+# Error results of Billy.dk or the MCP server that mean it is unavailable, not that the request was wrong
+_UPSTREAM_DOWN = re.compile(
+    r"time[d ]?\s?out|unavailable|bad gateway|\b50[234]\b|connection (?:refused|reset|error)|econn|"
+    r"too many requests|\b429\b", re.I)
+
+
+def is_upstream_failure(result: Any) -> bool:
+    return isinstance(result, dict) and bool(result.get("isError")) and bool(_UPSTREAM_DOWN.search(result_text(result)))
+
+
+def _age_text(seconds: float) -> str:
+    if seconds < 90:
+        return f"{seconds:.0f} seconds"
+    if seconds < 5400:
+        return f"{seconds / 60:.0f} minutes"
+    return f"{seconds / 3600:.1f} hours"
+
+
+def stale_note(result: Any) -> Optional[str]:
+    """The warning to show with a result served from the last known good cache, if it was"""
+    age = ((result.get("_meta") or {}).get(STALE_META)) if isinstance(result, dict) else None
+    if age is None:
+        return None
+    return (f"⚠️ Billy.dk is not responding. This is the last known data, from {_age_text(age)} ago, "
+            f"and may be out of date; it is being refreshed in the background.")
+
+
+class LastKnownGood:
+    """
+    Serves read tools while the MCP server or Billy.dk is slow or down.
+
+    Every good result of a read tool is kept per tool and arguments. When a
+    read with a kept result hits a server the health prober reports down or
+    degraded, fails, or Billy.dk reports itself unavailable, the kept result
+    is returned instead, marked with its age in _meta (see stale_note). A read
+    of a healthy server is waited for even when it is slow; only one still
+    running after read_timeout, far above a normal read's latency, counts as
+    failed. The live call keeps running in the background, or
+    is started there, and replaces the kept result once it succeeds. Reads
+    without a kept result and writes always go to the server.
+    """
+
+    def __init__(self, read_timeout: float = 30.0, max_entries: int = 500, max_age: float = 86400.0):
+        self.read_timeout = read_timeout
+        self.max_entries = max_entries
+        self.max_age = max_age
+        # (tool name, canonical arguments) -> (result, fetched at)
+        self.entries: "OrderedDict[Tuple[str, str], Tuple[Any, float]]" = OrderedDict()
+        self._revalidations: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.served_stale = 0
+        self.timeouts = 0
+        self.revalidated = 0
+
+    @staticmethod
+    def _key(tool_name: str, arguments: Optional[Dict[str, Any]]) -> Tuple[str, str]:
+        return tool_name, json.dumps(arguments or {}, sort_keys=True, default=str, ensure_ascii=False)
+
+    def store(self, tool_name: str, arguments: Optional[Dict[str, Any]], result: Any, fetched_at: float = None):
+        """Keep a good result of a read tool"""
+        if not is_read_only_tool(tool_name) or not isinstance(result, dict) or result.get("isError"):
+            return
+        key = self._key(tool_name, arguments)
+        self.entries[key] = (result, fetched_at if fetched_at is not None else time.time())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _stale(self, key: Tuple[str, str]) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        result, fetched_at = entry
+        age = time.time() - fetched_at
+        if age > self.max_age:
+            return None
+        self.served_stale += 1
+        print(f"🗄️  Serving {key[0]} from the last known good result ({_age_text(age)} old)")
+        return {**result, "_meta": {**(result.get("_meta") or {}), STALE_META: round(age)}}
+
+    def _revalidate(self, key: Tuple[str, str], fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._revalidations.get(key)
+        if task is None or task.done():
+            async def run():
+                result = await fetch()
+                if not is_upstream_failure(result):
+                    self.store(key[0], json.loads(key[1]), result)
+                    self.revalidated += 1
+                return result
+
+            task = self._revalidations[key] = asyncio.ensure_future(run())
+            # Retrieve the exception of revalidations nobody waits for
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return task
+
+    async def call(self, tool_name: str, arguments: Optional[Dict[str, Any]], fetch: Callable[[], Awaitable[Any]],
+                   degraded: bool = False) -> Any:
+        """Call a tool through fetch, falling back to its last known good result if it is a read"""
+        if not is_read_only_tool(tool_name):
+            return await fetch()
+        key = self._key(tool_name, arguments)
+        if key not in self.entries:
+            result = await fetch()
+            self.store(tool_name, arguments, result)
+            return result
+
+        if degraded:
+            self._revalidate(key, fetch)
+            stale = self._stale(key)
+            if stale is not None:
+                return stale
+        try:
+            result = await asyncio.wait_for(asyncio.shield(self._revalidate(key, fetch)), self.read_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            result = None
+        except Exception as e:
+            print(f"⚠️  {tool_name} failed ({type(e).__name__}: {e})")
+            result = None
+        if result is None or is_upstream_failure(result):
+            stale = self._stale(key)
+            if stale is not None:
+                return stale
+            # Too old to serve: wait for the live call after all
+            return result if result is not None else await self._revalidate(key, fetch)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self.entries), "served_stale": self.served_stale, "timeouts": self.timeouts,
+                "revalidated": self.revalidated}
+
+
+# Global last-known-good cache
+_last_known_good = None
+
+
+def get_last_known_good() -> LastKnownGood:
+    """Get or create the last-known-good cache configured from the environment"""
+    global _last_known_good
+
+    if _last_known_good is None:
+        _last_known_good = LastKnownGood(
+            read_timeout=float(os.getenv("BILLY_DEGRADED_READ_TIMEOUT", "30")),
+            max_age=float(os.getenv("BILLY_DEGRADED_MAX_AGE", "86400")),
+        )
+    return _last_known_good
@@ -0,0 +1,127 @@
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .parsing import Customer, Invoice, ParsedResult, Product, parse_tool_text
+
+# Parsed list kinds that can be sent as a diff
+_LIST_KINDS = ("invoices", "customers", "products")
+
+
+def _key(record: Any) -> str:
+    if isinstance(record, Product):
+        return record.id or record.name
+    return record.id
+
+
+def format_row(record: Any) -> str:
+    """One record as a bullet line in the Billy.dk list format"""
+    if isinstance(record, Invoice):
+        extra = ", ".join(filter(None, (record.contact_id and f"contact: {record.contact_id}", record.entry_date)))
+        return f"• Invoice {record.id}: {record.amount:g} {record.currency} - {record.state}" + (
+            f" ({extra})" if extra else "")
+    if isinstance(record, Customer):
+        return f"• {record.name} ({record.id})" + (f" - {record.email}" if record.email else "")
+    if isinstance(record, Product):
+        return f"• {record.name}: {record.price:g} {record.currency}" + (f" (ID: {record.id})" if record.id else "")
+    return f"• {record}"
+
+
+def _changes(old: Any, new: Any) -> str:
+    """Fields of a record that changed, as "field: old → new" """
+    return ", ".join(f"{field}: {before} → {after}"
+                     for field, before, after in zip(new._fields, old, new) if before != after)
+
+
+class DeltaRenderer:
+    """
+    Sends repeated list results of a session as a diff against the last one.
+
+    The last parsed snapshot of every list tool is remembered per session. When
+    a new result of the same tool shares at least min_overlap of its rows with
+    that snapshot, the model only gets the added, removed and changed rows and
+    the number of unchanged ones; the unchanged rows are in the earlier result
+    in its history. Otherwise the full result is sent and becomes the new base.
+    """
+
+    def __init__(self, min_overlap: float = 0.5, max_sessions: int = 100):
+        self.min_overlap = min_overlap
+        self.max_sessions = max_sessions
+        # session id -> tool name -> {record key: record}
+        self.snapshots: "OrderedDict[str, Dict[str, Dict[str, Any]]]" = OrderedDict()
+        self.deltas = 0
+
+    def _remember(self, session_id: str, tool_name: str, records: Dict[str, Any]):
+        self.snapshots.setdefault(session_id, {})[tool_name] = records
+        self.snapshots.move_to_end(session_id)
+        while len(self.snapshots) > self.max_sessions:
+            self.snapshots.popitem(last=False)
+
+    def forget(self, session_id: str, tool_name: Optional[str] = None):
+        """Drop the snapshots of a session, e.g. after its history was compacted or a result was trimmed"""
+        if tool_name is None:
+            self.snapshots.pop(session_id, None)
+        else:
+            self.snapshots.get(session_id, {}).pop(tool_name, None)
+
+    def _diff(self, old: Dict[str, Any], new: Dict[str, Any]) -> Tuple[list, list, list, int]:
+        added = [record for key, record in new.items() if key not in old]
+        removed = [record for key, record in old.items() if key not in new]
+        changed = [(old[key], record) for key, record in new.items() if key in old and old[key] != record]
+        unchanged = len(new) - len(added) - len(changed)
+        return added, removed, changed, unchanged
+
+    def _render_diff(self, tool_name: str, parsed: ParsedResult, added, removed, changed, unchanged) -> str:
+        kind = parsed.kind
+        lines = [f"{tool_name}: {len(parsed.records)} {kind}. Only the differences to the previous "
+                 f"{tool_name} result in this conversation are shown; {unchanged} {kind} are unchanged."]
+        if not (added or removed or changed):
+            lines.append("No changes.")
+        if added:
+            lines.append(f"Added ({len(added)}):")
+            lines.extend(format_row(record) for record in added)
+        if changed:
+            lines.append(f"Changed ({len(changed)}):")
+            lines.extend(f"{format_row(new)} [{_changes(old, new)}]" for old, new in changed)
+        if removed:
+            lines.append(f"Removed ({len(removed)}): " + ", ".join(_key(record) for record in removed))
+        return "\n".join(lines)
+
+    def render(self, tool_name: str, text: str, session_id: Optional[str] = None,
+               parsed: Optional[ParsedResult] = None) -> str:
+        """Return text, or a diff against the session's previous result of this tool"""
+        if session_id is None:
+            return text
+        if parsed is None:
+            parsed = parse_tool_text(tool_name, text)
+        if parsed is None or parsed.kind not in _LIST_KINDS or parsed.unparsed:
+            return text
+
+        records = {_key(record): record for record in parsed.records}
+        previous = self.snapshots.get(session_id, {}).get(tool_name)
+        self._remember(session_id, tool_name, records)
+        if previous is None:
+            return text
+
+        added, removed, changed, unchanged = self._diff(previous, records)
+        if unchanged < self.min_overlap * max(len(previous), len(records), 1):
+            return text
+        diff = self._render_diff(tool_name, parsed, added, removed, changed, unchanged)
+        # A diff of a mostly rewritten list can be longer than the list itself
+        if len(diff) >= len(text):
+            return text
+        self.deltas += 1
+        return diff
+
+
+# Global renderer instance
+_delta_renderer = None
+
+
+def get_delta_renderer() -> DeltaRenderer:
+    """Get or create the delta renderer configured from the environment"""
+    global _delta_renderer
+
+    if _delta_renderer is None:
+        _delta_renderer = DeltaRenderer(min_overlap=float(os.getenv("BILLY_DELTA_MIN_OVERLAP", "0.5")))
+    return _delta_renderer
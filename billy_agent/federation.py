@@ -0,0 +1,297 @@
+import asyncio
+import os
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .mcp_client import BillyDkMcpClient, McpServerUnavailable
+
+# OpenAI function names must match ^[a-zA-Z0-9_-]{1,64}$
+_INVALID_TOOL_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_-]")
+_MAX_TOOL_NAME_LENGTH = 64
+
+
+class McpServerConfig:
+    """One MCP server taking part in the federation"""
+
+    def __init__(self, name: str, url: str, namespace: Optional[str] = None):
+        self.name = name
+        self.url = url
+        # Prefix used for this server's tools when it is not the primary server
+        self.namespace = _INVALID_TOOL_NAME_CHARS.sub("_", namespace or name)
+
+    def __repr__(self):
+        return f"McpServerConfig(name={self.name!r}, url={self.url!r})"
+
+
+def load_server_configs() -> List[McpServerConfig]:
+    """
+    Read the federated MCP servers from the environment.
+
+    MCP_SERVERS lists servers as comma-separated name=url pairs, for example
+    "billy=http://localhost:3000,crm=http://localhost:4000". The first server is
+    the primary one and keeps its tool names unprefixed. Without MCP_SERVERS the
+    single MCP_SERVER_URL server is used. Replicas of one server are separated
+    by "|" in MCP_SERVERS, or by "," in MCP_SERVER_URL.
+    """
+    servers = []
+    for entry in os.getenv("MCP_SERVERS", "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, url = entry.partition("=")
+        if not sep or not name.strip() or not url.strip():
+            print(f"⚠️  Ignoring malformed MCP_SERVERS entry: {entry!r}")
+            continue
+        servers.append(McpServerConfig(name.strip(), url.strip()))
+
+    if not servers:
+        servers.append(McpServerConfig("billy", os.getenv("MCP_SERVER_URL", "http://localhost:3000")))
+    return servers
+
+
+class McpFederation:
+    """
+    Merges the tool catalogs of several MCP servers into one namespace.
+
+    Discovery and health checks run concurrently on all servers. Servers that
+    do not answer within the discovery timeout are left pending and retried in
+    the background, so a slow server never holds up agent startup. Every call
+    is routed to the server that owns the tool, through that server's own
+    connection pool.
+    """
+
+    def __init__(self, servers: List[McpServerConfig], discovery_timeout: float = 5.0,
+                 pool_size: int = 10, retry_interval: float = 30.0, strategy: str = "p2c"):
+        if not servers:
+            raise ValueError("McpFederation needs at least one server")
+        self.servers = servers
+        self.discovery_timeout = discovery_timeout
+        self.retry_interval = retry_interval
+        self.clients: Dict[str, BillyDkMcpClient] = {
+            server.name: BillyDkMcpClient(server.url, pool_size=pool_size, strategy=strategy)
+            for server in servers
+        }
+        # exposed tool name -> (server name, tool name on that server)
+        self.catalog: Dict[str, Tuple[str, str]] = {}
+        # exposed tool name -> MCP tool annotations (readOnlyHint, destructiveHint, ...)
+        self.annotations: Dict[str, Dict[str, Any]] = {}
+        self.health: Dict[str, Dict[str, Any]] = {}
+        self.pending = {server.name for server in servers}
+        self._last_attempt = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Set by a HealthProber; its cached state lets calls fail fast
+        self.prober = None
+
+    @property
+    def primary(self) -> McpServerConfig:
+        return self.servers[0]
+
+    def primary_client(self) -> BillyDkMcpClient:
+        return self.clients[self.primary.name]
+
+    async def _check_health(self, server: McpServerConfig):
+        """Record the result of the server's /health endpoint"""
+        started = time.monotonic()
+        try:
+            health = await self.clients[server.name].health()
+            self.health[server.name] = {
+                "status": health.get("status", "unknown"),
+                "connections": health.get("connections"),
+                "latency_ms": round((time.monotonic() - started) * 1000, 1),
+            }
+        except Exception as e:
+            self.health[server.name] = {"status": "down", "error": str(e)}
+
+    async def _discover_server(self, server: McpServerConfig) -> List[Dict[str, Any]]:
+        """Run the health check and tool discovery for one server concurrently"""
+        client = self.clients[server.name]
+
+        async def list_tools():
+            await client.ensure_initialized()
+            return await client.list_tools()
+
+        _, tools_result = await asyncio.gather(self._check_health(server), list_tools())
+        return tools_result.get("tools", [])
+
+    def _exposed_name(self, server: McpServerConfig, tool_name: str) -> str:
+        """Pick a collision-free name for a tool in the merged catalog"""
+        if server is self.primary:
+            candidate = tool_name
+        else:
+            candidate = f"{server.namespace}_{tool_name}"
+        candidate = _INVALID_TOOL_NAME_CHARS.sub("_", candidate)[:_MAX_TOOL_NAME_LENGTH]
+
+        name, suffix = candidate, 2
+        while name in self.catalog:
+            tail = f"_{suffix}"
+            name = candidate[:_MAX_TOOL_NAME_LENGTH - len(tail)] + tail
+            suffix += 1
+        return name
+
+    def _merge(self, server: McpServerConfig, tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add one server's tools to the catalog and return the catalog entries"""
+        entries = []
+        for tool_info in tools:
+            tool_name = tool_info.get("name", "unknown")
+            exposed = self._exposed_name(server, tool_name)
+            self.catalog[exposed] = (server.name, tool_name)
+            if isinstance(tool_info.get("annotations"), dict):
+                self.annotations[exposed] = tool_info["annotations"]
+
+            description = tool_info.get("description", f"Tool: {tool_name}")
+            if server is not self.primary:
+                description = f"[{server.name}] {description}"
+            entries.append({
+                "name": exposed,
+                "description": description,
+                "inputSchema": tool_info.get("inputSchema", {}),
+                "server": server.name,
+                "tool": tool_name,
+            })
+        return entries
+
+    async def discover(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Discover all pending servers concurrently and merge their catalogs.
+
+        Returns the catalog entries added by this call. Entries are merged in
+        server configuration order, so the resulting names do not depend on
+        which server happened to answer first.
+        """
+        timeout = self.discovery_timeout if timeout is None else timeout
+        targets = [server for server in self.servers if server.name in self.pending]
+        if not targets:
+            return []
+
+        self._last_attempt = time.monotonic()
+        tasks = {server.name: asyncio.ensure_future(self._discover_server(server)) for server in targets}
+        _, not_done = await asyncio.wait(tasks.values(), timeout=timeout)
+        for task in not_done:
+            task.cancel()
+
+        entries = []
+        for server in targets:
+            task = tasks[server.name]
+            if task in not_done:
+                print(f"⏳ MCP server '{server.name}' did not answer within {timeout}s, retrying in background")
+                continue
+            if task.exception() is not None:
+                print(f"⚠️  MCP server '{server.name}' discovery failed: {task.exception()}")
+                continue
+            self.pending.discard(server.name)
+            server_entries = self._merge(server, task.result())
+            print(f"🔍 Discovered {len(server_entries)} tools from MCP server '{server.name}'")
+            entries.extend(server_entries)
+        return entries
+
+    def schedule_refresh(self, on_discovered: Callable[[List[Dict[str, Any]]], None]) -> bool:
+        """
+        Retry discovery of pending servers in the background on the running loop.
+
+        on_discovered is called with the new catalog entries. Returns True if a
+        refresh was started; attempts are throttled by retry_interval.
+        """
+        if not self.pending:
+            return False
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return False
+        if time.monotonic() - self._last_attempt < self.retry_interval:
+            return False
+
+        async def refresh():
+            # Nobody is waiting on a background refresh, so allow a full request timeout
+            entries = await self.discover(timeout=max(client.timeout for client in self.clients.values()))
+            if entries:
+                on_discovered(entries)
+
+        self._refresh_task = asyncio.ensure_future(refresh())
+        return True
+
+    def base_name(self, exposed_name: str) -> str:
+        """A tool's name on its own server, e.g. listInvoices for crm_listInvoices"""
+        if exposed_name in self.catalog:
+            return self.catalog[exposed_name][1]
+        # Not discovered (yet): strip the prefix of a configured server, longest first
+        for server in sorted(self.servers[1:], key=lambda server: -len(server.namespace)):
+            prefix = f"{server.namespace}_"
+            if exposed_name.startswith(prefix) and len(exposed_name) > len(prefix):
+                return exposed_name[len(prefix):]
+        return exposed_name
+
+    def sibling_name(self, exposed_name: str, tool_name: str) -> str:
+        """Exposed name of tool_name on the server that owns exposed_name"""
+        if exposed_name in self.catalog:
+            server_name = self.catalog[exposed_name][0]
+            for name, (owner, base) in self.catalog.items():
+                if owner == server_name and base == tool_name:
+                    return name
+        return exposed_name[:len(exposed_name) - len(self.base_name(exposed_name))] + tool_name
+
+    def read_only_hint(self, exposed_name: str) -> Optional[bool]:
+        """The readOnlyHint a tool's server annotated it with, if any"""
+        hint = self.annotations.get(exposed_name, {}).get("readOnlyHint")
+        return hint if isinstance(hint, bool) else None
+
+    def check_available(self, server_name: str):
+        """Raise McpServerUnavailable if the health prober reports the server down"""
+        if self.prober is not None and self.prober.state(server_name) == "down":
+            raise McpServerUnavailable(server_name, self.health.get(server_name, {}).get("error"))
+
+    def server_state(self, exposed_name: str) -> Optional[str]:
+        """Health prober state of the server that owns a tool, if it is probed"""
+        if self.prober is None:
+            return None
+        if exposed_name in self.catalog:
+            return self.prober.state(self.catalog[exposed_name][0])
+        return self.prober.state(self.primary.name) if not self.catalog else None
+
+    async def call_tool(self, exposed_name: str, arguments: Dict[str, Any] = None,
+                        affinity_key: Optional[str] = None, meta: Optional[Dict[str, Any]] = None):
+        """
+        Call a tool from the merged catalog on the server that owns it. Until a
+        server answers discovery, tools are called on the primary server by
+        their bare name (the agent's hardcoded fallback tools).
+        """
+        if exposed_name in self.catalog:
+            server_name, tool_name = self.catalog[exposed_name]
+        elif not self.catalog:
+            server_name, tool_name = self.primary.name, exposed_name
+        else:
+            raise KeyError(f"Unknown federated tool: {exposed_name}")
+        self.check_available(server_name)
+        client = self.clients[server_name]
+        await client.ensure_initialized()
+        return await client.call_tool(tool_name, arguments, affinity_key=affinity_key, meta=meta)
+
+    async def close(self):
+        """Close the connection pools of all servers"""
+        await asyncio.gather(*(client.close() for client in self.clients.values()))
+
+
+# Global federation instance
+_mcp_federation = None
+
+
+def get_mcp_federation() -> McpFederation:
+    """Get or create the MCP federation configured from the environment"""
+    global _mcp_federation
+
+    if _mcp_federation is None:
+        _mcp_federation = McpFederation(
+            load_server_configs(),
+            discovery_timeout=float(os.getenv("MCP_DISCOVERY_TIMEOUT", "5")),
+            pool_size=int(os.getenv("MCP_POOL_SIZE", "10")),
+            strategy=os.getenv("MCP_BALANCER", "p2c"),
+        )
+    return _mcp_federation
+
+
+def base_tool_name(exposed_name: str) -> str:
+    """A federated tool's name on its own server, without its namespace prefix"""
+    return get_mcp_federation().base_name(exposed_name)
+
+
+def sibling_tool_name(exposed_name: str, tool_name: str) -> str:
+    """Exposed name of tool_name on the same server as exposed_name"""
+    return get_mcp_federation().sibling_name(exposed_name, tool_name)
@@ -0,0 +1,198 @@
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, Optional
+
+from .federation import McpFederation, get_mcp_federation
+
+UP = "up"
+DEGRADED = "degraded"
+DOWN = "down"
+UNKNOWN = "unknown"
+
+
+class ServerHealth:
+    """Cached probe results for one MCP server"""
+
+    def __init__(self):
+        self.state = UNKNOWN
+        self.since = time.time()
+        self.last_probe: Optional[float] = None
+        self.latency_ms: Optional[float] = None
+        self.connections: Optional[int] = None
+        self.consecutive_failures = 0
+        self.probes = 0
+        self.failures = 0
+        self.error: Optional[str] = None
+
+    def set_state(self, state: str) -> bool:
+        """Change the state; return whether it changed"""
+        if state == self.state:
+            return False
+        self.state = state
+        self.since = time.time()
+        return True
+
+    def as_dict(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "state": self.state,
+            "state_age_s": round(now - self.since, 1),
+            "last_probe_age_s": round(now - self.last_probe, 1) if self.last_probe else None,
+            "latency_ms": self.latency_ms,
+            "connections": self.connections,
+            "consecutive_failures": self.consecutive_failures,
+            "probes": self.probes,
+            "failures": self.failures,
+            "error": self.error,
+        }
+
+
+class HealthProber:
+    """
+    Polls GET /health of every federated MCP server in the background.
+
+    Each server is tracked as up, degraded or down. A server is degraded when it
+    answers slowly, reports a status other than "ok", reports more open
+    connections than max_connections, or has some replicas down. Tool calls read
+    the cached state, so calls to a server that is down fail immediately instead
+    of waiting for the request timeout. State changes are logged.
+    """
+
+    def __init__(self, federation: McpFederation, interval: float = 15.0, jitter: float = 0.2,
+                 timeout: float = 5.0, degraded_latency_ms: float = 1000.0,
+                 max_connections: Optional[int] = None, failures_to_down: int = 2):
+        self.federation = federation
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.degraded_latency_ms = degraded_latency_ms
+        self.max_connections = max_connections
+        self.failures_to_down = failures_to_down
+        self.servers: Dict[str, ServerHealth] = {name: ServerHealth() for name in federation.clients}
+        self._task: Optional[asyncio.Task] = None
+        self._task_loop: Optional[asyncio.AbstractEventLoop] = None
+        federation.prober = self
+
+    def state(self, server_name: str) -> str:
+        health = self.servers.get(server_name)
+        return health.state if health else UNKNOWN
+
+    def _classify(self, health: Dict[str, Any], latency_ms: float) -> str:
+        if health.get("status") != "ok":
+            return DEGRADED
+        if latency_ms > self.degraded_latency_ms:
+            return DEGRADED
+        if self.max_connections and (health.get("connections") or 0) >= self.max_connections:
+            return DEGRADED
+        replicas = health.get("replicas") or {}
+        if any(replica.get("status") != "ok" for replica in replicas.values()):
+            return DEGRADED
+        return UP
+
+    def _set_state(self, name: str, server: ServerHealth, state: str):
+        previous = server.state
+        # The first probe finding a server up is the normal start, not news
+        if server.set_state(state) and not (previous == UNKNOWN and state == UP):
+            detail = server.error if state == DOWN else f"{server.latency_ms} ms"
+            print(f"🩺 MCP server '{name}' is {state} (was {previous}): {detail}")
+
+    async def _probe_server(self, name: str):
+        """Probe one server and update its cached state"""
+        server = self.servers[name]
+        started = time.monotonic()
+        try:
+            health = await self.federation.clients[name].health(timeout=self.timeout)
+        except Exception as e:
+            server.failures += 1
+            server.consecutive_failures += 1
+            server.error = str(e)
+            if server.consecutive_failures >= self.failures_to_down:
+                self._set_state(name, server, DOWN)
+            self.federation.health[name] = {"status": "down", "error": str(e)}
+        else:
+            server.latency_ms = round((time.monotonic() - started) * 1000, 1)
+            server.connections = health.get("connections")
+            server.consecutive_failures = 0
+            server.error = None
+            self._set_state(name, server, self._classify(health, server.latency_ms))
+            self.federation.health[name] = {
+                "status": health.get("status", "unknown"),
+                "connections": server.connections,
+                "latency_ms": server.latency_ms,
+            }
+        finally:
+            server.probes += 1
+            server.last_probe = time.time()
+
+    async def probe_once(self):
+        """Probe all servers concurrently"""
+        await asyncio.gather(*(self._probe_server(name) for name in self.servers))
+
+    def _next_delay(self) -> float:
+        # Probe more often while something is down, to notice recovery quickly
+        base = self.interval
+        if any(server.state == DOWN for server in self.servers.values()):
+            base = self.interval / 3
+        return base * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe_once()
+            except Exception as e:
+                print(f"⚠️  MCP health probe failed: {e}")
+            await asyncio.sleep(self._next_delay())
+
+    def ensure_started(self) -> bool:
+        """Start probing on the running loop unless already running there"""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task_loop is loop:
+            return False
+        self._task = asyncio.ensure_future(self._run())
+        self._task_loop = loop
+        return True
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Return the cached probe data of every server"""
+        return {name: server.as_dict() for name, server in self.servers.items()}
+
+    def report(self) -> str:
+        """One line of probe data per server, for the console's health command"""
+        lines = []
+        for name, data in self.metrics().items():
+            line = f"{name}: {data['state']} for {data['state_age_s']:.0f}s"
+            if data["latency_ms"] is not None:
+                line += f", {data['latency_ms']} ms"
+            if data["connections"] is not None:
+                line += f", {data['connections']} connections"
+            line += f", {data['probes']} probes, {data['failures']} failures"
+            if data["error"]:
+                line += f" (last error: {data['error']})"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+# Global prober instance
+_health_prober = None
+
+
+def get_health_prober() -> HealthProber:
+    """Get or create the health prober for the global MCP federation"""
+    global _health_prober
+
+    if _health_prober is None:
+        max_connections = int(os.getenv("MCP_HEALTH_MAX_CONNECTIONS", "0"))
+        _health_prober = HealthProber(
+            get_mcp_federation(),
+            interval=float(os.getenv("MCP_HEALTH_INTERVAL", "15")),
+            degraded_latency_ms=float(os.getenv("MCP_HEALTH_DEGRADED_MS", "1000")),
+            max_connections=max_connections or None,
+        )
+    return _health_prober
@@ -0,0 +1,254 @@
+import json
+import os
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from .budget import count_tokens, summarize
+from .context import tool_topic
+from .delta import get_delta_renderer
+from .federation import base_tool_name
+from .parsing import Customer, Deletion, Invoice, InvoiceTotal, ParsedResult, Product, parse_tool_text
+
+
+def _response_text(response: Any) -> str:
+    if isinstance(response, dict) and isinstance(response.get("result"), str):
+        return response["result"]
+    return json.dumps(response, default=str, ensure_ascii=False)
+
+
+def _parsed_response(response: types.FunctionResponse,
+                     results: Dict[str, ParsedResult]) -> Optional[ParsedResult]:
+    """A tool response's records, from its MCP result if it was seen, else from the text the model got"""
+    parsed = results.get(response.id) if response.id else None
+    if parsed is None:
+        parsed = parse_tool_text(base_tool_name(response.name), _response_text(response.response))
+    return parsed
+
+
+def _is_user_message(content: types.Content) -> bool:
+    return content.role == "user" and any(part.text for part in content.parts or ())
+
+
+def split_turns(contents: List[types.Content]) -> List[List[types.Content]]:
+    """Group contents into turns, each starting at a user message"""
+    turns: List[List[types.Content]] = []
+    for content in contents:
+        if not turns or _is_user_message(content):
+            turns.append([])
+        turns[-1].append(content)
+    return turns
+
+
+def contents_tokens(contents: List[types.Content]) -> int:
+    return count_tokens(json.dumps([content.model_dump(mode="json", exclude_none=True) for content in contents],
+                                   ensure_ascii=False))
+
+
+class ConversationMemory:
+    """Structured summary of compacted turns: topic, requests, tool use and entities"""
+
+    def __init__(self, max_items: int = 50):
+        self.max_items = max_items
+        self.turns = 0
+        self.topic: Optional[str] = None
+        self.requests: List[str] = []
+        self.tool_calls: Counter = Counter()
+        self.entities: Dict[str, "OrderedDict[str, str]"] = {
+            "invoices": OrderedDict(), "customers": OrderedDict(), "products": OrderedDict(), "totals": OrderedDict()}
+
+    def _remember(self, kind: str, key: str, value: str):
+        entities = self.entities[kind]
+        entities[key] = value
+        entities.move_to_end(key)
+        while len(entities) > self.max_items:
+            entities.popitem(last=False)
+
+    def _observe_record(self, record: Any):
+        if isinstance(record, Invoice):
+            details = [f"{record.amount:g} {record.currency}", record.state]
+            details += [f"contact {record.contact_id}"] if record.contact_id else []
+            details += [record.entry_date] if record.entry_date else []
+            self._remember("invoices", record.id, ", ".join(details))
+        elif isinstance(record, Customer):
+            self._remember("customers", record.id, record.name)
+        elif isinstance(record, Product):
+            self._remember("products", record.id or record.name, f"{record.name}, {record.price:g} {record.currency}")
+        elif isinstance(record, InvoiceTotal):
+            self._remember("totals", f"{record.start_date}..{record.end_date}", f"{record.amount:g} {record.currency}")
+        elif isinstance(record, Deletion):
+            self._remember("invoices", record.id, "deleted")
+
+    def add_turn(self, turn: List[types.Content], results: Dict[str, ParsedResult] = None):
+        self.turns += 1
+        for content in turn:
+            for part in content.parts or ():
+                if part.text and content.role == "user":
+                    self.requests = (self.requests + [" ".join(part.text.split())[:120]])[-8:]
+                elif part.function_call:
+                    name = base_tool_name(part.function_call.name)
+                    self.tool_calls[name] += 1
+                    self.topic = tool_topic(name) or self.topic
+                    invoice_id = (part.function_call.args or {}).get("id")
+                    if name == "getInvoice" and invoice_id and invoice_id not in self.entities["invoices"]:
+                        self._remember("invoices", str(invoice_id), "viewed")
+                elif part.function_response:
+                    parsed = _parsed_response(part.function_response, results or {})
+                    for record in parsed.records if parsed is not None else ():
+                        self._observe_record(record)
+
+    def render(self) -> str:
+        lines = [f"Memory of the {self.turns} earliest turns of this conversation, which were compacted:"]
+        if self.topic:
+            lines.append(f"Topic of those turns: {self.topic}")
+        if self.requests:
+            lines.append("User asked: " + "; ".join(f'"{request}"' for request in self.requests))
+        if self.tool_calls:
+            lines.append("Tools called: " + ", ".join(f"{name} x{count}" for name, count in self.tool_calls.items()))
+        for kind, entities in self.entities.items():
+            if entities:
+                label = "Invoice totals" if kind == "totals" else f"{kind.capitalize()} mentioned"
+                lines.append(f"{label}: " + "; ".join(f"{key} ({value})" for key, value in entities.items()))
+        lines.append("Their tool results are no longer in the conversation; call the tools again for current data.")
+        return "\n".join(lines)
+
+
+def _stub_part(part: types.Part, results: Dict[str, ParsedResult]) -> types.Part:
+    """A stale tool result reduced to one line"""
+    response = part.function_response
+    parsed = _parsed_response(response, results)
+    detail = summarize(parsed) if parsed is not None and parsed.kind in ("invoices", "customers", "products") \
+        else "details omitted"
+    stub = f"[{response.name} result from an earlier turn; {detail}. Call {response.name} again for current data.]"
+    return types.Part(function_response=types.FunctionResponse(id=response.id, name=response.name,
+                                                               response={"result": stub}))
+
+
+def _stub_turn(turn: List[types.Content], min_tokens: int,
+               results: Dict[str, ParsedResult]) -> List[types.Content]:
+    """The turn with its tool results above min_tokens stubbed"""
+    contents = []
+    for content in turn:
+        parts = []
+        for part in content.parts or ():
+            if part.function_response and count_tokens(_response_text(part.function_response.response)) > min_tokens:
+                parts.append(_stub_part(part, results))
+            else:
+                parts.append(part)
+        contents.append(content.model_copy(update={"parts": parts}))
+    return contents
+
+
+class HistoryCompactor:
+    """
+    Keeps the prompt of long sessions roughly constant in size.
+
+    Before each model call the request's history is measured. Once it is over
+    threshold tokens, large tool results of turns before the last keep_turns are
+    replaced by a one-line stub, and the oldest turns are folded into a
+    ConversationMemory (topic, requests, tools, IDs and amounts seen) sent as
+    one message in their place. The last keep_turns turns are never folded,
+    and only stubbed if they alone exceed the threshold.
+    Where the stubs and the memory start only moves when the threshold is
+    crossed again, so between compactions the prompt prefix stays stable.
+    Stubs and the memory read records from the MCP results the tools saw,
+    not from the table or diff the model got.
+    """
+
+    def __init__(self, threshold: int = 8000, keep_turns: int = 3, stub_tokens: int = 100,
+                 max_sessions: int = 100, max_results: int = 1000):
+        self.threshold = threshold
+        self.keep_turns = keep_turns
+        self.stub_tokens = stub_tokens
+        self.max_sessions = max_sessions
+        self.max_results = max_results
+        # session id -> [turns whose tool results are stubbed, turns folded into memory, memory]
+        self.sessions: "OrderedDict[str, list]" = OrderedDict()
+        # function call id -> records of its MCP result
+        self.results: "OrderedDict[str, ParsedResult]" = OrderedDict()
+        self.compactions = 0
+
+    def observe(self, call_id: Optional[str], tool_name: str, text: str):
+        """Keep the records of a tool call's MCP result, before it is rendered for the model"""
+        parsed = parse_tool_text(base_tool_name(tool_name), text)
+        if call_id is None or parsed is None:
+            return
+        self.results[call_id] = parsed
+        while len(self.results) > self.max_results:
+            self.results.popitem(last=False)
+
+    def _state(self, session_id: str) -> list:
+        state = self.sessions.get(session_id)
+        if state is None:
+            state = self.sessions[session_id] = [0, 0, ConversationMemory()]
+        self.sessions.move_to_end(session_id)
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+        return state
+
+    def _layout(self, turns: List[List[types.Content]], state: list) -> List[List[types.Content]]:
+        """The turns as sent: a memory message, stubbed earlier turns, then verbatim ones"""
+        stubbed, folded, memory = state
+        while memory.turns < folded:
+            memory.add_turn(turns[memory.turns], self.results)
+        layout = [[types.Content(role="user", parts=[types.Part(text=memory.render())])]] if folded else []
+        for index in range(folded, len(turns)):
+            layout.append(_stub_turn(turns[index], self.stub_tokens, self.results) if index < stubbed else turns[index])
+        return layout
+
+    def compact(self, llm_request: LlmRequest, session_id: str):
+        """Compact llm_request.contents in place"""
+        turns = split_turns(llm_request.contents)
+        state = self._state(session_id)
+        if state[1] > len(turns):
+            # The session was rewound; start over
+            state[:] = [0, 0, ConversationMemory()]
+        contents = [content for turn in self._layout(turns, state) for content in turn]
+        before = contents_tokens(contents)
+        if before > self.threshold and len(turns) > 1:
+            # Stub the tool results of turns older than the kept ones, then fold the
+            # oldest turns until the rest fits in half the threshold
+            state[0] = max(state[0], len(turns) - self.keep_turns)
+            sizes = [contents_tokens(turn) for turn in self._layout(turns, state)[1 if state[1] else 0:]]
+            remaining = sum(sizes)
+            for size in sizes:
+                if remaining <= self.threshold // 2 or state[1] >= len(turns) - self.keep_turns:
+                    break
+                remaining -= size
+                state[1] += 1
+            contents = [content for turn in self._layout(turns, state) for content in turn]
+            if contents_tokens(contents) > self.threshold:
+                # The kept turns alone are too large; stub all but the current one
+                state[0] = len(turns) - 1
+                contents = [content for turn in self._layout(turns, state) for content in turn]
+            self.compactions += 1
+            # Diffs must not refer to list results the model no longer sees
+            get_delta_renderer().forget(session_id)
+            print(f"🗜️  Compacted history: {before} → {contents_tokens(contents)} tokens "
+                  f"({state[1]} turns in memory, tool results of {state[0]} turns stubbed)")
+        llm_request.contents = contents
+
+    async def before_model(self, callback_context, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        session = getattr(callback_context, "session", None) if callback_context is not None else None
+        if session is not None and llm_request.contents:
+            self.compact(llm_request, session.id)
+        return None
+
+
+# Global compactor instance
+_history_compactor = None
+
+
+def get_history_compactor() -> HistoryCompactor:
+    """Get or create the history compactor configured from the environment"""
+    global _history_compactor
+
+    if _history_compactor is None:
+        _history_compactor = HistoryCompactor(
+            threshold=int(os.getenv("BILLY_HISTORY_TOKEN_BUDGET", "8000")),
+            keep_turns=int(os.getenv("BILLY_HISTORY_KEEP_TURNS", "3")),
+        )
+    return _history_compactor
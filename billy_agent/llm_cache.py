@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+def _strip_call_ids(value: Any) -> Any:
+    """Drop the per-session ids ADK gives function calls and responses"""
+    if isinstance(value, dict):
+        return {key: _strip_call_ids(item) for key, item in value.items()
+                if not (key == "id" and ("name" in value and ("args" in value or "response" in value)))}
+    if isinstance(value, list):
+        return [_strip_call_ids(item) for item in value]
+    return value
+
+
+def request_key(llm_request: LlmRequest) -> str:
+    """
+    Stable hash of everything that determines the model's answer: the model,
+    the instruction, tool declarations and generation settings (config), and
+    the conversation history including tool calls and results (contents).
+    """
+    config = llm_request.config.model_dump(mode="json", exclude_none=True, exclude={"http_options", "labels"}) \
+        if llm_request.config is not None else {}
+    data = {
+        "model": llm_request.model,
+        "config": config,
+        "contents": [content.model_dump(mode="json", exclude_none=True) for content in llm_request.contents],
+    }
+    canonical = json.dumps(_strip_call_ids(data), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class _MemoryBackend:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, created: float, value: str):
+        self.entries[key] = (created, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class _SqliteBackend:
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS llm_cache "
+                        "(key TEXT PRIMARY KEY, created REAL NOT NULL, used REAL NOT NULL, response TEXT NOT NULL)")
+        self.db.commit()
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        row = self.db.execute("SELECT created, response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self.db.execute("UPDATE llm_cache SET used = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+        return row
+
+    def put(self, key: str, created: float, value: str):
+        self.db.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)", (key, created, created, value))
+        # Evict the least recently used entries beyond max_entries
+        self.db.execute("DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache "
+                        "ORDER BY used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+        self.db.commit()
+
+    def delete(self, key: str):
+        self.db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+        self.db.commit()
+
+    def clear(self):
+        self.db.execute("DELETE FROM llm_cache")
+        self.db.commit()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class LlmResponseCache:
+    """
+    Exact-match cache of final model responses, in front of the LlmAgent's model.
+
+    Requests are keyed by request_key(). A hit returns the stored response from
+    the before-model callback, so the model is not called at all. Only complete,
+    error-free responses are stored. Entries expire after ttl seconds, the
+    least recently used ones are evicted beyond max_entries, and every write
+    tool call clears the cache, since cached answers may describe the old data.
+    """
+
+    def __init__(self, ttl: float = 3600.0, max_entries: int = 1000, path: Optional[str] = None):
+        self.ttl = ttl
+        self.backend = _SqliteBackend(path, max_entries) if path else _MemoryBackend(max_entries)
+        # invocation id -> key of the request waiting for its response
+        self._pending: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, key: str) -> Optional[LlmResponse]:
+        entry = self.backend.get(key)
+        if entry is None:
+            return None
+        created, value = entry
+        if time.time() - created > self.ttl:
+            self.backend.delete(key)
+            return None
+        return LlmResponse.model_validate_json(value)
+
+    def store(self, key: str, llm_response: LlmResponse):
+        if llm_response.partial or llm_response.error_code or llm_response.content is None:
+            return
+        self.backend.put(key, time.time(), llm_response.model_dump_json(exclude_none=True))
+
+    def invalidate(self):
+        self.backend.clear()
+        self.invalidations += 1
+
+    async def before_model(self, callback_context, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        key = request_key(llm_request)
+        cached = self.lookup(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        if callback_context is not None:
+            self._pending[callback_context.invocation_id] = key
+        return None
+
+    async def after_model(self, callback_context, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        if callback_context is None or llm_response.partial:
+            return None
+        key = self._pending.pop(callback_context.invocation_id, None)
+        if key is not None:
+            self.store(key, llm_response)
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.backend),
+                "invalidations": self.invalidations}
+
+
+# Global cache instance; False when disabled
+_llm_cache = None
+
+
+def get_llm_cache() -> Optional[LlmResponseCache]:
+    """Get or create the response cache configured from the environment (None when off)"""
+    global _llm_cache
+
+    if _llm_cache is None:
+        mode = os.getenv("BILLY_LLM_CACHE", "memory").lower()
+        if mode not in ("memory", "sqlite"):
+            _llm_cache = False
+        else:
+            _llm_cache = LlmResponseCache(
+                ttl=float(os.getenv("BILLY_LLM_CACHE_TTL", "3600")),
+                max_entries=int(os.getenv("BILLY_LLM_CACHE_SIZE", "1000")),
+                path=os.getenv("BILLY_LLM_CACHE_PATH", ".billy_llm_cache.sqlite") if mode == "sqlite" else None,
+            )
+    return _llm_cache or None
@@ -0,0 +1,261 @@
+import asyncio
+import time
+import aiohttp
+from typing import Any, Dict, List, Optional, Union
+
+from .balancer import Replica, ReplicaBalancer
+
+
+def normalize_mcp_url(url: str) -> str:
+    """Return the JSON-RPC endpoint for a server URL, appending /mcp if missing"""
+    url = url.strip().rstrip("/")
+    if url.endswith("/mcp"):
+        return url
+    return f"{url}/mcp"
+
+
+def split_replica_urls(urls: Union[str, List[str]]) -> List[str]:
+    """Split a replica list given as "url1,url2" or "url1|url2" into MCP endpoints"""
+    if isinstance(urls, str):
+        urls = urls.replace("|", ",").split(",")
+    return [normalize_mcp_url(url) for url in urls if url.strip()]
+
+
+class McpError(Exception):
+    """JSON-RPC error returned by an MCP server"""
+
+    def __init__(self, error: Any):
+        super().__init__(f"MCP Error: {error}")
+        self.error = error
+
+
+class McpServerUnavailable(Exception):
+    """Raised without contacting a server that health probes report as down"""
+
+    def __init__(self, server_name: str, reason: Optional[str] = None):
+        message = f"MCP server '{server_name}' is currently unavailable"
+        if reason:
+            message += f" ({reason})"
+        super().__init__(message)
+        self.server_name = server_name
+
+
+class BillyDkMcpClient:
+    """
+    Custom Billy.dk MCP client using standard HTTP/JSON-RPC protocol.
+    This follows the official MCP specification, not the custom SSE protocol.
+
+    HTTP connections are pooled per event loop, so a client created during
+    tool discovery can still be used by the loop that later serves tool calls.
+    mcp_url may name several equivalent replicas ("url1,url2" or a list);
+    requests are then balanced across them by a ReplicaBalancer.
+    """
+
+    def __init__(self, mcp_url: Union[str, List[str]] = "http://localhost:3000/mcp", pool_size: int = 10,
+                 timeout: float = 30, strategy: str = "p2c"):
+        self.balancer = ReplicaBalancer(split_replica_urls(mcp_url), strategy=strategy)
+        self.mcp_url = self.balancer.replicas[0].mcp_url
+        self.base_url = self.balancer.replicas[0].base_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._request_id = 1
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def replicas(self) -> List[Replica]:
+        return self.balancer.replicas
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the pooled HTTP session bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            # A session from another (possibly finished) loop cannot be reused
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size * len(self.replicas),
+                limit_per_host=self.pool_size
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._session_loop = loop
+        return self._session
+
+    async def _post(self, replica: Replica, method: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Send one JSON-RPC request to a specific replica"""
+        request_data = {
+            "jsonrpc": "2.0",
+            "id": self._request_id,
+            "method": method,
+            "params": params or {}
+        }
+        self._request_id += 1
+
+        headers = {"Content-Type": "application/json"}
+        if replica.session_id:
+            headers["MCP-Session-Id"] = replica.session_id
+
+        session = self._get_session()
+        async with session.post(
+            replica.mcp_url,
+            headers=headers,
+            json=request_data,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        ) as response:
+            response.raise_for_status()
+            result = await response.json()
+
+            if method == "initialize":
+                replica.session_id = response.headers.get("MCP-Session-Id", replica.session_id)
+
+            if "error" in result:
+                raise McpError(result["error"])
+
+            return result.get("result", {})
+
+    async def _initialize_replica(self, replica: Replica) -> Dict[str, Any]:
+        """Run the MCP initialize handshake against one replica"""
+        # Concurrent first requests to a replica share one handshake
+        if replica.init_future is None or (replica.init_future.done() and not replica.initialized):
+            replica.init_future = asyncio.ensure_future(self._handshake(replica))
+        return await asyncio.shield(replica.init_future)
+
+    async def _handshake(self, replica: Replica) -> Dict[str, Any]:
+        result = await self._post(replica, "initialize", {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {
+                "name": "adk-billy-client",
+                "version": "1.0.0"
+            }
+        })
+        replica.initialized = True
+        return result
+
+    async def _make_request(self, method: str, params: Dict[str, Any] = None,
+                            affinity_key: Optional[str] = None) -> Dict[str, Any]:
+        """Make a JSON-RPC request to the best available replica"""
+        tried = set()
+        while True:
+            replica = self.balancer.choose(affinity_key, exclude=tried)
+            tried.add(replica.mcp_url)
+            # Counted from selection on, so concurrent callers see the load at once
+            started = self.balancer.started(replica)
+            ok = None
+            try:
+                # Replicas other than the first are initialized on first use
+                if not replica.initialized:
+                    await self._initialize_replica(replica)
+                result = await self._post(replica, method, params)
+                ok = True
+                return result
+            except McpError as e:
+                # The replica answered; the error is about the request itself
+                ok = True
+                print(f"❌ Billy.dk MCP request failed: {e}")
+                raise
+            except aiohttp.ClientConnectorError as e:
+                ok = False
+                # The request never reached the replica, so another one may safely take it
+                if len(tried) < len(self.replicas):
+                    continue
+                print(f"❌ Billy.dk MCP request failed: {e}")
+                raise
+            except Exception as e:
+                ok = False
+                print(f"❌ Billy.dk MCP request failed: {e}")
+                raise
+            finally:
+                # ok stays None when the caller cancelled the request
+                self.balancer.finished(replica, started, ok)
+
+    async def initialize(self):
+        """Initialize the MCP session on the first replica that answers"""
+        tried = set()
+        while True:
+            replica = self.balancer.choose(exclude=tried)
+            tried.add(replica.mcp_url)
+            try:
+                result = await self._initialize_replica(replica)
+                print("✅ Billy.dk MCP session initialized")
+                return result
+            except Exception as e:
+                if len(tried) < len(self.replicas):
+                    continue
+                print(f"⚠️  Billy.dk MCP initialization failed: {e}")
+                raise
+
+    async def ensure_initialized(self):
+        """Initialize the MCP session once per client"""
+        if not any(replica.initialized for replica in self.replicas):
+            await self.initialize()
+
+    async def _probe(self, replica: Replica, timeout: float) -> Dict[str, Any]:
+        """Query one replica's GET /health endpoint"""
+        session = self._get_session()
+        started = time.monotonic()
+        async with session.get(
+            f"{replica.base_url}/health",
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            # Servers may answer a degraded state with an error code; the body still says which
+            health = await response.json() if response.content_type == "application/json" else None
+            if not isinstance(health, dict) or "status" not in health:
+                response.raise_for_status()
+                health = dict(health or {})
+        health["latency_ms"] = round((time.monotonic() - started) * 1000, 1)
+        return health
+
+    async def check_replicas(self, timeout: float = 5) -> Dict[str, Dict[str, Any]]:
+        """Probe /health on every replica and eject or restore them accordingly"""
+        results = await asyncio.gather(
+            *(self._probe(replica, timeout) for replica in self.replicas),
+            return_exceptions=True
+        )
+        report = {}
+        for replica, result in zip(self.replicas, results):
+            if isinstance(result, Exception):
+                result = {"status": "down", "error": str(result)}
+            self.balancer.mark_health(replica, result.get("status") == "ok")
+            report[replica.base_url] = result
+        return report
+
+    async def health(self, timeout: float = 5) -> Dict[str, Any]:
+        """
+        Probe all replicas and summarize them like a single /health response.
+
+        The summary carries the status the replicas report ("ok" if any replica
+        is ok); only when no replica answers at all is an exception raised.
+        """
+        report = await self.check_replicas(timeout)
+        # Failed probes are recorded with their error; every other replica answered
+        answered = [health for health in report.values() if "error" not in health]
+        if not answered:
+            raise Exception(f"No MCP replica answered /health: {report}")
+        up = [health for health in answered if health.get("status") == "ok"]
+        summary = dict((up or answered)[0])
+        summary["connections"] = sum(health.get("connections") or 0 for health in answered)
+        if len(report) > 1:
+            summary["replicas"] = report
+        return summary
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any] = None,
+                        affinity_key: Optional[str] = None, meta: Optional[Dict[str, Any]] = None):
+        """Call a specific tool; affinity_key pins related calls to one replica, meta is sent as _meta"""
+        params = {
+            "name": name,
+            "arguments": arguments or {}
+        }
+        if meta:
+            params["_meta"] = meta
+        return await self._make_request("tools/call", params, affinity_key=affinity_key)
+
+    async def list_tools(self):
+        """List available tools"""
+        return await self._make_request("tools/list")
+
+    async def close(self):
+        """Close the pooled HTTP session if it belongs to the running loop"""
+        session, loop = self._session, self._session_loop
+        self._session = None
+        self._session_loop = None
+        if session is not None and not session.closed and loop is asyncio.get_running_loop():
+            await session.close()
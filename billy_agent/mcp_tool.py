@@ -0,0 +1,36 @@
+import copy
+from typing import Any, Callable, Dict, Optional
+
+from google.adk.tools.function_tool import FunctionTool
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+
+from .prompt import canonical_schema
+
+
+class McpFunctionTool(FunctionTool):
+    """
+    FunctionTool for a discovered MCP tool.
+
+    The declaration is the tool's own inputSchema, canonically serialized,
+    instead of one derived from the Python wrapper's signature (which only has
+    **kwargs). All arguments the model sends are passed on to the wrapper.
+    """
+
+    def __init__(self, func: Callable[..., Any], description: str, input_schema: Dict[str, Any]):
+        super().__init__(func)
+        self.description = description
+        schema = canonical_schema(copy.deepcopy(input_schema or {}))
+        schema.setdefault("type", "object")
+        schema.setdefault("properties", {})
+        self.input_schema = schema
+
+    def _get_declaration(self) -> Optional[types.FunctionDeclaration]:
+        return types.FunctionDeclaration(name=self.name, description=self.description,
+                                         parameters_json_schema=copy.deepcopy(self.input_schema))
+
+    async def run_async(self, *, args: Dict[str, Any], tool_context: ToolContext) -> Any:
+        if not self.input_schema["properties"]:
+            # The wrapper of a parameterless tool accepts no arguments
+            args = {}
+        return await self.func(tool_context=tool_context, **args)
@@ -0,0 +1,180 @@
+import asyncio
+import os
+import re
+import time
+from typing import AsyncGenerator, Dict, List, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import PrivateAttr
+
+from .federation import base_tool_name
+from .pool import create_model
+
+TOOL_ROUTE = "tool"
+ANSWER_ROUTE = "answer"
+
+# Questions whose final answer is analysis rather than a lookup
+_ANALYSIS = re.compile(
+    r"\b(compar\w*|versus|vs\.?|trends?|growth|grew|changed?|differen\w*|analy\w*|forecast\w*|why|average|"
+    r"breakdown|year[- ]over[- ]year|month[- ]over[- ]month|quarters?|q[1-4])\b", re.I)
+_PERIOD = re.compile(r"\b(\d{4}-\d{2}(?:-\d{2})?|(?:19|20)\d{2})\b")
+# Tools whose repeated use in one turn means several periods are compared
+_PERIOD_TOOLS = ("totalInvoiceAmount",)
+
+
+def _turn(llm_request: LlmRequest):
+    """The user's text and the tool calls of the current turn"""
+    for index in range(len(llm_request.contents) - 1, -1, -1):
+        content = llm_request.contents[index]
+        if content.role == "user" and content.parts and any(part.text for part in content.parts):
+            text = " ".join(part.text for part in content.parts if part.text)
+            calls = [part.function_call for later in llm_request.contents[index + 1:]
+                     for part in later.parts or () if part.function_call]
+            return text, calls
+    return "", []
+
+
+def needs_analysis(llm_request: LlmRequest) -> bool:
+    """Whether the current turn asks for analysis, e.g. a comparison of several periods"""
+    text, calls = _turn(llm_request)
+    if _ANALYSIS.search(text) or len(set(_PERIOD.findall(text))) >= 3:
+        return True
+    period_calls = [call for call in calls if base_tool_name(call.name) in _PERIOD_TOOLS]
+    return len(period_calls) >= 2
+
+
+def choose_route(llm_request: LlmRequest) -> str:
+    """
+    Tool selection and argument filling go to the tool model. The final answer
+    of a turn that already has tool results goes to the answer model when the
+    turn asks for analysis.
+    """
+    last = llm_request.contents[-1] if llm_request.contents else None
+    has_results = last is not None and any(part.function_response for part in last.parts or ())
+    if has_results and needs_analysis(llm_request):
+        return ANSWER_ROUTE
+    return TOOL_ROUTE
+
+
+def _cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """USD cost from LiteLLM's price table; 0 for models it does not know"""
+    try:
+        import litellm
+
+        prompt_cost, completion_cost = litellm.cost_per_token(
+            model=model, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        return prompt_cost + completion_cost
+    except Exception:
+        return 0.0
+
+
+class RoutedLlm(BaseLlm):
+    """
+    Sends every model call of the agent to the model of its route.
+
+    The tool route (a small, fast model) picks tools and fills arguments and
+    writes plain answers; the answer route (a stronger model) writes the final
+    answer of turns that ask for analysis. Each route has a timeout. When its
+    model fails or times out before producing output, the call falls back to
+    the next model: answer → tool → fallback.
+    """
+
+    tool_model: BaseLlm
+    answer_model: BaseLlm
+    fallback_model: Optional[BaseLlm] = None
+    tool_timeout: float = 20.0
+    answer_timeout: float = 60.0
+    _stats: Dict[str, Dict[str, float]] = PrivateAttr(default_factory=dict)
+
+    @property
+    def capabilities(self):
+        return self.tool_model.capabilities
+
+    def _chain(self, route: str) -> List[BaseLlm]:
+        chain = [self.answer_model, self.tool_model] if route == ANSWER_ROUTE else [self.tool_model]
+        if self.fallback_model is not None:
+            chain.append(self.fallback_model)
+        unique = []
+        for model in chain:
+            if model.model not in [seen.model for seen in unique]:
+                unique.append(model)
+        return unique
+
+    def _record(self, route: str, model: str, started: float, llm_response: Optional[LlmResponse],
+                failed: bool = False):
+        stats = self._stats.setdefault(route, {"calls": 0, "fallbacks": 0, "seconds": 0.0, "prompt_tokens": 0,
+                                               "completion_tokens": 0, "cost": 0.0})
+        if failed:
+            stats["fallbacks"] += 1
+            return
+        stats["calls"] += 1
+        stats["seconds"] += time.perf_counter() - started
+        usage = llm_response.usage_metadata if llm_response is not None else None
+        if usage is not None:
+            prompt, completion = usage.prompt_token_count or 0, usage.candidates_token_count or 0
+            stats["prompt_tokens"] += prompt
+            stats["completion_tokens"] += completion
+            stats["cost"] += _cost(model, prompt, completion)
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        route = choose_route(llm_request)
+        timeout = self.answer_timeout if route == ANSWER_ROUTE else self.tool_timeout
+        chain = self._chain(route)
+        for position, model in enumerate(chain):
+            request = llm_request.model_copy(update={"model": model.model})
+            responses = model.generate_content_async(request, stream=stream)
+            started = time.perf_counter()
+            produced = False
+            final = None
+            try:
+                while True:
+                    try:
+                        llm_response = await asyncio.wait_for(responses.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        break
+                    if not produced and llm_response.error_code and position + 1 < len(chain):
+                        raise RuntimeError(f"{llm_response.error_code}: {llm_response.error_message}")
+                    produced = True
+                    if not llm_response.partial:
+                        final = llm_response
+                    yield llm_response
+            except Exception as e:
+                # Output already sent cannot be taken back
+                if produced or position + 1 == len(chain):
+                    raise
+                self._record(route, model.model, started, None, failed=True)
+                print(f"⚠️  {model.model} failed on the {route} route ({type(e).__name__}: {e}), "
+                      f"falling back to {chain[position + 1].model}")
+                continue
+            finally:
+                await responses.aclose()
+            self._record(route, model.model, started, final)
+            return
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {route: dict(stats) for route, stats in self._stats.items()}
+
+
+def create_billy_model(default_model: str, api_key: Optional[str] = None) -> BaseLlm:
+    """
+    Create the agent's model from the environment: a RoutedLlm over
+    BILLY_TOOL_MODEL and BILLY_ANSWER_MODEL with BILLY_FALLBACK_MODEL behind
+    them, or just the tool model when BILLY_MODEL_ROUTING is off. Each of them
+    may list several comma-separated deployments, which form a ModelPool.
+    """
+    hedge = os.getenv("BILLY_MODEL_HEDGING", "false").lower() in ("1", "true", "yes")
+    tool_model = create_model(os.getenv("BILLY_TOOL_MODEL", default_model), api_key, hedge)
+    if os.getenv("BILLY_MODEL_ROUTING", "true").lower() not in ("1", "true", "yes"):
+        return tool_model
+    fallback = os.getenv("BILLY_FALLBACK_MODEL", "openai/gpt-3.5-turbo")
+    return RoutedLlm(
+        model=tool_model.model,
+        tool_model=tool_model,
+        answer_model=create_model(os.getenv("BILLY_ANSWER_MODEL", "openai/gpt-4o"), api_key, hedge),
+        fallback_model=create_model(fallback, api_key, hedge) if fallback else None,
+        tool_timeout=float(os.getenv("BILLY_TOOL_MODEL_TIMEOUT", "20")),
+        answer_timeout=float(os.getenv("BILLY_ANSWER_MODEL_TIMEOUT", "60")),
+    )
@@ -0,0 +1,546 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from .degraded import is_upstream_failure
+from .federation import base_tool_name, sibling_tool_name
+from .mcp_client import McpError, McpServerUnavailable
+from .parsing import parse_tool_text
+from .results import result_text
+from .tool_kinds import is_write_tool
+
+# Key in a tools/call request's _meta carrying the write's idempotency key
+IDEMPOTENCY_META = "billy/idempotencyKey"
+# Key in the _meta of a result standing in for a write that is still in the outbox
+OUTBOX_META = "billy/outboxKey"
+
+# Create tools whose lost responses are reconciled against the list that shows their records
+RECONCILE_LISTS = {"createInvoice": "listInvoices", "createCustomer": "listCustomers",
+                   "createProduct": "listProducts"}
+# Updates and deletes whose lost responses are reconciled by reading their record back
+RECONCILE_GETS = {"updateInvoice": "getInvoice", "deleteInvoice": "getInvoice",
+                  "updateCustomer": "getCustomer", "deleteCustomer": "getCustomer",
+                  "updateProduct": "getProduct", "deleteProduct": "getProduct"}
+# Tool argument -> field of the parsed list record it must equal
+_RECORD_FIELDS = {"contactId": "contact_id", "amount": "amount", "name": "name", "email": "email",
+                  "price": "price"}
+# An update's arguments can also set the record's state
+_UPDATE_FIELDS = {**_RECORD_FIELDS, "state": "state"}
+_NOT_FOUND = re.compile(r"\bnot found\b|\bdoes not exist\b|\bno such\b", re.I)
+# Arguments a created record must be compared on before it is taken for the lost create's record
+_KEY_ARGUMENTS = {"createInvoice": ("contactId", "amount"), "createCustomer": ("name",),
+                  "createProduct": ("name", "price")}
+
+# Write states; journal events are free-form
+PENDING = "pending"
+SENDING = "sending"
+UNCERTAIN = "uncertain"
+DONE = "done"
+FAILED = "failed"
+OPEN_STATES = (PENDING, SENDING, UNCERTAIN)
+
+
+def _text_result(text: str, meta: Optional[Dict[str, Any]] = None, error: bool = False) -> Dict[str, Any]:
+    result = {"content": [{"type": "text", "text": text}], "isError": error}
+    if meta:
+        result["_meta"] = meta
+    return result
+
+
+def _record_id(record: Any) -> str:
+    return getattr(record, "id", None) or getattr(record, "name", "")
+
+
+def _same(actual: Any, expected: Any) -> bool:
+    if isinstance(actual, float):
+        try:
+            return abs(actual - float(expected)) <= 0.005
+        except (TypeError, ValueError):
+            return False
+    return str(actual).strip().lower() == str(expected).strip().lower()
+
+
+def _matches(record: Any, arguments: Dict[str, Any], keys: Tuple[str, ...],
+             fields: Dict[str, str] = _RECORD_FIELDS) -> Optional[bool]:
+    """
+    Whether a parsed record has every value the call asked for: False if any
+    value differs, None if one of the key arguments could not be compared
+    """
+    compared, unknown = False, not keys or any(argument not in fields for argument in keys)
+    for argument, field in fields.items():
+        actual = getattr(record, field, None)
+        if argument not in arguments or actual is None:
+            unknown = unknown or argument in keys
+            continue
+        if not _same(actual, arguments[argument]):
+            return False
+        compared = True
+    return None if unknown or not compared else True
+
+
+class WriteOutbox:
+    """
+    Durable outbox for write tools (createInvoice, updateInvoice, ...).
+
+    Every write is stored in SQLite with a client-generated idempotency key
+    (one per model tool call) before it is sent, and every step is appended
+    to a journal, so writes survive restarts. A background dispatcher sends
+    them, at most concurrency at a time, with the key in the request's _meta.
+    The caller waits up to ack_timeout for the outcome, or not at all while
+    the server is down; after that it is told the write is queued and the
+    dispatcher finishes it.
+
+    A write that never reached the server (connection refused, server marked
+    down) is sent again. A write whose response was lost (timeout, dropped
+    connection, Billy.dk outage) is uncertain: creates are reconciled against
+    their list, comparing it to the last list result seen before sending
+    (not fetched for each create; see observe), and only sent again if the
+    record is not there. Updates and deletes read their record back and are
+    only sent again if it does not show them; writes that cannot be checked
+    end with an unknown outcome. Errors Billy.dk gives about the request
+    itself fail the write.
+    """
+
+    def __init__(self, call_tool: Optional[Callable[[str, Dict[str, Any], str], Awaitable[Any]]] = None,
+                 path: str = ":memory:", concurrency: int = 2, ack_timeout: float = 10.0,
+                 retry_delay: float = 5.0, max_attempts: int = 5, snapshot_max_age: float = 300.0):
+        self.call_tool = call_tool
+        # Called with (tool name, arguments, result) for writes confirmed after their tool call returned
+        self.on_complete: Optional[Callable[[str, Dict[str, Any], Any], None]] = None
+        self.concurrency = concurrency
+        self.ack_timeout = ack_timeout
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.snapshot_max_age = snapshot_max_age
+        # list tool -> (IDs of its last result, when it was seen)
+        self.lists: Dict[str, Tuple[set, float]] = {}
+        # Write tools the MCP servers provide, and all their tool names (to find the reconcile lists)
+        self.tools = set()
+        self.available = set()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS outbox (key TEXT PRIMARY KEY, tool TEXT NOT NULL, "
+                        "arguments TEXT NOT NULL, session TEXT NOT NULL, state TEXT NOT NULL, "
+                        "attempts INTEGER NOT NULL, snapshot TEXT, result TEXT, created REAL NOT NULL, "
+                        "next_at REAL NOT NULL)")
+        # Append-only; the outbox table is the current state it adds up to
+        self.db.execute("CREATE TABLE IF NOT EXISTS outbox_journal (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                        "key TEXT NOT NULL, at REAL NOT NULL, event TEXT NOT NULL, detail TEXT)")
+        self.db.commit()
+        self._waiters: Dict[str, asyncio.Future] = {}
+        # Writes whose tool call returned before their outcome was known
+        self._detached = set()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._task_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._opened = time.time()
+        self._recovered = False
+        self.reconciled = 0
+        self.resent = 0
+
+    def register(self, tool_name: str) -> bool:
+        """Note a tool of the catalog; write tools go through the outbox"""
+        self.available.add(tool_name)
+        if is_write_tool(tool_name):
+            self.tools.add(tool_name)
+        return tool_name in self.tools
+
+    def handles(self, tool_name: str) -> bool:
+        return self.call_tool is not None and tool_name in self.tools
+
+    def _list_tool(self, tool_name: str) -> Optional[str]:
+        return self._sibling_tool(tool_name, RECONCILE_LISTS)
+
+    def _sibling_tool(self, tool_name: str, tools: Dict[str, str]) -> Optional[str]:
+        """The available tool that reconciles tool_name, on the same server"""
+        sibling = tools.get(base_tool_name(tool_name))
+        if sibling is None:
+            return None
+        sibling = sibling_tool_name(tool_name, sibling)
+        return sibling if sibling in self.available else None
+
+    def observe(self, tool_name: str, result: Any):
+        """
+        Keep the record IDs of a list result, the snapshot a later create of its
+        kind is reconciled against. Creates confirmed since add their record.
+        """
+        base = base_tool_name(tool_name)
+        if base not in RECONCILE_LISTS.values() and base not in RECONCILE_LISTS:
+            return
+        if not isinstance(result, dict) or result.get("isError"):
+            return
+        parsed = parse_tool_text(base, result_text(result))
+        if parsed is None:
+            return
+        ids = {_record_id(record) for record in parsed.records}
+        if base in RECONCILE_LISTS:
+            list_tool = self._list_tool(tool_name)
+            if list_tool in self.lists:
+                self.lists[list_tool][0].update(ids)
+        else:
+            self.lists[tool_name] = (ids, time.time())
+
+    def _known_records(self, list_tool: str) -> Optional[str]:
+        """The last list result seen of list_tool, if recent enough to reconcile a create against"""
+        ids, seen_at = self.lists.get(list_tool, (None, 0.0))
+        if ids is None or time.time() - seen_at > self.snapshot_max_age:
+            return None
+        return json.dumps(sorted(ids))
+
+    def _journal(self, key: str, event: str, detail: Any = None):
+        self.db.execute("INSERT INTO outbox_journal (key, at, event, detail) VALUES (?, ?, ?, ?)",
+                        (key, time.time(), event, json.dumps(detail, default=str) if detail is not None else None))
+
+    def _transition(self, key: str, state: str, event: str, detail: Any = None, **fields):
+        """Change a write's state and journal why, in one transaction"""
+        columns = ", ".join(f"{name} = ?" for name in ["state", *fields])
+        with self.db:
+            self.db.execute(f"UPDATE outbox SET {columns} WHERE key = ?", (state, *fields.values(), key))
+            self._journal(key, event, detail)
+
+    def submit(self, tool_name: str, arguments: Optional[Dict[str, Any]], session_id: str = "",
+               call_id: Optional[str] = None) -> str:
+        """
+        Store a write before sending it. The idempotency key is derived from the
+        model's function call id, so the same tool call submitted again (a retry)
+        keeps its key, while two identical calls remain two writes.
+        """
+        key = uuid.uuid5(uuid.NAMESPACE_URL, f"billy-outbox:{session_id or ''}/{call_id}").hex \
+            if call_id else uuid.uuid4().hex
+        if self.db.execute("SELECT 1 FROM outbox WHERE key = ?", (key,)).fetchone() is not None:
+            print(f"📮 {tool_name} call {call_id} is already in the outbox as {key}")
+            return key
+        encoded = json.dumps(arguments or {}, sort_keys=True, default=str, ensure_ascii=False)
+        now = time.time()
+        with self.db:
+            self.db.execute("INSERT INTO outbox VALUES (?, ?, ?, ?, ?, 0, NULL, NULL, ?, ?)",
+                            (key, tool_name, encoded, session_id or "", PENDING, now, now))
+            self._journal(key, "queued", {"tool": tool_name, "arguments": arguments or {}})
+        if self._wake is not None:
+            self._wake.set()
+        return key
+
+    def status(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self.db.execute("SELECT key, tool, arguments, state, attempts, result, created FROM outbox "
+                              "WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return {"key": row[0], "tool": row[1], "arguments": json.loads(row[2]), "state": row[3],
+                "attempts": row[4], "result": json.loads(row[5]) if row[5] else None, "created": row[6]}
+
+    def journal(self, key: str) -> List[str]:
+        return [event for (event,) in self.db.execute(
+            "SELECT event FROM outbox_journal WHERE key = ? ORDER BY seq", (key,))]
+
+    async def call(self, tool_name: str, arguments: Optional[Dict[str, Any]], session_id: str = "",
+                   call_id: Optional[str] = None, wait: bool = True) -> Any:
+        """
+        Put a write in the outbox and wait up to ack_timeout for its outcome.
+        Without wait (the server is known to be down), or once the write could
+        not be delivered, the queued notice is returned at once.
+        """
+        key = self.submit(tool_name, arguments, session_id, call_id)
+        self.ensure_started()
+        result = await self.wait(key, self.ack_timeout) if wait else self._result(key)
+        if result is not None:
+            return result
+        self._detached.add(key)
+        print(f"📮 {tool_name} not confirmed yet; it stays in the outbox as {key}")
+        return _text_result(
+            f"⏳ {tool_name} is saved in the outbox as write {key}, but Billy.dk has not confirmed it yet. "
+            f"It will be sent and checked in the background, so do not repeat it; "
+            f"getWriteStatus tells whether it went through.", {OUTBOX_META: key})
+
+    def _result(self, key: str) -> Optional[Any]:
+        status = self.status(key)
+        return status["result"] if status is not None and status["state"] not in OPEN_STATES else None
+
+    async def wait(self, key: str, timeout: float) -> Optional[Any]:
+        """
+        The result of a write once it is done or failed, or None if it is still
+        open after timeout or could not be delivered to the server
+        """
+        result = self._result(key)
+        if result is not None:
+            return result
+        waiter = self._waiters.get(key)
+        if waiter is None or waiter.done():
+            waiter = self._waiters[key] = asyncio.get_running_loop().create_future()
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def _finish(self, key: str, tool_name: str, arguments: Dict[str, Any], state: str, event: str, result: Any):
+        self._transition(key, state, event, result_text(result)[:500], result=json.dumps(result, default=str))
+        waiter = self._waiters.pop(key, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(result)
+        if state == DONE:
+            self.observe(tool_name, result)
+        if key in self._detached:
+            self._detached.discard(key)
+            if state == DONE and self.on_complete is not None:
+                self.on_complete(tool_name, arguments, result)
+
+    def _retry(self, key: str, state: str, event: str, detail: Any, attempts: int, tool_name: str,
+               arguments: Dict[str, Any]):
+        if attempts >= self.max_attempts:
+            self._finish(key, tool_name, arguments, FAILED, "gave up", _text_result(
+                f"❌ {tool_name} could not be confirmed after {attempts} attempts ({detail}). "
+                f"Check Billy.dk before repeating it.", error=True))
+            return
+        # Back off linearly with the attempts
+        self._transition(key, state, event, detail, next_at=time.time() + self.retry_delay * max(1, attempts))
+
+    def _undelivered(self, key: str, attempts: int, error: Exception):
+        """Never reached the server, so sending it again cannot duplicate it; keep it until the server is back"""
+        self._transition(key, PENDING, "not delivered", str(error), attempts=attempts,
+                         next_at=time.time() + self.retry_delay)
+        # Do not keep the caller waiting for a server that is down
+        waiter = self._waiters.pop(key, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def _send(self, key: str, tool_name: str, arguments: Dict[str, Any], attempts: int,
+                    snapshot: Optional[str]):
+        list_tool = self._list_tool(tool_name)
+        if list_tool is not None and snapshot is None:
+            # The records that existed before the create, to recognise its record if the response is lost
+            snapshot = self._known_records(list_tool)
+        attempts += 1
+        self._transition(key, SENDING, "sent", {"attempt": attempts}, attempts=attempts, snapshot=snapshot)
+        try:
+            result = await self.call_tool(tool_name, arguments, key)
+        except (McpServerUnavailable, aiohttp.ClientConnectorError) as e:
+            self._undelivered(key, attempts - 1, e)
+            return
+        except McpError as e:
+            self._finish(key, tool_name, arguments, FAILED, "rejected", _text_result(f"❌ {e}", error=True))
+            return
+        except Exception as e:
+            self._retry(key, UNCERTAIN, "no response", f"{type(e).__name__}: {e}", attempts, tool_name, arguments)
+            return
+        if is_upstream_failure(result):
+            self._retry(key, UNCERTAIN, "no response", result_text(result)[:200], attempts, tool_name, arguments)
+        elif isinstance(result, dict) and result.get("isError"):
+            self._finish(key, tool_name, arguments, FAILED, "rejected", result)
+        else:
+            self._finish(key, tool_name, arguments, DONE, "confirmed", result)
+
+    def _unknown_outcome(self, key: str, tool_name: str, arguments: Dict[str, Any], reason: str):
+        self._finish(key, tool_name, arguments, FAILED, "unknown outcome", _text_result(
+            f"❌ {tool_name} got no response{reason}. Check Billy.dk before repeating it.", error=True))
+
+    async def _read_back(self, key: str, tool_name: str, arguments: Dict[str, Any], attempts: int):
+        """Reconcile an update or delete with its record as Billy.dk now has it"""
+        get_tool = self._sibling_tool(tool_name, RECONCILE_GETS)
+        record_id = arguments.get("id")
+        if get_tool is None or not record_id:
+            self._unknown_outcome(key, tool_name, arguments, " and could not be checked")
+            return
+        try:
+            result = await self.call_tool(get_tool, {"id": record_id}, key)
+        except Exception as e:
+            self._retry(key, UNCERTAIN, "reconcile failed", str(e), attempts, tool_name, arguments)
+            return
+        text = result_text(result)
+        deleting = base_tool_name(tool_name).startswith("delete")
+        if is_upstream_failure(result) or (result.get("isError") and not _NOT_FOUND.search(text)):
+            self._retry(key, UNCERTAIN, "reconcile failed", text[:200], attempts, tool_name, arguments)
+            return
+        if result.get("isError"):
+            # The record is gone: deleted by this write, or never there for the update
+            if deleting:
+                self.reconciled += 1
+                self._finish(key, tool_name, arguments, DONE, "reconciled", _text_result(
+                    f"✅ {tool_name} succeeded ({record_id} is gone, checked with {get_tool})"))
+            else:
+                self._finish(key, tool_name, arguments, FAILED, "rejected", result)
+            return
+        if deleting:
+            applied = False
+        else:
+            parsed = parse_tool_text(base_tool_name(get_tool), text)
+            record = parsed.records[0] if parsed is not None and parsed.records else None
+            changes = {argument: value for argument, value in arguments.items() if argument != "id"}
+            applied = _matches(record, changes, tuple(changes), _UPDATE_FIELDS) if record is not None else None
+        if applied is None:
+            self._unknown_outcome(key, tool_name, arguments, f", and {get_tool} does not show whether it was applied")
+        elif applied:
+            self.reconciled += 1
+            self._finish(key, tool_name, arguments, DONE, "reconciled", _text_result(
+                f"✅ {tool_name} succeeded (confirmed with {get_tool}):\n{text}"))
+        else:
+            # The record does not show the write: sending it again cannot apply it twice
+            self.resent += 1
+            self._transition(key, PENDING, "not applied", get_tool, next_at=time.time())
+
+    async def _reconcile(self, key: str, tool_name: str, arguments: Dict[str, Any], attempts: int,
+                         snapshot: Optional[str]):
+        if base_tool_name(tool_name) not in RECONCILE_LISTS:
+            await self._read_back(key, tool_name, arguments, attempts)
+            return
+        list_tool = self._list_tool(tool_name)
+        if list_tool is None:
+            # Sending a create again could duplicate it
+            self._unknown_outcome(key, tool_name, arguments, " and could not be checked")
+            return
+        try:
+            result = await self.call_tool(list_tool, {}, key)
+            parsed = parse_tool_text(base_tool_name(list_tool), result_text(result)) \
+                if not result.get("isError") else None
+            if parsed is None:
+                raise RuntimeError(result_text(result) or f"{list_tool} returned text in an unknown format")
+        except Exception as e:
+            self._retry(key, UNCERTAIN, "reconcile failed", str(e), attempts, tool_name, arguments)
+            return
+        self.observe(list_tool, result)
+        # Without a snapshot every record might be new
+        before = set(json.loads(snapshot)) if snapshot is not None else set()
+        keys = _KEY_ARGUMENTS.get(base_tool_name(tool_name), ())
+        new = [record for record in parsed.records if _record_id(record) not in before]
+        outcomes = [_matches(record, arguments, keys) for record in new]
+        created = [record for record, matches in zip(new, outcomes) if matches]
+        if created and snapshot is None:
+            # A matching record, but nothing tells whether it existed before the create
+            self._unknown_outcome(key, tool_name, arguments, f", and {list_tool} already has a matching record "
+                                  f"({_record_id(created[0])}) that may or may not be this one")
+        elif created:
+            self.reconciled += 1
+            print(f"📮 {tool_name} {key} went through despite the lost response ({_record_id(created[0])})")
+            lines = [line for line in result_text(result).splitlines() if _record_id(created[0]) in line]
+            self._finish(key, tool_name, arguments, DONE, "reconciled", _text_result(
+                f"✅ {tool_name} succeeded (confirmed from {list_tool}):\n" + "\n".join(lines[:1])))
+        elif None in outcomes:
+            # A new record that may be this create's could not be compared with it
+            self._unknown_outcome(key, tool_name, arguments,
+                                  f", and {list_tool} shows a new record that could not be compared with it")
+        else:
+            # Not created: sending it again cannot duplicate it
+            self.resent += 1
+            self._transition(key, PENDING, "not found", list_tool, next_at=time.time())
+
+    async def _process(self, key: str, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            row = self.db.execute("SELECT tool, arguments, state, attempts, snapshot FROM outbox WHERE key = ?",
+                                  (key,)).fetchone()
+            if row is None or row[2] not in (PENDING, UNCERTAIN):
+                return
+            tool_name, arguments, state, attempts, snapshot = row
+            arguments = json.loads(arguments)
+            if state == UNCERTAIN:
+                await self._reconcile(key, tool_name, arguments, attempts, snapshot)
+            else:
+                await self._send(key, tool_name, arguments, attempts, snapshot)
+
+    def _due(self) -> List[str]:
+        return [key for (key,) in self.db.execute(
+            "SELECT key FROM outbox WHERE state IN (?, ?) AND next_at <= ? ORDER BY created",
+            (PENDING, UNCERTAIN, time.time()))]
+
+    def _next_due(self) -> Optional[float]:
+        row = self.db.execute("SELECT MIN(next_at) FROM outbox WHERE state IN (?, ?)",
+                              (PENDING, UNCERTAIN)).fetchone()
+        return row[0] if row else None
+
+    def recover(self):
+        """
+        After a restart, writes that were being sent have an unknown outcome.
+        Open writes from an earlier process that no conversation made (direct
+        calls without an ADK session, such as scripts and tests) are not
+        replayed: nobody is left to hear their outcome.
+        """
+        if self._recovered:
+            return
+        self._recovered = True
+        for (key,) in self.db.execute(
+                f"SELECT key FROM outbox WHERE session = '' AND created < ? "
+                f"AND state IN ({', '.join('?' * len(OPEN_STATES))})", (self._opened, *OPEN_STATES)).fetchall():
+            self._transition(key, FAILED, "abandoned", "no session to report to",
+                             result=json.dumps(_text_result("❌ Abandoned after a restart", error=True)))
+        for (key,) in self.db.execute("SELECT key FROM outbox WHERE state = ?", (SENDING,)).fetchall():
+            self._transition(key, UNCERTAIN, "recovered", None, next_at=time.time())
+
+    async def _run(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        self.recover()
+        while True:
+            self._wake.clear()
+            for key in self._due():
+                running = self._running.get(key)
+                if running is None or running.done():
+                    task = self._running[key] = asyncio.ensure_future(self._process(key, semaphore))
+                    task.add_done_callback(lambda _: self._wake.set())
+            # Writes due now are all running, and wake the loop when they finish
+            next_due = self._next_due()
+            delay = next_due - time.time() if next_due is not None and next_due > time.time() else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def ensure_started(self) -> bool:
+        """Start the dispatcher on the running loop unless already running there"""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task_loop is loop:
+            return False
+        self._wake = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+        self._task_loop = loop
+        return True
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        states = dict(self.db.execute("SELECT state, COUNT(*) FROM outbox GROUP BY state").fetchall())
+        return {"states": states, "reconciled": self.reconciled, "resent": self.resent}
+
+
+# Global outbox instance
+_write_outbox = None
+
+
+def get_write_outbox() -> WriteOutbox:
+    """Get or create the write outbox configured from the environment"""
+    global _write_outbox
+
+    if _write_outbox is None:
+        _write_outbox = WriteOutbox(
+            path=os.getenv("BILLY_OUTBOX_PATH", ".billy_outbox.sqlite"),
+            concurrency=int(os.getenv("BILLY_OUTBOX_CONCURRENCY", "2")),
+            ack_timeout=float(os.getenv("BILLY_OUTBOX_ACK_TIMEOUT", "10")),
+            retry_delay=float(os.getenv("BILLY_OUTBOX_RETRY_DELAY", "5")),
+            snapshot_max_age=float(os.getenv("BILLY_OUTBOX_SNAPSHOT_MAX_AGE", "300")),
+        )
+    return _write_outbox
+
+
+async def get_write_status(key: str) -> str:
+    """
+    Tell whether a write that was saved in the outbox has gone through to Billy.dk.
+
+    Args:
+        key: The write's key, given when it was saved in the outbox.
+    """
+    status = get_write_outbox().status(key.strip())
+    if status is None:
+        return f"❌ Error: no write {key} in the outbox"
+    if status["state"] in OPEN_STATES:
+        return (f"⏳ {status['tool']} ({key}) is still {status['state']} after {status['attempts']} "
+                f"attempt(s); it will be sent and checked again in the background.")
+    text = result_text(status["result"])
+    return text if status["state"] == DONE else f"❌ {status['tool']} ({key}) failed: {text}"
+
+
+get_write_status.__name__ = "getWriteStatus"
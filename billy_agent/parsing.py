@@ -0,0 +1,218 @@
+import re
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+
+class Invoice(NamedTuple):
+    id: str
+    amount: float
+    currency: str
+    state: str
+    contact_id: Optional[str] = None
+    entry_date: Optional[str] = None
+
+
+class Customer(NamedTuple):
+    id: str
+    name: str
+    email: Optional[str] = None
+
+
+class Product(NamedTuple):
+    name: str
+    price: float
+    currency: str
+    id: Optional[str] = None
+
+
+class InvoiceTotal(NamedTuple):
+    start_date: str
+    end_date: str
+    amount: float
+    currency: str
+    count: Optional[int] = None
+
+
+class Deletion(NamedTuple):
+    id: str
+
+
+class ParsedResult(NamedTuple):
+    """Typed records parsed from one tool's text output"""
+    kind: str
+    records: list
+    # Count announced by a "Found N ..." header, if any
+    declared_count: Optional[int] = None
+    # Lines that looked like records but matched no known format
+    unparsed: Tuple[str, ...] = ()
+
+
+_AMOUNT = r"(-?[\d.,]+)\s*([A-Z]{3})"
+_BULLET = r"^[ \t]*[•*-][ \t]*"
+
+_FOUND_HEADER = re.compile(r"^Found (\d+) (invoices?|customers?|products?):?[ \t]*$", re.M)
+_INVOICE_LINE = re.compile(
+    _BULLET + r"Invoice #?([^\s:]+):[ \t]*" + _AMOUNT + r"[ \t]*-[ \t]*(?:Status:[ \t]*)?(\w+)[ \t]*(.*?)[ \t]*$",
+    re.M)
+_CUSTOMER_LINE = re.compile(
+    _BULLET + r"(.+?)[ \t]*\((?:ID:[ \t]*)?([^()]+?)\)(?:[ \t]*-[ \t]*(\S+@\S+))?[ \t]*$", re.M)
+_PRODUCT_LINE = re.compile(
+    _BULLET + r"(.+?):[ \t]*" + _AMOUNT + r"(?:[ \t]*\(ID:[ \t]*([^)]+)\))?[ \t]*$", re.M)
+
+_INVOICE_DETAIL = re.compile(r"^Invoice #?([^\s:]+):\s*" + _AMOUNT + r"\s*-\s*(?:Status:\s*)?(\w+)")
+_DETAIL_FIELD = re.compile(r"^([A-Za-z][A-Za-z ]*?):\s*(.+?)\s*$", re.M)
+_TAIL_DATE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+_TAIL_CONTACT = re.compile(r"[Cc]ontact:?\s*([^\s,)]+)")
+
+_TOTAL = re.compile(
+    r"Total invoice amount from (\d{4}-\d{2}-\d{2}) to (\d{4}-\d{2}-\d{2}):\s*" + _AMOUNT
+    + r"(?:\s*\((\d+) invoices?\))?")
+_INVOICE_SAVED = re.compile(
+    r"Invoice (?:created|updated) successfully!\s*Invoice #?([^\s:]+):\s*" + _AMOUNT
+    + r"\s*-\s*(?:Status:\s*)?(\w+)")
+_CUSTOMER_CREATED = re.compile(r"Customer created successfully!\s*Customer:\s*(.+?)\s*\(ID:\s*([^)]+)\)")
+_PRODUCT_CREATED = re.compile(
+    r"Product created successfully!\s*Product:\s*(.+?)\s*-\s*Price:\s*" + _AMOUNT + r"\s*\(ID:\s*([^)]+)\)")
+_INVOICE_DELETED = re.compile(r"Invoice #?(\S+) deleted successfully")
+
+
+# 1,000 / 1.000.000 / 1,000.50 (English) or 1.000,50 (Danish); a lone separator before exactly three digits groups
+_GROUPED_AMOUNT = re.compile(r"-?\d{1,3}(?:([.,])\d{3})(?:\1\d{3})*(?:(?!\1)[.,]\d+)?")
+
+
+def _amount(text: str) -> float:
+    """Parse 1000, 1000.50, 1,000, 1.000, 1,000.50 or 1.000,50; raise ValueError for other formats"""
+    grouped = _GROUPED_AMOUNT.fullmatch(text)
+    if grouped:
+        text = text.replace(grouped.group(1), "")
+    return float(text.replace(",", "."))
+
+
+def _invoice_from_line(invoice_id, amount, currency, state, tail) -> Invoice:
+    contact_id = entry_date = None
+    if tail:
+        date = _TAIL_DATE.search(tail)
+        contact = _TAIL_CONTACT.search(tail)
+        entry_date = date.group(1) if date else None
+        contact_id = contact.group(1) if contact else None
+    return Invoice(invoice_id, _amount(amount), currency, state, contact_id, entry_date)
+
+
+def _customer_from_line(name, customer_id, email) -> Customer:
+    return Customer(customer_id, name, email or None)
+
+
+def _product_from_line(name, price, currency, product_id) -> Product:
+    return Product(name, _amount(price), currency, product_id or None)
+
+
+def _parse_list(text: str, kind: str, pattern: "re.Pattern", build: Callable) -> Optional[ParsedResult]:
+    """Parse a "Found N ...:" bullet list in a single regex scan"""
+    header = _FOUND_HEADER.search(text)
+    body = text[header.end():] if header else text
+    records = [build(*groups) for groups in pattern.findall(body)]
+    declared = int(header.group(1)) if header else None
+    if not records and not header:
+        return None
+
+    unparsed: Tuple[str, ...] = ()
+    bullets = body.count("•")
+    if bullets and bullets != len(records):
+        # Some bullet lines have an unknown format; find them (slow path, rare)
+        unparsed = tuple(line.strip() for line in body.splitlines()
+                         if line.strip().startswith("•") and not pattern.match(line))
+    return ParsedResult(kind, records, declared, unparsed)
+
+
+def parse_invoice_list(text: str) -> Optional[ParsedResult]:
+    return _parse_list(text, "invoices", _INVOICE_LINE, _invoice_from_line)
+
+
+def parse_customer_list(text: str) -> Optional[ParsedResult]:
+    return _parse_list(text, "customers", _CUSTOMER_LINE, _customer_from_line)
+
+
+def parse_product_list(text: str) -> Optional[ParsedResult]:
+    return _parse_list(text, "products", _PRODUCT_LINE, _product_from_line)
+
+
+def parse_invoice_detail(text: str) -> Optional[ParsedResult]:
+    """Parse getInvoice output: a header line followed by "Field: value" lines"""
+    match = _INVOICE_DETAIL.search(text)
+    if not match:
+        return None
+    fields = {key.lower(): value for key, value in _DETAIL_FIELD.findall(text[match.end():])}
+    invoice = Invoice(match.group(1), _amount(match.group(2)), match.group(3), match.group(4),
+                      fields.get("contact") or fields.get("contact id"),
+                      fields.get("entry date") or fields.get("date"))
+    return ParsedResult("invoice", [invoice])
+
+
+def parse_invoice_total(text: str) -> Optional[ParsedResult]:
+    match = _TOTAL.search(text)
+    if not match:
+        return None
+    start, end, amount, currency, count = match.groups()
+    return ParsedResult("total", [InvoiceTotal(start, end, _amount(amount), currency,
+                                               int(count) if count else None)])
+
+
+def parse_invoice_saved(text: str) -> Optional[ParsedResult]:
+    match = _INVOICE_SAVED.search(text)
+    if not match:
+        return None
+    invoice_id, amount, currency, state = match.groups()
+    return ParsedResult("invoice", [Invoice(invoice_id, _amount(amount), currency, state)])
+
+
+def parse_customer_created(text: str) -> Optional[ParsedResult]:
+    match = _CUSTOMER_CREATED.search(text)
+    if not match:
+        return None
+    return ParsedResult("customer", [Customer(match.group(2).strip(), match.group(1))])
+
+
+def parse_product_created(text: str) -> Optional[ParsedResult]:
+    match = _PRODUCT_CREATED.search(text)
+    if not match:
+        return None
+    name, price, currency, product_id = match.groups()
+    return ParsedResult("product", [Product(name, _amount(price), currency, product_id.strip())])
+
+
+def parse_invoice_deleted(text: str) -> Optional[ParsedResult]:
+    match = _INVOICE_DELETED.search(text)
+    if not match:
+        return None
+    return ParsedResult("deleted", [Deletion(match.group(1))])
+
+
+# Billy.dk tool name -> parser for its text output
+PARSERS: Dict[str, Callable[[str], Optional[ParsedResult]]] = {
+    "listInvoices": parse_invoice_list,
+    "listCustomers": parse_customer_list,
+    "listProducts": parse_product_list,
+    "getInvoice": parse_invoice_detail,
+    "totalInvoiceAmount": parse_invoice_total,
+    "createInvoice": parse_invoice_saved,
+    "updateInvoice": parse_invoice_saved,
+    "createCustomer": parse_customer_created,
+    "createProduct": parse_product_created,
+    "deleteInvoice": parse_invoice_deleted,
+}
+
+
+def parse_tool_text(tool_name: str, text: str) -> Optional[ParsedResult]:
+    """
+    Parse a Billy.dk tool's human-readable output into typed records.
+
+    Returns None for tools without a parser and for text in a format the
+    parser does not recognize (e.g. error messages), so callers can fall back
+    to the original text.
+    """
+    parser = PARSERS.get(tool_name)
+    if parser is None or not text:
+        return None
+    try:
+        return parser(text)
+    except ValueError:
+        return None
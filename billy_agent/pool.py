@@ -0,0 +1,240 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.lite_llm import LiteLlm, LiteLLMClient
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import PrivateAttr
+
+from .scheduler import ScheduledLiteLLMClient, get_llm_scheduler, is_rate_limit
+from .speculation import SpeculativeLiteLLMClient, get_speculative_dispatcher
+
+
+class MockLlm(BaseLlm):
+    """Local stand-in for a deployment: answers text after delay seconds, failing at error_rate"""
+    delay: float = 0.0
+    error_rate: float = 0.0
+    text: str = "OK"
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.delay)
+        if random.random() < self.error_rate:
+            raise ConnectionError(f"{self.model}: simulated failure")
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=self.text)]))
+
+
+def create_deployment(spec: str, api_key: Optional[str] = None) -> BaseLlm:
+    """
+    Create one deployment from its name. "mock/<name>?delay=0.5&error_rate=0.1"
+    is a MockLlm; anything else is a LiteLLM model name. The OpenAI key is only
+    passed to openai/ models; other providers read their own environment.
+    Unless BILLY_LLM_SCHEDULER is off, calls are admitted by the scheduler of
+    their API key (or provider), and unless BILLY_SPECULATIVE_TOOLS is off,
+    streamed tool calls are started speculatively.
+    """
+    if spec.startswith("mock/"):
+        name, _, query = spec.partition("?")
+        return MockLlm(model=name, **{key: float(value) if key != "text" else value
+                                      for key, value in parse_qsl(query)})
+    api_key = api_key if spec.startswith("openai/") else None
+    client = LiteLLMClient()
+    if os.getenv("BILLY_LLM_SCHEDULER", "true").lower() in ("1", "true", "yes"):
+        client = ScheduledLiteLLMClient(get_llm_scheduler(api_key or spec.split("/")[0]))
+    if os.getenv("BILLY_SPECULATIVE_TOOLS", "true").lower() in ("1", "true", "yes"):
+        client = SpeculativeLiteLLMClient(client, get_speculative_dispatcher())
+    return LiteLlm(model=spec, api_key=api_key, llm_client=client)
+
+
+class Deployment:
+    """Rolling latency and error statistics of one deployment"""
+
+    def __init__(self, llm: BaseLlm, window: int = 50):
+        self.llm = llm
+        # Seconds to the first response of recent successful calls
+        self.latencies: deque = deque(maxlen=window)
+        # True for each recent failed call
+        self.failures: deque = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.llm.model
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.failures.append(False)
+        self.consecutive_failures = 0
+
+    def record_failure(self, cooldown: float):
+        self.failures.append(True)
+        self.consecutive_failures += 1
+        if cooldown:
+            self.cooldown_until = time.monotonic() + cooldown
+
+    def error_rate(self) -> float:
+        return sum(self.failures) / len(self.failures) if self.failures else 0.0
+
+    def mean_latency(self) -> Optional[float]:
+        return sum(self.latencies) / len(self.latencies) if self.latencies else None
+
+    def p95(self, min_samples: int = 5) -> Optional[float]:
+        if len(self.latencies) < min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+
+class ModelPool(BaseLlm):
+    """
+    Several deployments of a model, behind one BaseLlm.
+
+    Each call goes to the fastest healthy deployment by rolling mean latency
+    (deployments without samples are tried first, to measure them), preferring
+    deployments whose rolling error rate is at most max_error_rate. A
+    deployment that fails max_failures times in a row, or is rate limited, is
+    cooled down for cooldown seconds. A call that fails before producing output
+    moves on to the next deployment. With hedge on, a second request is sent to
+    the next deployment once the first is past its p95 latency; the first
+    response wins and the other request is cancelled.
+    """
+
+    deployments: List[BaseLlm]
+    hedge: bool = False
+    # Never hedge sooner than this, so fast deployments are not doubled up
+    hedge_min_delay: float = 0.5
+    max_failures: int = 3
+    # Deployments failing more often are only used when the others fail too
+    max_error_rate: float = 0.5
+    cooldown: float = 30.0
+    window: int = 50
+    _states: List[Deployment] = PrivateAttr(default_factory=list)
+    _hedges: int = PrivateAttr(default=0)
+
+    def model_post_init(self, __context: Any):
+        self._states = [Deployment(llm, self.window) for llm in self.deployments]
+
+    @property
+    def capabilities(self):
+        return self.deployments[0].capabilities
+
+    def ranked(self) -> List[Deployment]:
+        """Healthy deployments fastest first, then cooling ones by when they recover"""
+        now = time.monotonic()
+        healthy = [state for state in self._states if state.healthy(now)]
+        healthy.sort(key=lambda state: (state.error_rate() > self.max_error_rate, state.mean_latency() or 0.0))
+        cooling = sorted((state for state in self._states if not state.healthy(now)),
+                         key=lambda state: state.cooldown_until)
+        return healthy + cooling
+
+    def _failed(self, state: Deployment, error: Exception):
+        rate_limited = is_rate_limit(error)
+        cooldown = self.cooldown if rate_limited or state.consecutive_failures + 1 >= self.max_failures else 0.0
+        state.record_failure(cooldown)
+        print(f"⚠️  Model deployment {state.name} failed ({type(error).__name__}: {error})"
+              + (f", cooling down for {cooldown:.0f}s" if cooldown else ""))
+
+    async def _open(self, state: Deployment, llm_request: LlmRequest,
+                    stream: bool) -> Tuple[Deployment, AsyncGenerator[LlmResponse, None], LlmResponse]:
+        """Start a call on one deployment and wait for its first response"""
+        request = llm_request.model_copy(update={"model": state.name})
+        responses = state.llm.generate_content_async(request, stream=stream)
+        started = time.perf_counter()
+        try:
+            first = await responses.__anext__()
+            if first.error_code:
+                raise RuntimeError(f"{first.error_code}: {first.error_message}")
+        except asyncio.CancelledError:
+            # Lost a hedged race; it was at least this slow
+            state.latencies.append(time.perf_counter() - started)
+            await responses.aclose()
+            raise
+        except StopAsyncIteration:
+            self._failed(state, RuntimeError("no response"))
+            raise RuntimeError(f"{state.name} returned no response")
+        except Exception as e:
+            await responses.aclose()
+            self._failed(state, e)
+            raise
+        state.record_success(time.perf_counter() - started)
+        return state, responses, first
+
+    async def _race(self, candidates: List[Deployment], llm_request: LlmRequest, stream: bool):
+        """First response of the next candidate, hedged with the one after it if slow"""
+        primary = candidates.pop(0)
+        tasks = {asyncio.ensure_future(self._open(primary, llm_request, stream))}
+        hedge_after = primary.p95() if self.hedge and candidates else None
+        if hedge_after is not None:
+            done, _ = await asyncio.wait(tasks, timeout=max(hedge_after, self.hedge_min_delay))
+            if not done:
+                self._hedges += 1
+                tasks.add(asyncio.ensure_future(self._open(candidates.pop(0), llm_request, stream)))
+
+        winner = None
+        error = None
+        try:
+            while tasks and winner is None:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None:
+                        winner = task.result()
+                    else:
+                        # Both answered at once; drop the second
+                        await task.result()[1].aclose()
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        return winner, error
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        candidates = self.ranked()
+        error = None
+        while candidates:
+            winner, error = await self._race(candidates, llm_request, stream)
+            if winner is None:
+                continue
+            state, responses, first = winner
+            try:
+                yield first
+                async for llm_response in responses:
+                    yield llm_response
+            except Exception as e:
+                self._failed(state, e)
+                raise
+            finally:
+                await responses.aclose()
+            return
+        raise error or RuntimeError("no model deployment configured")
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        deployments = {
+            state.name: {"error_rate": round(state.error_rate(), 3), "mean_latency": state.mean_latency(),
+                         "p95": state.p95(), "healthy": state.healthy(now)}
+            for state in self._states
+        }
+        return {"deployments": deployments, "hedges": self._hedges}
+
+
+def create_model(spec: str, api_key: Optional[str] = None, hedge: bool = False) -> BaseLlm:
+    """A single deployment, or a ModelPool for a comma-separated list of deployments"""
+    names = [name.strip() for name in spec.split(",") if name.strip()]
+    if len(names) == 1:
+        return create_deployment(names[0], api_key)
+    return ModelPool(model=names[0], deployments=[create_deployment(name, api_key) for name in names], hedge=hedge)
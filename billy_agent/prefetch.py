@@ -0,0 +1,190 @@
+import asyncio
+import json
+import os
+import time
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .context import tool_topic
+from .federation import base_tool_name
+from .parsing import parse_tool_text
+from .results import result_text
+from .tool_kinds import is_read_only_tool
+
+# Usual next tool after each tool, with its prior probability, until enough calls were seen
+STATIC_TRANSITIONS = {
+    "listInvoices": {"getInvoice": 0.6},
+    "createInvoice": {"getInvoice": 0.4, "listInvoices": 0.3},
+}
+# Weight of a static rule, in observed calls
+PRIOR_WEIGHT = 5
+
+
+def _canonical(arguments: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(arguments or {}, sort_keys=True, default=str, ensure_ascii=False)
+
+
+def _failed(result: Any) -> bool:
+    return isinstance(result, dict) and bool(result.get("isError"))
+
+
+class Prefetcher:
+    """
+    Warms a short-lived cache with the tool calls likely to come next.
+
+    Transitions between consecutive tool calls of a session are counted per
+    deployment, starting from STATIC_TRANSITIONS as priors. After a tool
+    returns, every read-only tool whose transition probability is at least
+    min_probability is called in the background: without arguments if it takes
+    none, or once for each of the first max_ids IDs in the result if it takes
+    one ID. At most max_concurrent prefetches run at once; more are skipped.
+    The next call with the same tool and arguments takes the prefetched result
+    (or awaits the one still running) instead of calling the MCP server. Any
+    write drops everything prefetched before it, and unused results expire
+    after ttl.
+    """
+
+    def __init__(self, call_tool: Optional[Callable[[str, Dict[str, Any], Optional[str]], Awaitable[Any]]] = None,
+                 min_probability: float = 0.3, max_concurrent: int = 3, max_ids: int = 3, ttl: float = 30.0,
+                 max_sessions: int = 1000):
+        # Called with the tool name, its arguments and the session id
+        self.call_tool = call_tool
+        self.min_probability = min_probability
+        self.max_concurrent = max_concurrent
+        self.max_ids = max_ids
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.schemas: Dict[str, Dict[str, Any]] = {}
+        self.transitions: Dict[str, Counter] = defaultdict(Counter)
+        # session id -> the last tool it called
+        self.last_tool: "OrderedDict[str, str]" = OrderedDict()
+        # (tool name, canonical arguments) -> (task, started)
+        self.entries: Dict[Tuple[str, str], Tuple[asyncio.Task, float]] = {}
+        self.prefetched = 0
+        self.hits = 0
+        self.wasted = 0
+        self.skipped = 0
+
+    def register(self, tool_name: str, schema: Optional[Dict[str, Any]]):
+        self.schemas[tool_name] = schema or {}
+
+    def probability(self, tool_name: str, next_tool: str) -> float:
+        """Chance that next_tool is called after tool_name, from the counts and the static rule"""
+        seen = self.transitions.get(tool_name) or Counter()
+        prior = STATIC_TRANSITIONS.get(base_tool_name(tool_name), {}).get(base_tool_name(next_tool), 0.0)
+        return (seen[next_tool] + prior * PRIOR_WEIGHT) / (sum(seen.values()) + PRIOR_WEIGHT)
+
+    def predict(self, tool_name: str) -> List[Tuple[str, float]]:
+        """Read-only tools likely to be called next, most likely first"""
+        candidates = []
+        for next_tool in self.schemas:
+            if not is_read_only_tool(next_tool):
+                continue
+            probability = self.probability(tool_name, next_tool)
+            if probability >= self.min_probability:
+                candidates.append((next_tool, probability))
+        return sorted(candidates, key=lambda candidate: -candidate[1])
+
+    def _arguments(self, tool_name: str, previous: str, result: Any) -> Iterator[Dict[str, Any]]:
+        """Argument sets worth prefetching for tool_name, given the previous tool's result"""
+        schema = self.schemas.get(tool_name) or {}
+        required = schema.get("required") or []
+        if not required:
+            yield {}
+            return
+        properties = schema.get("properties") or {}
+        if len(required) > 1 or (properties.get(required[0]) or {}).get("type", "string") != "string":
+            return
+        parsed = parse_tool_text(base_tool_name(previous), result_text(result))
+        if parsed is None or tool_topic(previous) != tool_topic(tool_name):
+            return
+        ids = [record.id for record in parsed.records if getattr(record, "id", None)]
+        for record_id in ids[:self.max_ids]:
+            yield {required[0]: record_id}
+
+    def _expire(self):
+        now = time.perf_counter()
+        for key, (task, started) in list(self.entries.items()):
+            if now - started > self.ttl:
+                del self.entries[key]
+                task.cancel()
+                self.wasted += 1
+
+    def invalidate(self):
+        """Drop everything prefetched; a write may have changed it"""
+        for task, _ in self.entries.values():
+            task.cancel()
+        self.wasted += len(self.entries)
+        self.entries.clear()
+
+    def _start(self, tool_name: str, arguments: Dict[str, Any], session_id: Optional[str]):
+        key = (tool_name, _canonical(arguments))
+        if key in self.entries:
+            return
+        if sum(1 for task, _ in self.entries.values() if not task.done()) >= self.max_concurrent:
+            self.skipped += 1
+            return
+        task = asyncio.ensure_future(self.call_tool(tool_name, arguments, session_id))
+        # Retrieve the exception of prefetches that are never taken
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self.entries[key] = (task, time.perf_counter())
+        self.prefetched += 1
+
+    async def take(self, tool_name: str, arguments: Optional[Dict[str, Any]]) -> Optional[Any]:
+        """The prefetched result of this call, or None to call the tool"""
+        self._expire()
+        entry = self.entries.pop((tool_name, _canonical(arguments)), None)
+        if entry is None:
+            return None
+        try:
+            result = await entry[0]
+        except Exception:
+            return None
+        if _failed(result):
+            return None
+        self.hits += 1
+        return result
+
+    def after_call(self, session_id: Optional[str], tool_name: str, arguments: Optional[Dict[str, Any]],
+                   result: Any):
+        """Learn from a completed tool call and prefetch what is likely to follow it"""
+        if session_id is not None:
+            previous = self.last_tool.pop(session_id, None)
+            if previous is not None:
+                self.transitions[previous][tool_name] += 1
+            self.last_tool[session_id] = tool_name
+            while len(self.last_tool) > self.max_sessions:
+                self.last_tool.popitem(last=False)
+        if not is_read_only_tool(tool_name):
+            # Any tool not known to be read-only may have changed what was prefetched
+            self.invalidate()
+        if self.call_tool is None or _failed(result):
+            return
+        self._expire()
+        for next_tool, _ in self.predict(tool_name):
+            for next_arguments in self._arguments(next_tool, tool_name, result):
+                # The call that just returned is as fresh as a prefetch would be
+                if next_tool != tool_name or _canonical(next_arguments) != _canonical(arguments):
+                    self._start(next_tool, next_arguments, session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        transitions = {tool: dict(counts) for tool, counts in self.transitions.items()}
+        return {"prefetched": self.prefetched, "hits": self.hits, "wasted": self.wasted,
+                "skipped": self.skipped, "pending": len(self.entries), "transitions": transitions}
+
+
+# Global prefetcher instance
+_prefetcher = None
+
+
+def get_prefetcher() -> Prefetcher:
+    """Get or create the prefetcher configured from the environment"""
+    global _prefetcher
+
+    if _prefetcher is None:
+        _prefetcher = Prefetcher(
+            min_probability=float(os.getenv("BILLY_PREFETCH_MIN_PROBABILITY", "0.3")),
+            max_concurrent=int(os.getenv("BILLY_PREFETCH_CONCURRENCY", "3")),
+            ttl=float(os.getenv("BILLY_PREFETCH_TTL", "30")),
+        )
+    return _prefetcher
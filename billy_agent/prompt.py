@@ -0,0 +1,99 @@
+from typing import Any, Dict, Optional
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+# Schema keys that carry no meaning for the model
+_NOISE_KEYS = ("$schema",)
+
+
+def canonical_schema(schema: Any) -> Any:
+    """Return a JSON schema with sorted keys and sorted "required" lists"""
+    if isinstance(schema, dict):
+        canonical = {key: canonical_schema(schema[key]) for key in sorted(schema) if key not in _NOISE_KEYS}
+        if isinstance(canonical.get("required"), list):
+            canonical["required"] = sorted(canonical["required"])
+        return canonical
+    if isinstance(schema, list):
+        return [canonical_schema(item) for item in schema]
+    return schema
+
+
+def stabilize_request(llm_request: LlmRequest):
+    """
+    Lay out a model request so its prefix is identical from run to run.
+
+    Providers cache a long prompt prefix that matches a recent request. The
+    system instruction already comes first and the conversation last; this
+    sorts the tool declarations by name into one tool and serializes their
+    schemas canonically, so discovery order and dict order cannot change the
+    prefix.
+    """
+    config = llm_request.config
+    if config is None or not config.tools:
+        return
+    declarations = []
+    other_tools = []
+    for tool in config.tools:
+        if isinstance(tool, types.Tool) and tool.function_declarations:
+            declarations.extend(tool.function_declarations)
+        else:
+            other_tools.append(tool)
+    for declaration in declarations:
+        if declaration.parameters_json_schema is not None:
+            declaration.parameters_json_schema = canonical_schema(declaration.parameters_json_schema)
+    declarations.sort(key=lambda declaration: declaration.name or "")
+    config.tools = ([types.Tool(function_declarations=declarations)] if declarations else []) + other_tools
+
+
+async def stable_prefix_callback(callback_context, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    """Before-model callback applying stabilize_request()"""
+    stabilize_request(llm_request)
+    return None
+
+
+class PromptCacheStats:
+    """Share of prompt tokens the provider served from its prompt cache"""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, usage: Optional[types.GenerateContentResponseUsageMetadata]):
+        if usage is None or not usage.prompt_token_count:
+            return
+        self.calls += 1
+        self.prompt_tokens += usage.prompt_token_count
+        self.cached_tokens += usage.cached_content_token_count or 0
+
+    def cached_share(self) -> float:
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    async def after_model(self, callback_context, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        usage = llm_response.usage_metadata
+        if llm_response.partial or usage is None or not usage.prompt_token_count:
+            return None
+        self.record(usage)
+        cached = usage.cached_content_token_count or 0
+        print(f"🧊 Prompt cache: {cached}/{usage.prompt_token_count} prompt tokens cached "
+              f"({cached / usage.prompt_token_count:.0%}; {self.cached_share():.0%} over {self.calls} calls)")
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "prompt_tokens": self.prompt_tokens, "cached_tokens": self.cached_tokens,
+                "cached_share": round(self.cached_share(), 3)}
+
+
+# Global statistics instance
+_prompt_cache_stats = None
+
+
+def get_prompt_cache_stats() -> PromptCacheStats:
+    global _prompt_cache_stats
+
+    if _prompt_cache_stats is None:
+        _prompt_cache_stats = PromptCacheStats()
+    return _prompt_cache_stats
+
@@ -0,0 +1,349 @@
+import asyncio
+import heapq
+import os
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from google.adk.tools.function_tool import FunctionTool
+
+from .federation import McpFederation, get_mcp_federation
+from .parsing import Customer, Invoice, parse_tool_text
+from .results import result_text
+
+# Largest number of rows a local query returns to the model
+MAX_LIMIT = 50
+
+# Billy.dk list tool that provides the data of each local query kind
+LIST_TOOLS = {"invoices": "listInvoices", "customers": "listCustomers"}
+# Billy.dk tools whose success makes a replicated list outdated
+WRITE_TOOLS = {
+    "createInvoice": "invoices",
+    "updateInvoice": "invoices",
+    "deleteInvoice": "invoices",
+    "createCustomer": "customers",
+}
+
+
+def _top(positions: Iterable[int], key, limit: int, descending: bool) -> List[int]:
+    """Positions of the first `limit` rows by key; rows whose key is None go last"""
+    if descending:
+        return heapq.nlargest(limit, positions, key=lambda pos: (key(pos) is not None, key(pos) or 0, pos))
+    return heapq.nsmallest(limit, positions, key=lambda pos: (key(pos) is None, key(pos) or 0, pos))
+
+
+def _in_range(keys: List[Tuple[Any, int]], low, high) -> set:
+    """Positions whose key lies in [low, high], from a sorted (key, position) list"""
+    start = bisect_left(keys, (low,)) if low is not None else 0
+    end = bisect_right(keys, (high, float("inf"))) if high is not None else len(keys)
+    return {pos for _, pos in keys[start:end]}
+
+
+class InvoiceIndex:
+    """In-memory indexes on date, state, amount and contact over one invoice list"""
+
+    def __init__(self, invoices: Iterable[Invoice]):
+        self.invoices = list(invoices)
+        self.positions = {invoice.id: pos for pos, invoice in enumerate(self.invoices)}
+        self._build()
+
+    def _build(self):
+        self.by_state: Dict[str, List[int]] = defaultdict(list)
+        self.by_contact: Dict[str, List[int]] = defaultdict(list)
+        for pos, invoice in enumerate(self.invoices):
+            self.by_state[invoice.state.lower()].append(pos)
+            if invoice.contact_id:
+                self.by_contact[invoice.contact_id].append(pos)
+        self.by_date = sorted((invoice.entry_date, pos) for pos, invoice in enumerate(self.invoices)
+                              if invoice.entry_date)
+        self.by_amount = sorted((invoice.amount, pos) for pos, invoice in enumerate(self.invoices))
+
+    def merge(self, invoice: Invoice):
+        """Add or update one invoice, keeping fields the new record lacks"""
+        pos = self.positions.get(invoice.id)
+        if pos is None:
+            self.positions[invoice.id] = len(self.invoices)
+            self.invoices.append(invoice)
+        else:
+            old = self.invoices[pos]
+            self.invoices[pos] = invoice._replace(contact_id=invoice.contact_id or old.contact_id,
+                                                  entry_date=invoice.entry_date or old.entry_date)
+        self._build()
+
+    def query(self, state: Optional[str] = None, contact_id: Optional[str] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None,
+              min_amount: Optional[float] = None, max_amount: Optional[float] = None,
+              sort_by: str = "date", descending: bool = True, limit: int = 10,
+              offset: int = 0) -> Tuple[int, List[Invoice]]:
+        """Return the number of matching invoices and `limit` of them, starting at `offset`"""
+        matches: List[set] = []
+        if state:
+            matches.append(set(self.by_state.get(state.lower(), ())))
+        if contact_id:
+            matches.append(set(self.by_contact.get(contact_id, ())))
+        if date_from or date_to:
+            matches.append(_in_range(self.by_date, date_from, date_to))
+        if min_amount is not None or max_amount is not None:
+            matches.append(_in_range(self.by_amount, min_amount, max_amount))
+
+        if matches:
+            matches.sort(key=len)
+            positions = matches[0].intersection(*matches[1:])
+        else:
+            positions = range(len(self.invoices))
+
+        invoices = self.invoices
+        keys = {
+            "date": lambda pos: invoices[pos].entry_date,
+            "amount": lambda pos: invoices[pos].amount,
+            "state": lambda pos: invoices[pos].state,
+            "id": lambda pos: invoices[pos].id,
+            # Order of the server's list output
+            "position": lambda pos: pos,
+        }
+        if sort_by not in keys:
+            raise ValueError(f"sort_by must be one of {', '.join(keys)}")
+        top = _top(positions, keys[sort_by], offset + limit, descending)[offset:]
+        return len(positions), [invoices[pos] for pos in top]
+
+
+class CustomerIndex:
+    """In-memory index over one customer list"""
+
+    def __init__(self, customers: Iterable[Customer]):
+        self.customers = list(customers)
+        self.positions = {customer.id: pos for pos, customer in enumerate(self.customers)}
+        self._names = [customer.name.lower() for customer in self.customers]
+
+    def merge(self, customer: Customer):
+        pos = self.positions.get(customer.id)
+        if pos is None:
+            self.positions[customer.id] = len(self.customers)
+            self.customers.append(customer)
+            self._names.append(customer.name.lower())
+        else:
+            self.customers[pos] = customer._replace(email=customer.email or self.customers[pos].email)
+            self._names[pos] = customer.name.lower()
+
+    def query(self, name_contains: Optional[str] = None, email_contains: Optional[str] = None,
+              sort_by: str = "name", descending: bool = False, limit: int = 10,
+              offset: int = 0) -> Tuple[int, List[Customer]]:
+        """Return the number of matching customers and `limit` of them, starting at `offset`"""
+        customers = self.customers
+        positions: Iterable[int] = range(len(customers))
+        if name_contains:
+            needle = name_contains.lower()
+            positions = [pos for pos in positions if needle in self._names[pos]]
+        if email_contains:
+            needle = email_contains.lower()
+            positions = [pos for pos in positions if needle in (customers[pos].email or "").lower()]
+
+        keys = {
+            "name": lambda pos: self._names[pos],
+            "id": lambda pos: customers[pos].id,
+            # Order of the server's list output
+            "position": lambda pos: pos,
+        }
+        if sort_by not in keys:
+            raise ValueError(f"sort_by must be one of {', '.join(keys)}")
+        top = _top(positions, keys[sort_by], offset + limit, descending)[offset:]
+        return len(positions), [customers[pos] for pos in top]
+
+
+class BillyReplica:
+    """
+    Local replica of the Billy.dk invoice and customer lists.
+
+    Lists are refreshed from the primary MCP server when older than ttl, and
+    are also replicated from every list result that passes through the agent's
+    tools. getInvoice and create results are merged in, so details such as
+    contact and entry date become queryable. Writes also mark their list stale,
+    so the next query fetches it again. If a refresh fails, queries are
+    answered from the stale lists, whose age the query results state.
+    """
+
+    def __init__(self, federation: McpFederation, ttl: float = 60.0):
+        self.federation = federation
+        self.ttl = ttl
+        self.indexes: Dict[str, Any] = {}
+        self.fetched_at: Dict[str, float] = {}
+        self._refreshes: Dict[str, asyncio.Future] = {}
+
+    def observe(self, tool_name: str, result: Any):
+        """Update the replica from a result of a primary-server Billy.dk tool"""
+        if isinstance(result, dict) and result.get("isError"):
+            return
+        parsed = parse_tool_text(tool_name, result_text(result))
+        if tool_name in WRITE_TOOLS:
+            self.fetched_at.pop(WRITE_TOOLS[tool_name], None)
+        if parsed is None:
+            return
+
+        if parsed.kind == "invoices":
+            self._store("invoices", InvoiceIndex(parsed.records))
+        elif parsed.kind == "customers":
+            self._store("customers", CustomerIndex(parsed.records))
+        elif parsed.kind in ("invoice", "customer") and parsed.kind + "s" in self.indexes:
+            self.indexes[parsed.kind + "s"].merge(parsed.records[0])
+
+    def _store(self, kind: str, index):
+        self.indexes[kind] = index
+        self.fetched_at[kind] = time.monotonic()
+
+    def age(self, kind: str) -> Optional[float]:
+        fetched_at = self.fetched_at.get(kind)
+        return time.monotonic() - fetched_at if fetched_at is not None else None
+
+    async def _fetch(self, kind: str):
+        tool_name = LIST_TOOLS[kind]
+        primary = self.federation.primary.name
+        self.federation.check_available(primary)
+        client = self.federation.primary_client()
+        await client.ensure_initialized()
+        result = await client.call_tool(tool_name)
+        if isinstance(result, dict) and result.get("isError"):
+            raise RuntimeError(result_text(result) or f"{tool_name} failed")
+        if parse_tool_text(tool_name, result_text(result)) is None:
+            raise ValueError(f"{tool_name} returned text in an unknown format")
+        self.observe(tool_name, result)
+
+    async def get(self, kind: str):
+        """Return the index of one kind, refreshing it first when stale"""
+        age = self.age(kind)
+        if age is not None and age < self.ttl:
+            return self.indexes[kind]
+
+        # Concurrent queries share one refresh
+        refresh = self._refreshes.get(kind)
+        if refresh is None or refresh.done() or refresh.get_loop() is not asyncio.get_running_loop():
+            refresh = asyncio.ensure_future(self._fetch(kind))
+            self._refreshes[kind] = refresh
+        try:
+            await asyncio.shield(refresh)
+        except Exception as e:
+            if kind not in self.indexes:
+                raise
+            # Billy.dk is unavailable; answer from the last replicated list, whose age the query reports
+            print(f"⚠️  Could not refresh the {kind} replica ({e}), serving the last replicated list")
+        return self.indexes[kind]
+
+
+# Global replica instance
+_billy_replica = None
+
+
+def get_billy_replica() -> BillyReplica:
+    """Get or create the local replica for the global MCP federation"""
+    global _billy_replica
+
+    if _billy_replica is None:
+        _billy_replica = BillyReplica(get_mcp_federation(),
+                                      ttl=float(os.getenv("BILLY_REPLICA_TTL", "60")))
+    return _billy_replica
+
+
+def _header(kind: str, shown: int, offset: int, matched: int, total: int, sort_by: str, descending: bool,
+            age: Optional[float]) -> str:
+    order = "desc" if descending else "asc"
+    rows = f"{shown}" if not offset else f"Rows {offset + 1}-{offset + shown}"
+    # No age: a write outdated the list and Billy.dk could not be reached to fetch it again
+    freshness = f"data {age:.0f}s old" if age is not None else "data outdated by a recent change"
+    return (f"{rows} of {matched} matching {kind} ({total} total), "
+            f"sorted by {sort_by} {order}, {freshness}:")
+
+
+def _format_invoice(invoice: Invoice) -> str:
+    fields = [invoice.id, invoice.entry_date or "-", f"{invoice.amount:.2f} {invoice.currency}", invoice.state]
+    if invoice.contact_id:
+        fields.append(invoice.contact_id)
+    return " | ".join(fields)
+
+
+def _format_customer(customer: Customer) -> str:
+    return " | ".join(filter(None, (customer.id, customer.name, customer.email)))
+
+
+async def query_invoices(state: Optional[str] = None, contact_id: Optional[str] = None,
+                         date_from: Optional[str] = None, date_to: Optional[str] = None,
+                         min_amount: Optional[float] = None, max_amount: Optional[float] = None,
+                         sort_by: str = "date", descending: bool = True, limit: int = 10,
+                         offset: int = 0) -> str:
+    """
+    Filter, sort and limit Billy.dk invoices locally and return only the top rows.
+    Prefer this over listInvoices for questions like "the 3 latest invoices",
+    "unpaid invoices over 5000" or "invoices for customer X".
+
+    Args:
+        state: Only invoices in this state, e.g. draft, approved, sent, paid.
+        contact_id: Only invoices of this customer ID.
+        date_from: Earliest entry date, YYYY-MM-DD.
+        date_to: Latest entry date, YYYY-MM-DD.
+        min_amount: Smallest amount.
+        max_amount: Largest amount.
+        sort_by: date, amount, state, id or position (order of the Billy.dk list).
+        descending: Sort descending (newest or largest first).
+        limit: Number of rows to return (at most 50).
+        offset: Number of matching rows to skip, for paging.
+
+    Rows are "id | entry date | amount | state | contact".
+    """
+    try:
+        replica = get_billy_replica()
+        index = await replica.get("invoices")
+        limit = max(1, min(limit, MAX_LIMIT))
+        offset = max(0, offset)
+        matched, invoices = index.query(state, contact_id, date_from, date_to, min_amount, max_amount,
+                                        sort_by, descending, limit, offset)
+        header = _header("invoices", len(invoices), offset, matched, len(index.invoices), sort_by, descending,
+                         replica.age("invoices"))
+        return "\n".join([header] + [_format_invoice(invoice) for invoice in invoices])
+    except Exception as e:
+        return f"❌ Error querying invoices: {e}"
+
+
+async def query_customers(name_contains: Optional[str] = None, email_contains: Optional[str] = None,
+                          sort_by: str = "name", descending: bool = False, limit: int = 10,
+                          offset: int = 0) -> str:
+    """
+    Filter, sort and limit Billy.dk customers locally and return only the top rows.
+    Prefer this over listCustomers for questions like "the 3 latest customers"
+    or "customers named Hansen".
+
+    Args:
+        name_contains: Only customers whose name contains this text.
+        email_contains: Only customers whose email contains this text.
+        sort_by: name, id or position (order of the Billy.dk list; the newest are last).
+        descending: Sort descending.
+        limit: Number of rows to return (at most 50).
+        offset: Number of matching rows to skip, for paging.
+
+    Rows are "id | name | email".
+    """
+    try:
+        replica = get_billy_replica()
+        index = await replica.get("customers")
+        limit = max(1, min(limit, MAX_LIMIT))
+        offset = max(0, offset)
+        matched, customers = index.query(name_contains, email_contains, sort_by, descending, limit, offset)
+        header = _header("customers", len(customers), offset, matched, len(index.customers), sort_by, descending,
+                         replica.age("customers"))
+        return "\n".join([header] + [_format_customer(customer) for customer in customers])
+    except Exception as e:
+        return f"❌ Error querying customers: {e}"
+
+
+def local_query_tools(available_tools: Iterable[str]) -> List[FunctionTool]:
+    """Create the local query tools whose source list tool is available"""
+    available = set(available_tools)
+    tools = []
+    if LIST_TOOLS["invoices"] in available:
+        tools.append(FunctionTool(query_invoices))
+    if LIST_TOOLS["customers"] in available:
+        tools.append(FunctionTool(query_customers))
+    return tools
+
+
+# Expose the tools under the camelCase names of the Billy.dk tools they complement
+query_invoices.__name__ = "queryInvoices"
+query_customers.__name__ = "queryCustomers"
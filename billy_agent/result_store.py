@@ -0,0 +1,183 @@
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from google.adk.tools.tool_context import ToolContext
+
+# Largest number of rows readResultPage returns at once
+MAX_PAGE_ROWS = 100
+
+
+class StoredResult:
+    """One large tool output, held as rows in memory or in a spill file"""
+
+    def __init__(self, handle: str, tool_name: str, header: str, rows: List[str]):
+        self.handle = handle
+        self.tool_name = tool_name
+        self.header = header
+        self.rows: Optional[List[str]] = rows
+        self.count = len(rows)
+        self.size = sum(len(row) for row in rows)
+        self.created = time.time()
+        # Set once the rows are spilled to disk
+        self.path: Optional[str] = None
+        self._offsets: Optional[List[int]] = None
+
+    def spill(self, directory: str):
+        """Move the rows to a file, keeping only the byte offset of each row"""
+        self.path = os.path.join(directory, f"{self.handle}.txt")
+        offsets = []
+        with open(self.path, "wb") as f:
+            for row in self.rows:
+                offsets.append(f.tell())
+                f.write(row.encode("utf-8") + b"\n")
+        self._offsets = offsets
+        self.rows = None
+
+    def page(self, offset: int, limit: int) -> List[str]:
+        if self.rows is not None:
+            return self.rows[offset:offset + limit]
+        if offset >= self.count:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self._offsets[offset])
+            return [f.readline().decode("utf-8").rstrip("\n") for _ in range(min(limit, self.count - offset))]
+
+
+class ResultStore:
+    """
+    Per-session store for tool outputs too large to keep in the prompt.
+
+    The LLM gets a short handle instead of the full output and reads slices
+    through the readResultPage tool. Results live in memory until the store
+    holds more than memory_limit characters; then the least recently used
+    results are spilled to files. Sessions beyond max_sessions are dropped,
+    least recently used first, together with their files.
+    """
+
+    def __init__(self, spill_dir: Optional[str] = None, memory_limit: int = 16_000_000,
+                 max_sessions: int = 100, max_results_per_session: int = 50):
+        self.spill_dir = spill_dir
+        self.memory_limit = memory_limit
+        self.max_sessions = max_sessions
+        self.max_results_per_session = max_results_per_session
+        self.sessions: "OrderedDict[str, OrderedDict[str, StoredResult]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._memory_used = 0
+        self.spilled = 0
+
+    def _session_dir(self, session_id: str) -> str:
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="billy-results-")
+        directory = os.path.join(self.spill_dir, "".join(c if c.isalnum() else "_" for c in session_id))
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def _forget(self, result: StoredResult):
+        if result.rows is not None:
+            self._memory_used -= result.size
+        elif result.path:
+            try:
+                os.remove(result.path)
+            except OSError:
+                pass
+
+    def _drop_session(self, session_id: str):
+        for result in self.sessions.pop(session_id, {}).values():
+            self._forget(result)
+        self._counters.pop(session_id, None)
+        if self.spill_dir:
+            shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+
+    def _spill_until_under_limit(self):
+        # Least recently used sessions first, oldest results first within them
+        for session_id, results in self.sessions.items():
+            for result in results.values():
+                if self._memory_used <= self.memory_limit:
+                    return
+                if result.rows is not None:
+                    self._memory_used -= result.size
+                    result.spill(self._session_dir(session_id))
+                    self.spilled += 1
+
+    def put(self, session_id: str, tool_name: str, header: str, rows: List[str]) -> str:
+        """Store rows of one tool output and return its handle"""
+        results = self.sessions.setdefault(session_id, OrderedDict())
+        self.sessions.move_to_end(session_id)
+        while len(self.sessions) > self.max_sessions:
+            self._drop_session(next(iter(self.sessions)))
+
+        self._counters[session_id] = self._counters.get(session_id, 0) + 1
+        handle = f"r{self._counters[session_id]}"
+        result = StoredResult(handle, tool_name, header, rows)
+        results[handle] = result
+        self._memory_used += result.size
+        while len(results) > self.max_results_per_session:
+            self._forget(results.popitem(last=False)[1])
+        self._spill_until_under_limit()
+        return handle
+
+    def get(self, session_id: str, handle: str) -> Optional[StoredResult]:
+        results = self.sessions.get(session_id)
+        if results is None or handle not in results:
+            return None
+        self.sessions.move_to_end(session_id)
+        results.move_to_end(handle)
+        return results[handle]
+
+    def read(self, session_id: str, handle: str, offset: int = 0,
+             limit: int = 20) -> Optional[Tuple[StoredResult, List[str]]]:
+        result = self.get(session_id, handle)
+        if result is None:
+            return None
+        return result, result.page(max(0, offset), max(1, min(limit, MAX_PAGE_ROWS)))
+
+    def close(self):
+        for session_id in list(self.sessions):
+            self._drop_session(session_id)
+
+
+# Global store instance
+_result_store = None
+
+
+def get_result_store() -> ResultStore:
+    """Get or create the result store configured from the environment"""
+    global _result_store
+
+    if _result_store is None:
+        _result_store = ResultStore(
+            spill_dir=os.getenv("BILLY_RESULT_SPILL_DIR") or None,
+            memory_limit=int(float(os.getenv("BILLY_RESULT_STORE_MEMORY_MB", "16")) * 1_000_000),
+        )
+    return _result_store
+
+
+async def read_result_page(handle: str, offset: int = 0, limit: int = 20,
+                           tool_context: ToolContext = None) -> str:
+    """
+    Read rows of a large tool result that was stored instead of shown in full.
+
+    Args:
+        handle: The handle given with the shortened result, e.g. r3.
+        offset: Number of rows to skip.
+        limit: Number of rows to return (at most 100).
+    """
+    session_id = tool_context._invocation_context.session.id if tool_context is not None else ""
+    page = get_result_store().read(session_id, handle, offset, limit)
+    if page is None:
+        return f"❌ Error: no stored result {handle} in this conversation"
+    result, rows = page
+    if not rows:
+        return f"{result.handle} ({result.tool_name}) has {result.count} rows; offset {offset} is past the end"
+    first = max(0, offset) + 1
+    title = f"Rows {first}-{first + len(rows) - 1} of {result.count} ({result.handle}):"
+    if result.header:
+        title = f"{result.header.rstrip(':')} - {title}"
+    return "\n".join([title] + rows)
+
+
+read_result_page.__name__ = "readResultPage"
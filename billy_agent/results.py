@@ -0,0 +1,88 @@
+import json
+from typing import Any, Dict, List
+
+_COMPACT = {"separators": (",", ":"), "ensure_ascii": False}
+
+
+def _compact_json(value: Any) -> str:
+    return json.dumps(value, **_COMPACT)
+
+
+def _blob_size(data: str) -> int:
+    """Decoded size of a base64 payload, without decoding it"""
+    return len(data) * 3 // 4 - data.count("=", -2)
+
+
+def _render_text(text: str) -> str:
+    # JSON sent as text is usually pretty-printed; re-emit it compactly
+    stripped = text.strip()
+    if stripped[:1] in ("{", "[") and "\n" in stripped:
+        try:
+            return _compact_json(json.loads(stripped))
+        except ValueError:
+            pass
+    return stripped
+
+
+def _render_part(part: Dict[str, Any]) -> str:
+    """Render one MCP content part as compact text"""
+    part_type = part.get("type")
+
+    if part_type == "text":
+        return _render_text(part.get("text", ""))
+
+    if part_type in ("image", "audio"):
+        size = _blob_size(part.get("data", ""))
+        return f"[{part_type}: {part.get('mimeType', 'unknown')}, {size} bytes]"
+
+    if part_type == "resource":
+        resource = part.get("resource", {})
+        if "text" in resource:
+            return _render_text(resource["text"])
+        size = _blob_size(resource.get("blob", ""))
+        return f"[resource {resource.get('uri', '')}: {resource.get('mimeType', 'unknown')}, {size} bytes]"
+
+    if part_type == "resource_link":
+        name = part.get("name") or part.get("title") or ""
+        return f"[resource {part.get('uri', '')}{': ' + name if name else ''}]"
+
+    # Unknown part types: keep everything except bulky payloads
+    return _compact_json({key: value for key, value in part.items() if key not in ("data", "blob")})
+
+
+def render_tool_result(result: Any) -> str:
+    """
+    Render an MCP tools/call result as one compact string for the LLM.
+
+    All content parts are kept, in order. When the server provides
+    structuredContent it is used instead of the text parts (which by
+    convention repeat it), serialized as compact JSON. Binary parts are
+    summarized by type and size instead of being inlined as base64.
+    """
+    if not isinstance(result, dict):
+        return str(result)
+
+    parts: List[str] = []
+    structured = result.get("structuredContent")
+    if structured is not None:
+        parts.append(_compact_json(structured))
+
+    for part in result.get("content") or ():
+        if structured is not None and part.get("type") == "text":
+            continue
+        rendered = _render_part(part)
+        if rendered:
+            parts.append(rendered)
+
+    text = "\n".join(parts) or "(no content)"
+    if result.get("isError"):
+        return f"❌ Error: {text}"
+    return text
+
+
+def result_text(result: Any) -> str:
+    """Return the plain text parts of an MCP tools/call result, for parsing"""
+    if not isinstance(result, dict):
+        return str(result)
+    return "\n".join(part.get("text", "") for part in result.get("content") or ()
+                     if part.get("type") == "text")
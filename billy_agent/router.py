@@ -0,0 +1,182 @@
+import re
+import time
+from datetime import date
+from typing import Any, Awaitable, Callable, Collection, Dict, NamedTuple, Optional
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from .context import STATE_IDS, STATE_TOPIC, resolve_reference
+from .degraded import stale_note
+from .delta import format_row
+from .parsing import parse_tool_text
+from .results import render_tool_result, result_text
+
+
+class Intent(NamedTuple):
+    tool_name: str
+    arguments: Dict[str, Any]
+
+
+_POLITE = r"(?:(?:please|can you|could you|would you)[ ,]+)?"
+_THANKS = r"(?:[ ,]+please)?"
+_DATE = r"(\d{4}-\d{2}-\d{2})"
+
+_LIST = re.compile(
+    r"^" + _POLITE + r"(?:(?:list|show|get|display)(?: me)?(?: all| my| the)?(?: of)?(?: my| the)? )?"
+    r"(invoices|customers|products)" + _THANKS + r"$", re.I)
+# The ID must look like one (#ABC, or a token with a digit), so "show invoice details" goes to the model
+_GET_INVOICE = re.compile(
+    r"^" + _POLITE + r"(?:show|get|open|display)(?: me)?(?: the)? invoice "
+    r"(?:#([A-Za-z0-9][\w-]*)|(?:id )?([A-Za-z_-]*\d[\w-]*))" + _THANKS + r"$", re.I)
+_TOTAL = re.compile(
+    r"^" + _POLITE + r"(?:(?:what is|what's|show|get)(?: me)? )?(?:the )?total"
+    r"(?: invoice amount| invoiced| amount)?(?: from| between)? " + _DATE + r" (?:to|and|until|-) " + _DATE
+    + _THANKS + r"$", re.I)
+
+# "show the second one": the rest is resolved against the records shown before
+_SHOW_REFERENCE = re.compile(r"^" + _POLITE + r"(?:show|get|open|display)(?: me)? (.+?)" + _THANKS + r"$", re.I)
+
+_LIST_TOOLS = {"invoices": "listInvoices", "customers": "listCustomers", "products": "listProducts"}
+_GET_TOOLS = {"invoices": "getInvoice"}
+
+
+def _valid_range(start: str, end: str) -> bool:
+    try:
+        return date.fromisoformat(start) <= date.fromisoformat(end)
+    except ValueError:
+        return False
+
+
+def match_intent(text: str) -> Optional[Intent]:
+    """
+    Match a user message against the command grammar. Only whole messages that
+    name one read command unambiguously match; everything else returns None.
+    """
+    text = " ".join(text.split()).rstrip("?.!")
+    match = _LIST.match(text)
+    if match:
+        return Intent(_LIST_TOOLS[match.group(1).lower()], {})
+    match = _GET_INVOICE.match(text)
+    if match:
+        return Intent("getInvoice", {"id": match.group(1) or match.group(2)})
+    match = _TOTAL.match(text)
+    if match and _valid_range(match.group(1), match.group(2)):
+        return Intent("totalInvoiceAmount", {"startDate": match.group(1), "endDate": match.group(2)})
+    return None
+
+
+def match_reference(text: str, state) -> Optional[Intent]:
+    """
+    Match "show the second one" or "open it" against the records the
+    conversation referenced last (see ContextTracker), if the whole rest of
+    the command is the reference.
+    """
+    match = _SHOW_REFERENCE.match(" ".join(text.split()).rstrip("?.!"))
+    topic = state.get(STATE_TOPIC)
+    if not match or topic not in _GET_TOOLS:
+        return None
+    reference = resolve_reference(match.group(1), (state.get(STATE_IDS) or {}).get(topic) or [])
+    if reference is None or reference[0].lower() != match.group(1).lower():
+        return None
+    return Intent(_GET_TOOLS[topic], {"id": reference[1]})
+
+
+def render_answer(tool_name: str, text: str, max_rows: int = 50) -> str:
+    """Phrase a tool result as the answer; results that do not parse are shown as they are"""
+    parsed = parse_tool_text(tool_name, text)
+    if parsed is None or parsed.unparsed:
+        return text
+    if parsed.kind == "invoice":
+        invoice = parsed.records[0]
+        lines = [f"Invoice {invoice.id}: {invoice.amount:g} {invoice.currency}, status {invoice.state}."]
+        if invoice.contact_id:
+            lines.append(f"Contact: {invoice.contact_id}")
+        if invoice.entry_date:
+            lines.append(f"Entry date: {invoice.entry_date}")
+        return "\n".join(lines)
+    if parsed.kind == "total":
+        total = parsed.records[0]
+        count = f" across {total.count} invoices" if total.count is not None else ""
+        return (f"The total invoice amount from {total.start_date} to {total.end_date} is "
+                f"{total.amount:g} {total.currency}{count}.")
+
+    records = parsed.records
+    if not records:
+        return f"You have no {parsed.kind}."
+    lines = [f"Here are your {len(records)} {parsed.kind}:"]
+    lines.extend(format_row(record) for record in records[:max_rows])
+    if len(records) > max_rows:
+        lines.append(f"… and {len(records) - max_rows} more. Ask me to filter or sort them to see others.")
+    return "\n".join(lines)
+
+
+def _user_text(llm_request: LlmRequest) -> Optional[str]:
+    """The text of the user message that starts this model call, if that is all it is"""
+    if not llm_request.contents:
+        return None
+    content = llm_request.contents[-1]
+    if content.role != "user" or not content.parts:
+        return None
+    if any(part.text is None for part in content.parts):
+        return None
+    return " ".join(part.text for part in content.parts)
+
+
+class IntentRouter:
+    """
+    Answers unambiguous read commands without calling the model.
+
+    A before-model callback matches the user's message against a small command
+    grammar ("list invoices", "show invoice abc123", "total from 2024-01-01 to
+    2024-12-31", or "show the second one" after a list). On a match the tool is called directly and its result is
+    phrased by a template, so the turn costs one tool round trip instead of two
+    model calls. Anything else, tool errors, and tools the agent does not have
+    fall back to the model.
+    """
+
+    def __init__(self, call_tool: Callable[[str, Dict[str, Any], Any], Awaitable[Any]], max_rows: int = 50):
+        self.call_tool = call_tool
+        self.max_rows = max_rows
+        self.routed = 0
+        self.fallbacks = 0
+
+    def route(self, text: str, available: Collection[str], state=None) -> Optional[Intent]:
+        intent = match_intent(text)
+        if intent is None and state is not None:
+            intent = match_reference(text, state)
+        if intent is None or intent.tool_name not in available:
+            return None
+        return intent
+
+    async def before_model(self, callback_context, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        text = _user_text(llm_request)
+        state = callback_context.state if callback_context is not None else None
+        intent = self.route(text, llm_request.tools_dict, state) if text else None
+        if intent is None:
+            return None
+
+        started = time.perf_counter()
+        try:
+            result = await self.call_tool(intent.tool_name, intent.arguments, callback_context)
+        except Exception as e:
+            print(f"⚠️  Routed {intent.tool_name} failed, asking the model instead: {e}")
+            self.fallbacks += 1
+            return None
+        if isinstance(result, dict) and result.get("isError"):
+            self.fallbacks += 1
+            return None
+
+        text = result_text(result) or render_tool_result(result)
+        answer = render_answer(intent.tool_name, text, self.max_rows)
+        note = stale_note(result)
+        if note is not None:
+            answer = f"{answer}\n\n{note}"
+        self.routed += 1
+        print(f"⚡ Routed to {intent.tool_name} without a model call "
+              f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+        return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=answer)]))
+
+    def stats(self) -> Dict[str, int]:
+        return {"routed": self.routed, "fallbacks": self.fallbacks}
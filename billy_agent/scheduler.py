@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Mapping, Optional
+
+from google.adk.models.lite_llm import LiteLLMClient
+
+from .budget import count_tokens
+
+def is_rate_limit(error: Exception) -> bool:
+    return "RateLimit" in type(error).__name__ or getattr(error, "status_code", None) == 429
+
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds from a reset header such as "1s", "6m0s" or "20ms" """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    return sum(float(number) * _UNITS[unit] for number, unit in parts) if parts else None
+
+
+def _header(headers: Mapping[str, Any], name: str) -> Optional[str]:
+    value = headers.get(name)
+    if value is None:
+        value = headers.get(f"llm_provider-{name}")
+    return value
+
+
+class TokenBucket:
+    """Capacity per minute, refilled continuously; the level may go negative (debt)"""
+
+    def __init__(self, limit: float):
+        self.limit = float(limit)
+        self.level = float(limit)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.limit, self.level + (now - self.updated) * self.limit / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available; amounts above the limit wait for a full bucket"""
+        self._refill(now)
+        amount = min(amount, self.limit)
+        return 0.0 if self.level >= amount else (amount - self.level) * 60.0 / self.limit
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= amount
+
+    def observe(self, limit: Optional[str], remaining: Optional[str], reset: Optional[str], now: float):
+        """Adopt the provider's view of this bucket from rate-limit headers"""
+        self._refill(now)
+        if limit is not None:
+            self.limit = float(limit)
+        if remaining is not None:
+            self.level = min(self.limit, float(remaining))
+
+    def block(self, seconds: float, now: float):
+        """Empty the bucket so it only has capacity again after seconds"""
+        self._refill(now)
+        self.level = min(self.level, -seconds * self.limit / 60.0)
+
+
+class LlmScheduler:
+    """
+    Client-side admission control for one API key.
+
+    Every model call first acquires one request from the requests-per-minute
+    bucket and its estimated tokens from the tokens-per-minute bucket. Calls
+    wait in a first come, first served queue until both buckets have capacity. The buckets follow the
+    provider's x-ratelimit-* response headers, and a 429 empties them until
+    its reset time, so calls stay just under the limits instead of hitting them.
+    """
+
+    def __init__(self, rpm: float = 500, tpm: float = 200_000, completion_tokens: int = 512):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.completion_tokens = completion_tokens
+        self._queue: deque = deque()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._changed: Optional[asyncio.Event] = None
+        self.granted = 0
+        self.rate_limited = 0
+        self.waited = 0.0
+
+    def _wake(self):
+        if self._changed is not None:
+            self._changed.set()
+
+    def _ensure_dispatcher(self):
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is None or self._dispatcher.done() or self._dispatcher.get_loop() is not loop:
+            self._changed = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        while self._queue:
+            tokens, future = self._queue[0]
+            if future.done():
+                self._queue.popleft()
+                continue
+            now = time.monotonic()
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if wait <= 0:
+                self._queue.popleft()
+                self.requests.take(1, now)
+                self.tokens.take(tokens, now)
+                future.set_result(None)
+                continue
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def acquire(self, tokens: int):
+        """Wait until a call of about tokens tokens fits in both buckets"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((tokens, future))
+        started = time.monotonic()
+        self._ensure_dispatcher()
+        self._wake()
+        await future
+        self.granted += 1
+        self.waited += time.monotonic() - started
+
+    def settle(self, estimated: int, used: int):
+        """Correct the token bucket once the call's real usage is known"""
+        self.tokens.take(used - estimated, time.monotonic())
+        self._wake()
+
+    def observe(self, headers: Optional[Mapping[str, Any]]):
+        if not headers:
+            return
+        now = time.monotonic()
+        for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            bucket.observe(_header(headers, f"x-ratelimit-limit-{kind}"),
+                           _header(headers, f"x-ratelimit-remaining-{kind}"),
+                           _header(headers, f"x-ratelimit-reset-{kind}"), now)
+        self._wake()
+
+    def on_rate_limit(self, headers: Optional[Mapping[str, Any]]):
+        """A 429 got through: stop admitting calls until the provider's reset time"""
+        headers = headers or {}
+        self.rate_limited += 1
+        now = time.monotonic()
+        retry_after = parse_reset(_header(headers, "retry-after"))
+        for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            reset = parse_reset(_header(headers, f"x-ratelimit-reset-{kind}")) or retry_after
+            if reset is not None or kind == "requests":
+                bucket.block(reset if reset is not None else 1.0, now)
+        self._wake()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"granted": self.granted, "queued": sum(1 for _, future in self._queue if not future.done()),
+                "rate_limited": self.rate_limited, "waited_seconds": round(self.waited, 3),
+                "rpm": self.requests.limit, "tpm": self.tokens.limit}
+
+
+def estimate_tokens(messages: Any, tools: Any, max_tokens: Optional[int], completion_tokens: int) -> int:
+    """Tokens a call counts against the TPM limit: the prompt plus the completion allowance"""
+    prompt = json.dumps([messages, tools], default=str, ensure_ascii=False)
+    return count_tokens(prompt) + (max_tokens or completion_tokens)
+
+
+class ScheduledLiteLLMClient(LiteLLMClient):
+    """LiteLLM client for LiteLlm(llm_client=...) that admits each call through an LlmScheduler"""
+
+    def __init__(self, scheduler: LlmScheduler):
+        self.scheduler = scheduler
+
+    async def acompletion(self, model: Any, messages: Any, tools: Any, **kwargs: Any):
+        estimated = estimate_tokens(messages, tools, kwargs.get("max_tokens") or kwargs.get("max_completion_tokens"),
+                                    self.scheduler.completion_tokens)
+        await self.scheduler.acquire(estimated)
+        try:
+            response = await super().acompletion(model=model, messages=messages, tools=tools, **kwargs)
+        except Exception as e:
+            if is_rate_limit(e):
+                headers = getattr(e, "headers", None) or getattr(getattr(e, "response", None), "headers", None)
+                self.scheduler.on_rate_limit(headers)
+            raise
+        hidden = getattr(response, "_hidden_params", None) or {}
+        self.scheduler.observe(hidden.get("additional_headers"))
+        if kwargs.get("stream"):
+            return self._settle_stream(response, estimated)
+        self._settle(estimated, getattr(response, "usage", None))
+        return response
+
+    def _settle(self, estimated: int, usage: Any):
+        if usage is not None and getattr(usage, "total_tokens", None):
+            self.scheduler.settle(estimated, usage.total_tokens)
+
+    async def _settle_stream(self, stream: AsyncIterator[Any], estimated: int) -> AsyncIterator[Any]:
+        """Pass a stream through; its final chunk carries the usage (stream_options include_usage)"""
+        usage = None
+        try:
+            async for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                yield chunk
+        finally:
+            self._settle(estimated, usage)
+
+
+# Global schedulers, one per API key
+_llm_schedulers: Dict[str, LlmScheduler] = {}
+
+
+def get_llm_scheduler(api_key: str) -> LlmScheduler:
+    """Get or create the scheduler of an API key (or provider), with limits from the environment"""
+    key = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    if key not in _llm_schedulers:
+        _llm_schedulers[key] = LlmScheduler(
+            rpm=float(os.getenv("BILLY_LLM_RPM", "500")),
+            tpm=float(os.getenv("BILLY_LLM_TPM", "200000")),
+            completion_tokens=int(os.getenv("BILLY_LLM_COMPLETION_TOKENS", "512")),
+        )
+    return _llm_schedulers[key]
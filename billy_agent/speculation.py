@@ -0,0 +1,204 @@
+import asyncio
+import contextvars
+import json
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from google.adk.models.lite_llm import LiteLLMClient
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from .tool_kinds import is_read_only_tool
+
+# Argument types simple enough that the streamed JSON is final once it parses
+_SIMPLE_TYPES = ("string", "number", "integer", "boolean")
+
+# (invocation id, session id) of the model call being streamed on this task
+_scope: contextvars.ContextVar = contextvars.ContextVar("billy_speculation_scope", default=None)
+
+
+def _canonical(arguments: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(arguments or {}, sort_keys=True, default=str, ensure_ascii=False)
+
+
+def is_speculation_safe(tool_name: str, schema: Optional[Dict[str, Any]]) -> bool:
+    """Read-only tools whose arguments are all scalars may be called before the model finishes"""
+    if not is_read_only_tool(tool_name):
+        return False
+    properties = (schema or {}).get("properties") or {}
+    return all(isinstance(spec, dict) and spec.get("type") in _SIMPLE_TYPES for spec in properties.values())
+
+
+class ArgumentStream:
+    """
+    Incremental parser of one function call's arguments as they are streamed.
+
+    Tracks string and nesting state over each fragment once, so completion is
+    detected in linear time; the JSON is only decoded when the top-level
+    object closes.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.complete = False
+        # Text arrived after the object closed: the arguments are not what was parsed
+        self.changed = False
+
+    def feed(self, fragment: str) -> Optional[Dict[str, Any]]:
+        """Add a fragment; returns the arguments when this fragment completes them"""
+        if not fragment:
+            return None
+        if self.complete:
+            self.changed = self.changed or bool(fragment.strip())
+            return None
+        self.parts.append(fragment)
+        for position, char in enumerate(fragment):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.complete = True
+                    self.changed = bool(fragment[position + 1:].strip())
+                    try:
+                        arguments = json.loads("".join(self.parts))
+                    except json.JSONDecodeError:
+                        return None
+                    return arguments if isinstance(arguments, dict) and not self.changed else None
+        return None
+
+
+class SpeculativeDispatcher:
+    """
+    Starts read-only tool calls while the model is still streaming.
+
+    The stream of every LiteLLM call goes through watch(), which feeds the
+    function-call argument fragments to an ArgumentStream per call. Once the
+    arguments of a tool registered as safe (read-only, scalar arguments) parse
+    as a complete JSON object, call_tool is started right away instead of after
+    the model's message ends. The tool function then claims the running call
+    if the final arguments are the same; speculative calls nobody claimed are
+    cancelled at the next model call of the turn, or after ttl seconds.
+    """
+
+    def __init__(self, call_tool: Optional[Callable[[str, Dict[str, Any], Optional[str]], Awaitable[Any]]] = None,
+                 ttl: float = 30.0):
+        # Called with the tool name, its arguments and the session id
+        self.call_tool = call_tool
+        self.ttl = ttl
+        self.safe = set()
+        # (invocation id, tool name, canonical arguments) -> (task, started)
+        self.pending: Dict[Tuple[str, str, str], Tuple[asyncio.Task, float]] = {}
+        self.dispatched = 0
+        self.used = 0
+        self.discarded = 0
+        self.head_start = 0.0
+
+    def register(self, tool_name: str, schema: Optional[Dict[str, Any]]) -> bool:
+        """Mark a tool as safe to call speculatively if it is"""
+        if is_speculation_safe(tool_name, schema):
+            self.safe.add(tool_name)
+        else:
+            self.safe.discard(tool_name)
+        return tool_name in self.safe
+
+    def _discard(self, key: Tuple[str, str, str]):
+        task, _ = self.pending.pop(key)
+        task.cancel()
+        self.discarded += 1
+
+    def _expire(self, invocation_id: Optional[str] = None):
+        now = time.perf_counter()
+        for key, (_, started) in list(self.pending.items()):
+            if key[0] == invocation_id or now - started > self.ttl:
+                self._discard(key)
+
+    def dispatch(self, scope: Tuple[str, Optional[str]], tool_name: str, arguments: Dict[str, Any]):
+        """Start a tool call from streamed arguments, if the tool is safe"""
+        if self.call_tool is None or tool_name not in self.safe:
+            return
+        self._expire()
+        key = (scope[0], tool_name, _canonical(arguments))
+        if key in self.pending:
+            return
+        task = asyncio.ensure_future(self.call_tool(tool_name, arguments, scope[1]))
+        # Retrieve the exception of calls that are never claimed
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self.pending[key] = (task, time.perf_counter())
+        self.dispatched += 1
+
+    def claim(self, invocation_id: str, tool_name: str, arguments: Optional[Dict[str, Any]]) -> Optional[asyncio.Task]:
+        """The speculative call with exactly these arguments, if one was started"""
+        entry = self.pending.pop((invocation_id, tool_name, _canonical(arguments)), None)
+        if entry is None:
+            return None
+        self.used += 1
+        self.head_start += time.perf_counter() - entry[1]
+        return entry[0]
+
+    async def watch(self, stream: AsyncIterator[Any], scope: Tuple[str, Optional[str]]) -> AsyncIterator[Any]:
+        """Pass a LiteLLM stream through, dispatching tool calls as their arguments complete"""
+        calls: Dict[int, list] = {}
+        async for part in stream:
+            for choice in part.get("choices") or ():
+                delta = choice.get("delta") if not choice.get("index") else None
+                for position, tool_call in enumerate((delta.get("tool_calls") if delta else None) or ()):
+                    function = tool_call.get("function") or {}
+                    index = tool_call.get("index")
+                    call = calls.setdefault(position if index is None else index, ["", ArgumentStream()])
+                    call[0] += function.get("name") or ""
+                    arguments = call[1].feed(function.get("arguments") or "")
+                    if arguments is not None:
+                        self.dispatch(scope, call[0], arguments)
+            yield part
+
+    async def before_model(self, callback_context, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        """Scope the coming model call to its turn; calls started for an earlier step are stale"""
+        if callback_context is not None:
+            session = getattr(callback_context, "session", None)
+            _scope.set((callback_context.invocation_id, session.id if session is not None else None))
+            self._expire(callback_context.invocation_id)
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"dispatched": self.dispatched, "used": self.used, "discarded": self.discarded,
+                "pending": len(self.pending), "head_start_seconds": round(self.head_start, 3)}
+
+
+class SpeculativeLiteLLMClient(LiteLLMClient):
+    """LiteLLM client for LiteLlm(llm_client=...) whose streamed responses pass through a SpeculativeDispatcher"""
+
+    def __init__(self, client: LiteLLMClient, dispatcher: SpeculativeDispatcher):
+        self.client = client
+        self.dispatcher = dispatcher
+
+    async def acompletion(self, model: Any, messages: Any, tools: Any, **kwargs: Any):
+        response = await self.client.acompletion(model=model, messages=messages, tools=tools, **kwargs)
+        scope = _scope.get()
+        if not kwargs.get("stream") or scope is None:
+            return response
+        return self.dispatcher.watch(response, scope)
+
+
+# Global dispatcher instance
+_speculative_dispatcher = None
+
+
+def get_speculative_dispatcher() -> SpeculativeDispatcher:
+    global _speculative_dispatcher
+
+    if _speculative_dispatcher is None:
+        _speculative_dispatcher = SpeculativeDispatcher()
+    return _speculative_dispatcher
@@ -0,0 +1,89 @@
+import csv
+import io
+import os
+from typing import Any, Dict, List, Optional
+
+from .parsing import ParsedResult
+
+TEXT = "text"
+TSV = "tsv"
+CSV = "csv"
+FORMATS = (TEXT, TSV, CSV)
+
+# Default result format per model; the longest matching name prefix wins
+MODEL_FORMATS: Dict[str, str] = {
+    "gpt-4o": TSV,
+    "gpt-4.1": TSV,
+}
+
+# Columns of each list kind, in output order
+_COLUMNS = {
+    "invoices": ("id", "amount", "currency", "state", "contact_id", "entry_date"),
+    "customers": ("id", "name", "email"),
+    "products": ("id", "name", "price", "currency"),
+}
+
+
+def _value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else f"{value:.2f}"
+    return str(value)
+
+
+def render_table(parsed: ParsedResult, fmt: str = TSV) -> Optional[str]:
+    """
+    Re-emit a parsed list as a dense table: a title line, a header row and one
+    row per record. Columns that are empty in every row are dropped, and a
+    currency shared by all rows moves into the title. Returns None for results
+    that are not lists.
+    """
+    columns = _COLUMNS.get(parsed.kind)
+    if columns is None:
+        return None
+    records = parsed.records
+    count = parsed.declared_count if parsed.declared_count is not None else len(records)
+    title = f"{count} {parsed.kind}"
+
+    columns = [column for column in columns if any(getattr(record, column) is not None for record in records)]
+    currencies = {record.currency for record in records} if "currency" in columns else set()
+    if len(currencies) == 1:
+        columns.remove("currency")
+        title += f", amounts in {currencies.pop()}"
+
+    rows = [[_value(getattr(record, column)) for column in columns] for record in records]
+    if fmt == CSV:
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(columns)
+        writer.writerows(rows)
+        return f"{title}:\n{out.getvalue().rstrip()}"
+    lines = ["\t".join(columns)] + ["\t".join(value.replace("\t", " ") for value in row) for row in rows]
+    return f"{title}:\n" + "\n".join(lines)
+
+
+def parse_formats(spec: str) -> Dict[str, str]:
+    """Parse per-model formats given as "gpt-4o-mini=tsv,gpt-3.5-turbo=text" """
+    formats = {}
+    for entry in spec.split(","):
+        model, sep, fmt = entry.partition("=")
+        if sep and model.strip() and fmt.strip().lower() in FORMATS:
+            formats[model.strip()] = fmt.strip().lower()
+    return formats
+
+
+def result_format_for(model: Optional[str]) -> str:
+    """
+    Pick the result format for a model name such as "openai/gpt-4o-mini".
+
+    BILLY_RESULT_FORMATS overrides the built-in MODEL_FORMATS per model, and
+    BILLY_RESULT_FORMAT is used for models matching neither.
+    """
+    name = (model or "").rsplit("/", 1)[-1]
+    formats = {**MODEL_FORMATS, **parse_formats(os.getenv("BILLY_RESULT_FORMATS", ""))}
+    matches: List[str] = [prefix for prefix in formats if name.startswith(prefix)]
+    if matches:
+        return formats[max(matches, key=len)]
+    fmt = os.getenv("BILLY_RESULT_FORMAT", TEXT).lower()
+    return fmt if fmt in FORMATS else TEXT
@@ -0,0 +1,45 @@
+import os
+import re
+from typing import FrozenSet, Optional
+
+from .federation import get_mcp_federation
+
+# Tool names that change Billy.dk data, also behind a federation namespace prefix
+_WRITE_TOOL = re.compile(r"(^|_)(create|update|delete|send|approve|void|book|pay)[A-Z_]")
+
+# Billy.dk tools known to only read data, for servers that do not annotate their tools
+DEFAULT_READ_ONLY_TOOLS = "listInvoices,getInvoice,listCustomers,listProducts,totalInvoiceAmount"
+
+_read_only_tools: Optional[FrozenSet[str]] = None
+
+
+def is_write_tool(tool_name: str) -> bool:
+    """Whether a tool's name says it changes data; names that do not say so may still change data"""
+    return bool(_WRITE_TOOL.search(tool_name))
+
+
+def read_only_tools() -> FrozenSet[str]:
+    """Tool names configured as read-only in BILLY_READ_ONLY_TOOLS, bare or with their namespace"""
+    global _read_only_tools
+
+    if _read_only_tools is None:
+        names = os.getenv("BILLY_READ_ONLY_TOOLS", DEFAULT_READ_ONLY_TOOLS).split(",")
+        _read_only_tools = frozenset(name.strip() for name in names if name.strip())
+    return _read_only_tools
+
+
+def is_read_only_tool(tool_name: str) -> bool:
+    """
+    Whether a tool is known to only read data, so it may be called ahead of the
+    model, prefetched or answered from an earlier result. Tools are read-only
+    if their server annotates them with readOnlyHint, or if they are configured
+    as read-only; every other tool is treated as a possible write.
+    """
+    if is_write_tool(tool_name):
+        return False
+    federation = get_mcp_federation()
+    hint = federation.read_only_hint(tool_name)
+    if hint is not None:
+        return hint
+    configured = read_only_tools()
+    return tool_name in configured or federation.base_name(tool_name) in configured
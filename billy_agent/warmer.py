@@ -0,0 +1,203 @@
+import asyncio
+import contextlib
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from .federation import base_tool_name
+
+# Lists every session asks for; their results are kept warm
+HOT_TOOLS = ("listInvoices", "listCustomers", "listProducts")
+
+
+def _failed(result: Any) -> bool:
+    return isinstance(result, dict) and bool(result.get("isError"))
+
+
+class CacheWarmer:
+    """
+    Keeps the results of the hot Billy.dk list tools warm.
+
+    At startup every hot tool is called once, and then again every interval
+    seconds (with jitter, so several agent processes do not refresh at the same
+    moment). Calls to a hot tool are answered from the cache right away
+    (stale-while-revalidate): an entry older than stale_after is still served,
+    and a refresh is started in the background. Entries older than max_stale
+    are not served. Writes drop the cache and refresh it.
+
+    Refreshes run one at a time, and only once no interactive tool call has
+    been running for quiet_period seconds, so the warmer never competes with
+    user traffic for the MCP server.
+    """
+
+    def __init__(self, call_tool: Optional[Callable[[str], Awaitable[Any]]] = None,
+                 tools: Iterable[str] = HOT_TOOLS, interval: float = 300.0, jitter: float = 0.2,
+                 stale_after: float = 60.0, max_stale: float = 1800.0, quiet_period: float = 1.0):
+        self.call_tool = call_tool
+        self.tools = set(tools)
+        self.interval = interval
+        self.jitter = jitter
+        self.stale_after = stale_after
+        self.max_stale = max_stale
+        self.quiet_period = quiet_period
+        # Hot tools the MCP servers actually provide
+        self.available = set()
+        # tool name -> (result, fetched at)
+        self.entries: Dict[str, Tuple[Any, float]] = {}
+        self._refreshes: Dict[str, asyncio.Task] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._generation = 0
+        self._interactive = 0
+        self._last_interactive = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._task_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.failures = 0
+        self.deferred = 0
+
+    def register(self, tool_name: str) -> bool:
+        """Keep a tool warm if it is one of the hot tools"""
+        if base_tool_name(tool_name) in self.tools:
+            self.available.add(tool_name)
+        return tool_name in self.available
+
+    @contextlib.contextmanager
+    def interactive(self):
+        """Mark an interactive tool call; refreshes wait until none has run for quiet_period"""
+        self._interactive += 1
+        try:
+            yield
+        finally:
+            self._interactive -= 1
+            self._last_interactive = time.monotonic()
+
+    def _busy(self) -> bool:
+        return self._interactive > 0 or time.monotonic() - self._last_interactive < self.quiet_period
+
+    def age(self, tool_name: str) -> Optional[float]:
+        entry = self.entries.get(tool_name)
+        return time.monotonic() - entry[1] if entry is not None else None
+
+    def get(self, tool_name: str) -> Optional[Any]:
+        """The cached result of a hot tool, revalidated in the background when stale"""
+        if tool_name not in self.available:
+            return None
+        age = self.age(tool_name)
+        if age is None or age > self.max_stale:
+            self.misses += 1
+            return None
+        if age > self.stale_after:
+            self.stale_hits += 1
+            self.revalidate(tool_name)
+        else:
+            self.hits += 1
+        return self.entries[tool_name][0]
+
+    def store(self, tool_name: str, result: Any):
+        """Cache a result an interactive call fetched anyway"""
+        if tool_name in self.available and not _failed(result):
+            self.entries[tool_name] = (result, time.monotonic())
+
+    def invalidate(self):
+        """Drop all cached lists after a write, and fetch them again"""
+        self._generation += 1
+        self.entries.clear()
+        for tool_name in self.available:
+            self.revalidate(tool_name)
+
+    async def _refresh(self, tool_name: str):
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        async with self._lock:
+            generation = None
+            # A write during the call may have changed the list again; fetch it once more
+            while generation != self._generation:
+                while self._busy():
+                    self.deferred += 1
+                    await asyncio.sleep(self.quiet_period)
+                generation = self._generation
+                try:
+                    result = await self.call_tool(tool_name)
+                    if _failed(result):
+                        raise RuntimeError(str(result.get("content") or result))
+                except Exception as e:
+                    self.failures += 1
+                    print(f"⚠️  Cache warmer could not refresh {tool_name}: {e}")
+                    return
+            self.entries[tool_name] = (result, time.monotonic())
+            self.refreshes += 1
+
+    def revalidate(self, tool_name: str) -> Optional[asyncio.Task]:
+        """Start refreshing one tool in the background unless a refresh is already running"""
+        if self.call_tool is None:
+            return None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        refresh = self._refreshes.get(tool_name)
+        if refresh is None or refresh.done() or refresh.get_loop() is not loop:
+            refresh = self._refreshes[tool_name] = loop.create_task(self._refresh(tool_name))
+        return refresh
+
+    async def warm(self):
+        """Refresh every hot tool whose entry is missing or older than the interval"""
+        refreshes = [self.revalidate(tool_name) for tool_name in sorted(self.available)
+                     if self.age(tool_name) is None or self.age(tool_name) >= self.interval]
+        await asyncio.gather(*(refresh for refresh in refreshes if refresh is not None))
+
+    def _next_delay(self) -> float:
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.warm()
+            except Exception as e:
+                print(f"⚠️  Cache warming failed: {e}")
+            await asyncio.sleep(self._next_delay())
+
+    def ensure_started(self) -> bool:
+        """Start warming on the running loop unless already running there"""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task_loop is loop:
+            return False
+        self._task = asyncio.ensure_future(self._run())
+        self._task_loop = loop
+        return True
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        ages = {tool_name: round(self.age(tool_name), 1) for tool_name in self.entries}
+        return {"hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses,
+                "refreshes": self.refreshes, "failures": self.failures, "deferred": self.deferred,
+                "ages": ages}
+
+
+# Global warmer instance
+_cache_warmer = None
+
+
+def get_cache_warmer() -> CacheWarmer:
+    """Get or create the cache warmer configured from the environment"""
+    global _cache_warmer
+
+    if _cache_warmer is None:
+        tools = os.getenv("BILLY_WARM_TOOLS", ",".join(HOT_TOOLS))
+        _cache_warmer = CacheWarmer(
+            tools=[name.strip() for name in tools.split(",") if name.strip()],
+            interval=float(os.getenv("BILLY_WARM_INTERVAL", "300")),
+            stale_after=float(os.getenv("BILLY_WARM_STALE_AFTER", "60")),
+            max_stale=float(os.getenv("BILLY_WARM_MAX_STALE", "1800")),
+        )
+    return _cache_warmer
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Importing billy_agent creates root_agent and the write outbox; keep the tests' writes out of the real outbox
+os.environ["BILLY_OUTBOX_PATH"] = os.path.join(tempfile.mkdtemp(prefix="billy-test-"), "outbox.sqlite")
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import sys
+import time
+
+from aiohttp import web
+
+print("🔍 Billy Agent Factory Event-Loop Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from google.adk.models.llm_request import LlmRequest
+
+from billy_agent import create_billy_agent, create_billy_agent_async
+from billy_agent import federation, health
+
+# Largest stall of the event loop we accept while an agent is created
+MAX_LAG_MS = 100
+# Every fake MCP request takes this long, so discovery spans several ticks
+SERVER_DELAY = 0.3
+
+TOOLS = [
+    {"name": "listInvoices", "description": "List invoices", "inputSchema": {"type": "object", "properties": {}}},
+    {"name": "listCustomers", "description": "List customers", "inputSchema": {"type": "object", "properties": {}}},
+]
+
+
+async def _start_fake_mcp_server():
+    """Start a slow fake MCP server on a free port"""
+    async def mcp(request):
+        await asyncio.sleep(SERVER_DELAY)
+        body = await request.json()
+        result = {"tools": TOOLS} if body["method"] == "tools/list" else {}
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": result})
+
+    async def health_check(request):
+        await asyncio.sleep(SERVER_DELAY)
+        return web.json_response({"status": "ok", "connections": 1})
+
+    app = web.Application()
+    app.router.add_post("/mcp", mcp)
+    app.router.add_get("/health", health_check)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def _use_server(url):
+    """Point a fresh federation at the fake server"""
+    os.environ["MCP_SERVER_URL"] = url
+    os.environ.pop("MCP_SERVERS", None)
+    federation._mcp_federation = None
+    health._health_prober = None
+
+
+async def _max_loop_lag_ms(coro):
+    """Run coro while a ticker measures how late the event loop wakes it up"""
+    loop = asyncio.get_running_loop()
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = loop.time()
+            await asyncio.sleep(0.01)
+            lags.append((loop.time() - started - 0.01) * 1000)
+
+    ticker_task = asyncio.ensure_future(ticker())
+    try:
+        result = await coro
+    finally:
+        done.set()
+        await ticker_task
+    return result, max(lags, default=0.0)
+
+
+async def _cleanup(runner):
+    health.get_health_prober().stop()
+    await federation.get_mcp_federation().close()
+    await runner.cleanup()
+
+
+def test_async_factory_keeps_loop_responsive():
+    """create_billy_agent_async() discovers tools without stalling the loop"""
+    async def run():
+        runner, url = await _start_fake_mcp_server()
+        _use_server(url)
+        try:
+            started = time.monotonic()
+            agent, lag = await _max_loop_lag_ms(create_billy_agent_async())
+            elapsed = time.monotonic() - started
+        finally:
+            await _cleanup(runner)
+
+        print(f"   ⏱️  async factory: {elapsed:.2f}s, max loop lag {lag:.1f} ms")
+        assert [tool.name for tool in agent.tools] == ["listInvoices", "listCustomers", "queryInvoices",
+                                                       "queryCustomers", "readResultPage"]
+        # Discovery really waited on the slow server...
+        assert elapsed >= SERVER_DELAY
+        # ...without blocking the loop meanwhile
+        assert lag < MAX_LAG_MS
+
+    asyncio.run(run())
+
+
+def test_sync_factory_inside_running_loop():
+    """create_billy_agent() returns at once in a running loop; tools follow"""
+    async def run():
+        runner, url = await _start_fake_mcp_server()
+        _use_server(url)
+        try:
+            async def create_and_first_model_call():
+                agent = create_billy_agent()
+                assert agent.tools == []
+                llm_request = LlmRequest()
+                for callback in agent.canonical_before_model_callbacks:
+                    await callback(None, llm_request)
+                return agent, llm_request
+
+            (agent, llm_request), lag = await _max_loop_lag_ms(create_and_first_model_call())
+        finally:
+            await _cleanup(runner)
+
+        print(f"   ⏱️  sync factory in running loop: max loop lag {lag:.1f} ms")
+        names = ["listInvoices", "listCustomers", "queryInvoices", "queryCustomers", "readResultPage"]
+        assert [tool.name for tool in agent.tools] == names
+        assert set(llm_request.tools_dict) == set(names)
+        assert lag < MAX_LAG_MS
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_async_factory_keeps_loop_responsive()
+    test_sync_factory_inside_running_loop()
+    print("✅ Agent factory keeps the event loop responsive")
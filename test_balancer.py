@@ -0,0 +1,85 @@
+import random
+import sys
+
+print("🔍 Billy Replica Balancer Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent.balancer import ReplicaBalancer
+
+URLS = ["http://replica-a/mcp", "http://replica-b/mcp", "http://replica-c/mcp"]
+
+
+def test_p2c_prefers_the_faster_and_less_loaded_replica():
+    random.seed(1)
+    balancer = ReplicaBalancer(URLS[:2], strategy="p2c")
+    fast, slow = balancer.replicas
+    fast.record(10, ok=True)
+    slow.record(100, ok=True)
+    assert all(balancer.choose() is fast for _ in range(20))
+    # Enough requests queued on the fast replica make the slow one the shorter wait
+    fast.outstanding = 20
+    assert balancer.choose() is slow
+
+
+def test_least_outstanding_picks_the_idlest_replica():
+    balancer = ReplicaBalancer(URLS, strategy="least")
+    a, b, c = balancer.replicas
+    a.outstanding, b.outstanding, c.outstanding = 3, 1, 2
+    assert balancer.choose() is b
+    assert balancer.choose(exclude={b.mcp_url}) is c
+
+
+def test_failing_replicas_are_ejected_and_readmitted():
+    balancer = ReplicaBalancer(URLS[:2], strategy="least", max_failures=2)
+    a, b = balancer.replicas
+    for _ in range(2):
+        balancer.finished(a, balancer.started(a), ok=False)
+    assert not a.healthy and balancer.healthy_replicas() == [b]
+    assert all(balancer.choose() is b for _ in range(5))
+    # A cancelled request is not a failure
+    balancer.finished(b, balancer.started(b), ok=None)
+    assert b.healthy and b.consecutive_failures == 0
+
+    balancer.mark_health(a, True)
+    assert a.healthy and a.consecutive_failures == 0
+    balancer.mark_health(b, False)
+    assert balancer.choose() is a
+    # With every replica ejected, one is still tried
+    balancer.mark_health(a, False)
+    assert balancer.choose() in (a, b)
+
+
+def test_affinity_sticks_until_the_replica_is_ejected():
+    balancer = ReplicaBalancer(URLS, strategy="least")
+    pinned = balancer.choose("session-1")
+    pinned.outstanding = 10
+    assert balancer.choose("session-1") is pinned
+    assert balancer.choose("session-2") is not pinned
+    balancer.mark_health(pinned, False)
+    moved = balancer.choose("session-1")
+    assert moved is not pinned
+    balancer.mark_health(pinned, True)
+    assert balancer.choose("session-1") is moved
+
+
+def test_affinity_keys_are_bounded():
+    balancer = ReplicaBalancer(URLS, max_affinity_keys=100)
+    for i in range(1000):
+        balancer.choose(f"session-{i}")
+    assert len(balancer._affinity) == 100
+    # Recently used keys stay, the oldest go first
+    balancer.choose("session-900")
+    balancer.choose("session-new")
+    assert "session-900" in balancer._affinity and "session-901" not in balancer._affinity
+
+
+if __name__ == "__main__":
+    test_p2c_prefers_the_faster_and_less_loaded_replica()
+    test_least_outstanding_picks_the_idlest_replica()
+    test_failing_replicas_are_ejected_and_readmitted()
+    test_affinity_sticks_until_the_replica_is_ejected()
+    test_affinity_keys_are_bounded()
+    print("✅ Requests are balanced over MCP replicas")
@@ -0,0 +1,159 @@
+import asyncio
+import sys
+import time
+
+print("🔍 Billy Cache Warmer Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent import agent as billy
+from billy_agent import outbox as outbox_module
+from billy_agent import warmer as warmer_module
+from billy_agent.outbox import WriteOutbox
+from billy_agent.warmer import CacheWarmer
+
+# Every fake MCP call takes this long
+TOOL_DELAY = 0.1
+
+
+class FakeBilly:
+    """Fake MCP calls; list results carry a version that every write increases"""
+
+    def __init__(self):
+        self.calls = []
+        self.version = 1
+
+    async def call(self, name):
+        self.calls.append((name, time.monotonic()))
+        version = self.version
+        await asyncio.sleep(TOOL_DELAY)
+        return {"content": [{"type": "text", "text": f"{name} v{version}"}]}
+
+    async def call_tool(self, name, arguments=None, affinity_key=None, meta=None):
+        if name.startswith("create"):
+            self.version += 1
+            return {"content": [{"type": "text", "text": "Invoice created successfully!"}]}
+        return await self.call(name)
+
+    def server_state(self, name):
+        return None
+
+
+def _warmer(billy_fake, **kwargs):
+    warmer = CacheWarmer(billy_fake.call, quiet_period=0.05, **kwargs)
+    for name in ("listInvoices", "listCustomers", "listProducts", "getInvoice"):
+        warmer.register(name)
+    return warmer
+
+
+def _text(result):
+    return result["content"][0]["text"]
+
+
+def test_startup_warms_and_stale_entries_are_served_while_refreshing():
+    async def run():
+        fake = FakeBilly()
+        warmer = _warmer(fake, stale_after=0.2)
+        assert warmer.ensure_started()
+        await asyncio.sleep(TOOL_DELAY * 3.5)
+        warm = sorted(warmer.entries)
+        fake.version = 2
+        await asyncio.sleep(0.2)
+        started = time.perf_counter()
+        stale = warmer.get("listInvoices")
+        served_in = time.perf_counter() - started
+        await warmer._refreshes["listInvoices"]
+        fresh = warmer.get("listInvoices")
+        warmer.stop()
+        return warmer, warm, stale, served_in, fresh
+
+    warmer, warm, stale, served_in, fresh = asyncio.run(run())
+    assert warm == ["listCustomers", "listInvoices", "listProducts"]
+    assert _text(stale) == "listInvoices v1" and served_in < 0.01
+    assert _text(fresh) == "listInvoices v2"
+    assert warmer.get("getInvoice") is None
+    stats = warmer.stats()
+    assert stats["stale_hits"] == 1 and stats["hits"] == 1 and stats["refreshes"] == 4
+
+
+def test_refreshes_wait_for_interactive_calls():
+    async def run():
+        fake = FakeBilly()
+        warmer = _warmer(fake)
+        with warmer.interactive():
+            refresh = warmer.revalidate("listCustomers")
+            await asyncio.sleep(0.2)
+            assert fake.calls == []
+            released = time.monotonic()
+        await refresh
+        return warmer, fake, released
+
+    warmer, fake, released = asyncio.run(run())
+    assert fake.calls[0][1] - released >= warmer.quiet_period
+    assert warmer.stats()["deferred"] >= 1
+    assert 240 <= CacheWarmer(interval=300)._next_delay() <= 360
+
+
+def test_writes_drop_and_refresh_the_lists():
+    async def run():
+        fake = FakeBilly()
+        warmer = _warmer(fake)
+        await warmer.warm()
+        # A refresh that was running when the write happened must not store the old list
+        refresh = warmer.revalidate("listInvoices")
+        warmer.entries.pop("listInvoices")
+        await asyncio.sleep(0.06)
+        fake.version = 2
+        warmer.invalidate()
+        missed = warmer.get("listInvoices")
+        await refresh
+        await asyncio.gather(*warmer._refreshes.values())
+        return warmer, missed
+
+    warmer, missed = asyncio.run(run())
+    assert missed is None
+    assert {_text(result) for result, _ in warmer.entries.values()} == {
+        "listInvoices v2", "listCustomers v2", "listProducts v2"}
+
+
+def test_agent_answers_hot_lists_from_the_cache():
+    async def run():
+        warmer = warmer_module._cache_warmer = CacheWarmer(billy._call_warm_tool, quiet_period=0.05)
+        outbox = outbox_module._write_outbox = WriteOutbox(billy._call_outbox_tool)
+        for name in ("listInvoices", "createInvoice"):
+            warmer.register(name)
+        outbox.register("createInvoice")
+        first = await billy._call_tool("listInvoices")
+        started = time.perf_counter()
+        second = await billy._call_tool("listInvoices")
+        cached_in = time.perf_counter() - started
+        await billy._call_tool("createInvoice", {"contactId": "customer-456", "amount": 100})
+        await asyncio.gather(*warmer._refreshes.values())
+        third = await billy._call_tool("listInvoices")
+        outbox.stop()
+        return first, second, cached_in, third
+
+    fake = FakeBilly()
+    get_mcp_federation = billy.get_mcp_federation
+    billy.get_mcp_federation = lambda: fake
+    try:
+        first, second, cached_in, third = asyncio.run(run())
+    finally:
+        billy.get_mcp_federation = get_mcp_federation
+        warmer_module._cache_warmer = None
+        outbox_module._write_outbox = None
+
+    print(f"   ⚡ listInvoices answered in {cached_in * 1000:.1f} ms from the warm cache")
+    assert _text(first) == _text(second) == "listInvoices v1" and cached_in < TOOL_DELAY / 2
+    assert _text(third) == "listInvoices v2"
+    assert [name for name, _ in fake.calls] == ["listInvoices", "listInvoices"]
+
+
+if __name__ == "__main__":
+    test_startup_warms_and_stale_entries_are_served_while_refreshing()
+    test_refreshes_wait_for_interactive_calls()
+    test_writes_drop_and_refresh_the_lists()
+    test_agent_answers_hot_lists_from_the_cache()
+    print("✅ Hot lists are warm and served while they refresh")
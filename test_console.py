@@ -0,0 +1,89 @@
+import asyncio
+import contextlib
+import io
+import sys
+from typing import AsyncGenerator
+
+print("🔍 Billy Streaming Console Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from billy_agent.console import run_console
+
+CHUNKS = ["You have ", "2 invoices", " in total."]
+
+
+class StreamingLlm(BaseLlm):
+    """Calls listInvoices once, then streams its answer in chunks when asked to"""
+    streamed: list = []
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        self.streamed.append(stream)
+        if not any(part.function_response for content in llm_request.contents for part in content.parts or ()):
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(
+                function_call=types.FunctionCall(id="call-1", name="listInvoices", args={}))]))
+            return
+        if stream:
+            for chunk in CHUNKS:
+                await asyncio.sleep(0.01)
+                yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=chunk)]), partial=True)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="".join(CHUNKS))]))
+
+
+async def listInvoices() -> str:
+    """List invoices"""
+    return "Found 2 invoices"
+
+
+def _scripted(lines):
+    lines = iter(lines)
+
+    async def read_line(prompt: str) -> str:
+        line = next(lines, None)
+        if line is None:
+            raise EOFError
+        return line
+
+    return read_line
+
+
+def test_console_streams_tokens_and_tool_calls():
+    llm = StreamingLlm(model="fake/streaming")
+    agent = LlmAgent(name="billy_test", model=llm, instruction="Answer about invoices", tools=[listInvoices])
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        first_tokens = asyncio.run(run_console(agent, _scripted(["how many invoices?", "", "exit"])))
+    text = output.getvalue()
+
+    assert llm.streamed and all(llm.streamed)
+    assert len(first_tokens) == 1 and first_tokens[0] > 0
+    assert "🔧 listInvoices({})" in text
+    assert "✅ listInvoices done" in text
+    # The answer is printed once, from its chunks, not again as the final response
+    assert text.count("Billy: You have 2 invoices in total.") == 1
+    assert "first token" in text and "Average time to first token" in text
+    assert text.index("🔧 listInvoices") < text.index("Billy: ")
+
+
+def test_console_ends_on_eof_without_turns():
+    agent = LlmAgent(name="billy_test", model=StreamingLlm(model="fake/streaming"), instruction="Answer")
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        first_tokens = asyncio.run(run_console(agent, _scripted([])))
+    assert first_tokens == []
+    assert "👋 Goodbye!" in output.getvalue()
+
+
+if __name__ == "__main__":
+    test_console_streams_tokens_and_tool_calls()
+    test_console_ends_on_eof_without_turns()
+    print("✅ The console streams tokens and tool calls as they happen")
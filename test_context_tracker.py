@@ -0,0 +1,167 @@
+import asyncio
+import sys
+from types import SimpleNamespace
+
+from google.genai import types
+
+print("🔍 Billy Context Tracker Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from billy_agent import agent as billy
+from billy_agent import budget, delta
+from billy_agent import context as context_module
+from billy_agent.budget import ResultBudgeter
+from billy_agent.context import STATE_IDS, STATE_TOPIC, ContextTracker, mentioned_topic
+from billy_agent.delta import DeltaRenderer
+from billy_agent.result_store import ResultStore
+from billy_agent.router import IntentRouter
+
+INVOICES = ("Found 3 invoices:\n• Invoice abc123: 1000 DKK - paid\n• Invoice def456: 2500 DKK - draft\n"
+            "• Invoice ghi789: 750 DKK - sent")
+CUSTOMERS = "Found 3 customers:\n• John Doe (customer-456)\n• Jane Smith (customer-789)\n• Acme ApS (customer-999)"
+TOOLS = ("listInvoices", "listCustomers", "queryInvoices", "queryCustomers", "getInvoice")
+
+
+def _context(state, invocation_id):
+    return SimpleNamespace(state=state, invocation_id=invocation_id)
+
+
+def _request(text, *later):
+    llm_request = LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text=text)]), *later])
+    llm_request.tools_dict = {name: None for name in TOOLS}
+    return llm_request
+
+
+def _note(llm_request):
+    parts = llm_request.contents[0].parts
+    return parts[-1].text if len(parts) > 1 else None
+
+
+def _call(name):
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(
+        function_call=types.FunctionCall(name=name, args={}))]))
+
+
+def test_tools_set_topic_and_ids():
+    tracker, state = ContextTracker(), {}
+    tracker.observe(state, "listCustomers", {}, CUSTOMERS)
+    tracker.observe(state, "getInvoice", {"id": "abc123"}, "Invoice zzz not found")
+    assert state[STATE_TOPIC] == "invoices"
+    assert state[STATE_IDS] == {"customers": ["customer-456", "customer-789", "customer-999"],
+                                "invoices": ["abc123"]}
+
+
+def test_ambiguous_follow_up_is_resolved_to_the_topic():
+    async def run():
+        tracker = ContextTracker()
+        state = {STATE_TOPIC: "customers", STATE_IDS: {"customers": ["customer-456"]}}
+        follow_up = _request("show me the 3 latest")
+        await tracker.before_model(_context(state, "i2"), follow_up)
+        # A later model call of the same turn keeps the turn's note, even after tools ran
+        state[STATE_TOPIC] = "invoices"
+        second_step = _request("show me the 3 latest", types.Content(role="model", parts=[types.Part(text="...")]))
+        await tracker.before_model(_context(state, "i2"), second_step)
+        await tracker.after_model(_context(state, "i2"), _call("listInvoices"))
+        return tracker, follow_up, second_step
+
+    tracker, follow_up, second_step = asyncio.run(run())
+    assert _note(follow_up) == ("[Context: the conversation is about customers; this follow-up refers to customers "
+                                "(use listCustomers, queryCustomers); customers last referenced: customer-456]")
+    assert _note(second_step) == _note(follow_up)
+    assert tracker.stats() == {"resolved_follow_ups": 1, "resolved_references": 0, "clarifications": 0,
+                               "wrong_tool_calls": 1}
+
+
+def test_named_topic_switches_and_no_topic_adds_no_note():
+    async def run():
+        tracker = ContextTracker()
+        fresh = _request("show me the latest")
+        await tracker.before_model(_context({}, "i1"), fresh)
+        await tracker.after_model(_context({}, "i1"), LlmResponse(content=types.Content(
+            role="model", parts=[types.Part(text="Do you mean customers or invoices?")])))
+        state = {STATE_TOPIC: "customers"}
+        switched = _request("which invoices are overdue?")
+        await tracker.before_model(_context(state, "i2"), switched)
+        return tracker, fresh, switched, state
+
+    tracker, fresh, switched, state = asyncio.run(run())
+    assert _note(fresh) is None
+    assert state[STATE_TOPIC] == "invoices"
+    assert _note(switched) == "[Context: the conversation is about invoices]"
+    assert tracker.stats()["clarifications"] == 1
+    assert mentioned_topic("vis fakturaerne") == "invoices"
+    assert mentioned_topic("customers and invoices") is None
+
+
+def test_references_are_resolved_to_ids():
+    async def run():
+        tracker, state = ContextTracker(), {}
+        tracker.observe(state, "listInvoices", {}, INVOICES)
+        second = _request("what is the state of the second one?")
+        await tracker.before_model(_context(state, "i2"), second)
+        ambiguous = _request("mark it paid")
+        await tracker.before_model(_context(state, "i3"), ambiguous)
+
+        # "show the second one" is answered with getInvoice on that ID, without the model
+        routed = []
+
+        async def call_tool(tool_name, arguments, callback_context=None):
+            routed.append((tool_name, arguments))
+            tracker.observe(callback_context.state, tool_name, arguments, "Invoice #def456: 2500 DKK - Status: draft")
+            return {"content": [{"type": "text", "text": "Invoice #def456: 2500 DKK - Status: draft"}]}
+
+        router = IntentRouter(call_tool)
+        answer = await router.before_model(_context(state, "i4"), _request("show the second one"))
+        # After that one invoice, "it" is clear
+        paid = _request("mark it paid")
+        await tracker.before_model(_context(state, "i5"), paid)
+        return tracker, second, ambiguous, routed, answer, paid
+
+    tracker, second, ambiguous, routed, answer, paid = asyncio.run(run())
+    assert _note(second).endswith('; "the second one" is invoice def456]')
+    assert "abc123, def456, ghi789" in _note(ambiguous) and "is invoice" not in _note(ambiguous)
+    assert routed == [("getInvoice", {"id": "def456"})] and "def456" in answer.content.parts[0].text
+    assert _note(paid).endswith('; "it" is invoice def456]')
+    assert tracker.stats()["resolved_references"] == 2
+
+
+def test_ids_are_recorded_from_the_result_before_it_is_rendered():
+    def fit(tool_name, text, arguments=None):
+        return billy._fit_result(tool_name, {"content": [{"type": "text", "text": text}]}, context, arguments)
+
+    state = {}
+    # The default model gets tables, from which no IDs could be read back
+    context = SimpleNamespace(state=state, invocation_id="i1", _invocation_context=SimpleNamespace(
+        session=SimpleNamespace(id="s1"), agent=SimpleNamespace(model="openai/gpt-4o-mini")))
+    budget._result_budgeter = ResultBudgeter(store=ResultStore())
+    delta._delta_renderer = DeltaRenderer()
+    context_module._context_tracker = ContextTracker()
+    try:
+        table = fit("listInvoices", INVOICES)
+        listed = dict(state[STATE_IDS])
+        fit("getInvoice", "Invoice #def456: 2500 DKK - Status: draft", {"id": "def456"})
+        single = dict(state[STATE_IDS])
+        fit("listCustomers", CUSTOMERS)
+    finally:
+        budget._result_budgeter = delta._delta_renderer = context_module._context_tracker = None
+
+    assert table.splitlines()[1] == "id\tamount\tstate"
+    assert listed == {"invoices": ["abc123", "def456", "ghi789"]}
+    assert single == {"invoices": ["def456"]}
+    assert state[STATE_TOPIC] == "customers"
+    assert state[STATE_IDS] == {"invoices": ["def456"], "customers": ["customer-456", "customer-789", "customer-999"]}
+
+
+if __name__ == "__main__":
+    test_tools_set_topic_and_ids()
+    test_ambiguous_follow_up_is_resolved_to_the_topic()
+    test_named_topic_switches_and_no_topic_adds_no_note()
+    test_references_are_resolved_to_ids()
+    test_ids_are_recorded_from_the_result_before_it_is_rendered()
+    print("✅ Follow-ups are resolved to the conversation's topic")
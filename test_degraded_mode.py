@@ -0,0 +1,191 @@
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+print("🔍 Billy Degraded Mode Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent import agent as billy
+from billy_agent import degraded, query
+from billy_agent import outbox as outbox_module
+from billy_agent.degraded import STALE_META, LastKnownGood, stale_note
+from billy_agent.health import DOWN
+from billy_agent.mcp_client import McpServerUnavailable
+from billy_agent.outbox import DONE, PENDING, WriteOutbox
+from billy_agent.query import BillyReplica, query_invoices
+
+BY_ID = {"type": "object", "properties": {"id": {"type": "string"}}, "required": ["id"]}
+INVOICES = ("Found 2 invoices:\n• Invoice abc123: 1000 DKK - paid (contact: c1, 2024-01-05)\n"
+            "• Invoice def456: 2500 DKK - draft (contact: c2, 2024-02-07)")
+
+
+def _text(text, error=False):
+    return {"content": [{"type": "text", "text": text}], "isError": error}
+
+
+class FakeBilly:
+    """Fake MCP calls whose speed and availability the test changes"""
+
+    def __init__(self):
+        self.calls = []
+        self.version = 1
+        self.delay = 0.0
+        self.state = None
+
+    async def call_tool(self, name, arguments=None, affinity_key=None, meta=None):
+        self.calls.append(name)
+        if self.state == DOWN:
+            raise McpServerUnavailable("billy", "Connection refused")
+        await asyncio.sleep(self.delay)
+        if name.startswith("create"):
+            return _text("Invoice created successfully!")
+        return _text(f"Invoice #{(arguments or {}).get('id')}: 1000 DKK - Status: paid (v{self.version})")
+
+    def server_state(self, name):
+        return self.state
+
+
+def test_slow_reads_fall_back_to_the_last_known_good_result():
+    async def run():
+        fake = FakeBilly()
+        cache = LastKnownGood(read_timeout=0.05)
+        fetch = lambda: fake.call_tool("getInvoice", {"id": "abc123"})
+        first = await cache.call("getInvoice", {"id": "abc123"}, fetch)
+        fake.version, fake.delay = 2, 0.2
+        started = time.perf_counter()
+        stale = await cache.call("getInvoice", {"id": "abc123"}, fetch)
+        served_in = time.perf_counter() - started
+        # The slow call keeps running and replaces the kept result
+        await asyncio.gather(*cache._revalidations.values())
+        fake.delay = 0.0
+        fresh = await cache.call("getInvoice", {"id": "abc123"}, fetch)
+        return cache, first, stale, served_in, fresh
+
+    cache, first, stale, served_in, fresh = asyncio.run(run())
+    assert "(v1)" in first["content"][0]["text"] and STALE_META not in first.get("_meta", {})
+    assert "(v1)" in stale["content"][0]["text"] and served_in < 0.15
+    assert "Billy.dk is not responding" in stale_note(stale)
+    assert "(v2)" in fresh["content"][0]["text"] and stale_note(fresh) is None
+    assert cache.stats()["timeouts"] == 1 and cache.stats()["revalidated"] == 2
+
+
+def test_slow_reads_of_a_healthy_server_are_waited_for():
+    async def run():
+        fake = FakeBilly()
+        fetch = lambda: fake.call_tool("listInvoices")
+        await cache.call("listInvoices", None, fetch)
+        # Slower than usual, but the prober does not report the server degraded
+        fake.version, fake.delay = 2, 0.3
+        return await cache.call("listInvoices", None, fetch)
+
+    saved = os.environ.pop("BILLY_DEGRADED_READ_TIMEOUT", None)
+    degraded._last_known_good = None
+    try:
+        cache = degraded.get_last_known_good()
+    finally:
+        degraded._last_known_good = None
+        if saved is not None:
+            os.environ["BILLY_DEGRADED_READ_TIMEOUT"] = saved
+    # The default only guards against a hung call, far above a normal list
+    assert cache.read_timeout == 30
+    live = asyncio.run(run())
+    assert "(v2)" in live["content"][0]["text"] and stale_note(live) is None
+    assert cache.stats()["served_stale"] == 0 and cache.stats()["timeouts"] == 0
+
+
+def test_degraded_server_is_not_waited_for():
+    async def run():
+        fake = FakeBilly()
+        cache = LastKnownGood(read_timeout=5)
+        fetch = lambda: fake.call_tool("getInvoice", {"id": "abc123"})
+        await cache.call("getInvoice", {"id": "abc123"}, fetch)
+        fake.delay = 0.5
+        started = time.perf_counter()
+        stale = await cache.call("getInvoice", {"id": "abc123"}, fetch, degraded=True)
+        served_in = time.perf_counter() - started
+        await asyncio.gather(*cache._revalidations.values())
+        # Billy.dk answering with an outage is not a good result either
+        failed = lambda: asyncio.sleep(0, _text("503 Service Unavailable", error=True))
+        outage = await cache.call("getInvoice", {"id": "abc123"}, failed)
+        return stale, served_in, outage
+
+    stale, served_in, outage = asyncio.run(run())
+    assert stale["_meta"][STALE_META] == 0 and served_in < 0.1
+    assert STALE_META in outage["_meta"]
+
+
+def test_writes_are_queued_at_once_and_reads_are_served_through_the_agent():
+    async def run():
+        get_invoice = billy.create_dynamic_tool_function("getInvoice", "Get an invoice", BY_ID)
+        context = SimpleNamespace(state={}, invocation_id="i1", function_call_id="call-1",
+                                  _invocation_context=SimpleNamespace(session=SimpleNamespace(id="s1"),
+                                                                      agent=SimpleNamespace(model="openai/gpt-4o-mini")))
+        live = await get_invoice(tool_context=context, id="abc123")
+        fake.state = DOWN
+        stale = await get_invoice(tool_context=context, id="abc123")
+        unknown = await get_invoice(tool_context=context, id="zzz999")
+        # A write is not served from old data: it waits in the outbox, and the caller hears so at once
+        started = time.perf_counter()
+        queued = await billy._call_tool("createInvoice", {"contactId": "c1", "amount": 100}, context)
+        queued_in = time.perf_counter() - started
+        key = queued["_meta"]["billy/outboxKey"]
+        while_down = outbox.status(key)["state"]
+        fake.state = None
+        await outbox.wait(key, 2)
+        outbox.stop()
+        return live, stale, unknown, queued, queued_in, while_down, outbox.status(key)["state"]
+
+    fake = FakeBilly()
+    saved = billy.get_mcp_federation, billy.PREFETCH, billy.SPECULATIVE_TOOLS, billy.CACHE_WARMER
+    billy.get_mcp_federation = lambda: fake
+    billy.PREFETCH = billy.SPECULATIVE_TOOLS = billy.CACHE_WARMER = False
+    degraded._last_known_good = LastKnownGood()
+    outbox = outbox_module._write_outbox = WriteOutbox(billy._call_outbox_tool, retry_delay=0.05)
+    outbox.register("createInvoice")
+    try:
+        live, stale, unknown, queued, queued_in, while_down, after = asyncio.run(run())
+    finally:
+        billy.get_mcp_federation, billy.PREFETCH, billy.SPECULATIVE_TOOLS, billy.CACHE_WARMER = saved
+        degraded._last_known_good = None
+        outbox_module._write_outbox = None
+
+    assert "abc123" in live and "not responding" not in live
+    assert stale.startswith("⚠️ Billy.dk is not responding") and "abc123" in stale
+    assert "unavailable" in unknown
+    assert "saved in the outbox" in queued["content"][0]["text"] and queued_in < 0.1
+    assert while_down == PENDING and after == DONE
+    assert fake.calls.count("createInvoice") == 1
+
+
+def test_replica_answers_queries_from_stale_lists():
+    class DownFederation:
+        primary = SimpleNamespace(name="billy")
+
+        def check_available(self, server_name):
+            raise McpServerUnavailable(server_name, "Connection refused")
+
+    replica = BillyReplica(DownFederation(), ttl=60)
+    replica.observe("listInvoices", _text(INVOICES))
+    replica.fetched_at["invoices"] -= 600
+    query._billy_replica = replica
+    try:
+        text = asyncio.run(query_invoices(sort_by="amount"))
+    finally:
+        query._billy_replica = None
+
+    assert "2 of 2 matching invoices" in text and "data 600s old" in text
+    assert text.index("def456") < text.index("abc123")
+
+
+if __name__ == "__main__":
+    test_slow_reads_fall_back_to_the_last_known_good_result()
+    test_slow_reads_of_a_healthy_server_are_waited_for()
+    test_degraded_server_is_not_waited_for()
+    test_writes_are_queued_at_once_and_reads_are_served_through_the_agent()
+    test_replica_answers_queries_from_stale_lists()
+    print("✅ Reads are served from the last known good data while Billy.dk is down")
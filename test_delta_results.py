@@ -0,0 +1,105 @@
+import sys
+from types import SimpleNamespace
+
+print("🔍 Billy Delta Rendering Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent import agent as billy
+from billy_agent import budget, delta
+from billy_agent.budget import ResultBudgeter, count_tokens
+from billy_agent.delta import DeltaRenderer
+from billy_agent.result_store import ResultStore
+
+STATES = ("paid", "draft", "sent")
+
+
+def _invoice_list(invoices):
+    lines = [f"Found {len(invoices)} invoices:"]
+    lines += [f"• Invoice {invoice_id}: {amount} DKK - {state}" for invoice_id, amount, state in invoices]
+    return "\n".join(lines)
+
+
+def _invoices(count):
+    return [(f"inv{i:04d}", 1000 + i, STATES[i % 3]) for i in range(count)]
+
+
+def test_repeated_list_is_sent_as_diff():
+    """A repeated list only sends added, changed and removed rows"""
+    renderer = DeltaRenderer()
+    first = _invoice_list(_invoices(200))
+    assert renderer.render("listInvoices", first, "s1") == first
+
+    invoices = _invoices(200)
+    invoices[5] = ("inv0005", 1005, "paid")
+    del invoices[7]
+    invoices.append(("new0001", 4200, "draft"))
+    second = _invoice_list(invoices)
+    diff = renderer.render("listInvoices", second, "s1")
+
+    print(f"   📉 {count_tokens(second)} → {count_tokens(diff)} tokens")
+    assert diff.splitlines() == [
+        "listInvoices: 200 invoices. Only the differences to the previous listInvoices result "
+        "in this conversation are shown; 198 invoices are unchanged.",
+        "Added (1):",
+        "• Invoice new0001: 4200 DKK - draft",
+        "Changed (1):",
+        "• Invoice inv0005: 1005 DKK - paid [state: sent → paid]",
+        "Removed (1): inv0007",
+    ]
+    # The new result is the base of the next diff
+    assert renderer.render("listInvoices", second, "s1").endswith("No changes.")
+
+
+def test_full_result_without_enough_overlap():
+    renderer = DeltaRenderer(min_overlap=0.5)
+    renderer.render("listInvoices", _invoice_list(_invoices(10)), "s1")
+    other = _invoice_list([(f"x{i}", i, "paid") for i in range(10)])
+    assert renderer.render("listInvoices", other, "s1") == other
+
+
+def test_sessions_and_tools_are_separate():
+    renderer = DeltaRenderer()
+    text = _invoice_list(_invoices(50))
+    renderer.render("listInvoices", text, "s1")
+    assert renderer.render("listInvoices", text, "s2") == text
+    customers = "Found 2 customers:\n• John Doe (customer-456)\n• Jane Smith (customer-789)"
+    assert renderer.render("listCustomers", customers, "s1") == customers
+    assert renderer.render("listInvoices", text, None) == text
+
+
+def test_no_diff_against_a_trimmed_result():
+    """Rows cut by the result budget were never seen, so they are not reported as unchanged"""
+    def fit(invoices):
+        return billy._fit_result("listInvoices", {"content": [{"type": "text", "text": _invoice_list(invoices)}]},
+                                 context)
+
+    context = SimpleNamespace(state={}, invocation_id=None, _invocation_context=SimpleNamespace(
+        session=SimpleNamespace(id="s1"), agent=SimpleNamespace(model="openai/gpt-4o-mini")))
+    budget._result_budgeter = ResultBudgeter(tool_budget=300, store=ResultStore())
+    delta._delta_renderer = DeltaRenderer()
+    try:
+        trimmed = fit(_invoices(200))
+        invoices = _invoices(200)
+        invoices[150] = ("inv0150", 1150, "paid")
+        again = fit(invoices)
+        # Short results reach the model in full and are diffed again
+        small = fit(_invoices(20))
+        smaller = fit(_invoices(19))
+    finally:
+        budget._result_budgeter = delta._delta_renderer = None
+
+    assert "readResultPage" in trimmed
+    assert "Only the differences" not in again and "readResultPage" in again
+    assert "Only the differences" not in small
+    assert "19 invoices are unchanged" in smaller and "Removed (1): inv0019" in smaller
+
+
+if __name__ == "__main__":
+    test_repeated_list_is_sent_as_diff()
+    test_full_result_without_enough_overlap()
+    test_sessions_and_tools_are_separate()
+    test_no_diff_against_a_trimmed_result()
+    print("✅ Repeated list results are sent as diffs")
@@ -0,0 +1,190 @@
+import asyncio
+import os
+import socket
+import sys
+import time
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+print("🔍 Billy MCP Federation Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent.federation import McpFederation, McpServerConfig, load_server_configs
+
+
+class FakeMcpServer:
+    """In-process MCP server offering the given tools; answers after delay seconds"""
+
+    def __init__(self, *tool_names, delay=0.0):
+        self.tool_names = tool_names
+        self.delay = delay
+        self.calls = []
+        app = web.Application()
+        app.router.add_post("/mcp", self._mcp)
+        app.router.add_get("/health", self._health)
+        self.server = TestServer(app)
+
+    async def __aenter__(self):
+        await self.server.start_server()
+        self.port = self.server.port
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.server.close()
+
+    @property
+    def url(self):
+        return str(self.server.make_url("/mcp"))
+
+    async def _mcp(self, request):
+        await asyncio.sleep(self.delay)
+        body = await request.json()
+        if body["method"] == "tools/list":
+            result = {"tools": [{"name": name, "description": f"Tool {name}",
+                                 "inputSchema": {"type": "object", "properties": {}}} for name in self.tool_names]}
+        elif body["method"] == "tools/call":
+            self.calls.append(body["params"]["name"])
+            result = {"content": [{"type": "text", "text": f"{body['params']['name']} on port {self.port}"}]}
+        else:
+            result = {"protocolVersion": "2024-11-05"}
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": result})
+
+    async def _health(self, request):
+        await asyncio.sleep(self.delay)
+        return web.json_response({"status": "ok", "connections": 1})
+
+
+def _closed_port_url():
+    """URL of a port nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}/mcp"
+
+
+def test_mcp_servers_are_read_from_the_environment():
+    saved = {name: os.environ.get(name) for name in ("MCP_SERVERS", "MCP_SERVER_URL")}
+    try:
+        os.environ["MCP_SERVERS"] = ("billy=http://localhost:3000, my-crm.v2 = http://a:4000|http://b:4000,"
+                                     "broken,=http://nameless, ")
+        servers = load_server_configs()
+        del os.environ["MCP_SERVERS"]
+        os.environ["MCP_SERVER_URL"] = "http://billy:3000"
+        default = load_server_configs()
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    assert [(server.name, server.url) for server in servers] == [
+        ("billy", "http://localhost:3000"), ("my-crm.v2", "http://a:4000|http://b:4000")]
+    assert servers[1].namespace == "my-crm_v2"
+    assert [(server.name, server.url) for server in default] == [("billy", "http://billy:3000")]
+
+
+def test_catalogs_are_merged_with_prefixes():
+    async def run():
+        async with FakeMcpServer("listInvoices", "crm_listInvoices") as billy, \
+                FakeMcpServer("listInvoices", "find.contact") as crm:
+            federation = McpFederation([McpServerConfig("billy", billy.url), McpServerConfig("crm", crm.url)])
+            entries = await federation.discover()
+            await federation.close()
+            return federation, entries
+
+    federation, entries = asyncio.run(run())
+    assert federation.catalog == {
+        "listInvoices": ("billy", "listInvoices"),
+        "crm_listInvoices": ("billy", "crm_listInvoices"),
+        # The primary server keeps its bare names; another server's colliding name gets a suffix
+        "crm_listInvoices_2": ("crm", "listInvoices"),
+        "crm_find_contact": ("crm", "find.contact"),
+    }
+    assert [entry["description"] for entry in entries if entry["server"] == "crm"] == [
+        "[crm] Tool listInvoices", "[crm] Tool find.contact"]
+    assert federation.health["crm"]["status"] == "ok" and not federation.pending
+
+
+def test_long_names_are_cut_to_the_openai_limit():
+    federation = McpFederation([McpServerConfig("billy", "http://billy"), McpServerConfig("crm", "http://crm")])
+    federation._merge(federation.servers[1], [{"name": "x" * 80}, {"name": "x" * 70}])
+    assert sorted(len(name) for name in federation.catalog) == [64, 64]
+    assert len(set(federation.catalog)) == 2
+
+
+def test_base_names_come_from_the_catalog():
+    federation = McpFederation([McpServerConfig("billy", "http://billy"), McpServerConfig("my-crm", "http://crm")])
+    federation._merge(federation.servers[0], [{"name": "list_invoices"}, {"name": "getInvoice"}])
+    federation._merge(federation.servers[1], [{"name": "listInvoices"}, {"name": "getInvoice"}])
+    # Underscores in a tool's own name are kept
+    assert federation.base_name("list_invoices") == "list_invoices"
+    assert federation.base_name("my-crm_listInvoices") == "listInvoices"
+    # Names not discovered yet only lose a configured prefix
+    assert federation.base_name("my-crm_searchContacts") == "searchContacts"
+    assert federation.base_name("erp_listInvoices") == "erp_listInvoices"
+    assert federation.sibling_name("my-crm_listInvoices", "getInvoice") == "my-crm_getInvoice"
+    assert federation.sibling_name("list_invoices", "getInvoice") == "getInvoice"
+
+
+def test_slow_and_down_servers_do_not_block_discovery():
+    async def run():
+        async with FakeMcpServer("listInvoices") as billy, FakeMcpServer("searchContacts", delay=0.5) as crm:
+            federation = McpFederation([McpServerConfig("billy", billy.url), McpServerConfig("crm", crm.url),
+                                        McpServerConfig("erp", _closed_port_url())],
+                                       discovery_timeout=0.2, retry_interval=0)
+            started = time.perf_counter()
+            await federation.discover()
+            discovered_in = time.perf_counter() - started
+            pending = set(federation.pending)
+
+            # The slow server is picked up by a background refresh
+            discovered = []
+            assert federation.schedule_refresh(discovered.extend)
+            await federation._refresh_task
+            await federation.close()
+            return federation, discovered_in, pending, discovered
+
+    federation, discovered_in, pending, discovered = asyncio.run(run())
+    assert discovered_in < 0.4 and pending == {"crm", "erp"}
+    assert [entry["name"] for entry in discovered] == ["crm_searchContacts"]
+    assert federation.pending == {"erp"} and federation.health["erp"]["status"] == "down"
+    assert set(federation.catalog) == {"listInvoices", "crm_searchContacts"}
+
+
+def test_calls_are_routed_to_the_owning_server():
+    async def run():
+        async with FakeMcpServer("listInvoices") as billy, FakeMcpServer("listInvoices") as crm:
+            federation = McpFederation([McpServerConfig("billy", billy.url), McpServerConfig("crm", crm.url)])
+            # Before discovery, bare names go to the primary server
+            early = await federation.call_tool("listInvoices")
+            await federation.discover()
+            primary = await federation.call_tool("listInvoices")
+            other = await federation.call_tool("crm_listInvoices")
+            try:
+                await federation.call_tool("erp_listInvoices")
+                unknown = None
+            except KeyError as e:
+                unknown = e
+            await federation.close()
+            return billy, crm, early, primary, other, unknown
+
+    billy, crm, early, primary, other, unknown = asyncio.run(run())
+    assert str(billy.port) in early["content"][0]["text"]
+    assert str(billy.port) in primary["content"][0]["text"]
+    assert str(crm.port) in other["content"][0]["text"]
+    assert billy.calls == ["listInvoices", "listInvoices"] and crm.calls == ["listInvoices"]
+    assert unknown is not None
+
+
+if __name__ == "__main__":
+    test_mcp_servers_are_read_from_the_environment()
+    test_catalogs_are_merged_with_prefixes()
+    test_long_names_are_cut_to_the_openai_limit()
+    test_base_names_come_from_the_catalog()
+    test_slow_and_down_servers_do_not_block_discovery()
+    test_calls_are_routed_to_the_owning_server()
+    print("✅ MCP servers are federated into one catalog")
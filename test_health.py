@@ -0,0 +1,188 @@
+import asyncio
+import contextlib
+import io
+import socket
+import sys
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+print("🔍 Billy MCP Health Probing Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from google.adk.agents import LlmAgent
+
+from billy_agent.console import run_console
+from billy_agent.federation import McpFederation, McpServerConfig
+from billy_agent.health import DEGRADED, DOWN, UNKNOWN, UP, HealthProber
+from billy_agent.mcp_client import McpServerUnavailable
+
+
+class FakeClient:
+    """MCP client whose /health answer the test sets"""
+
+    def __init__(self):
+        self.status = "ok"
+        self.connections = 2
+        self.delay = 0.0
+        self.calls = []
+
+    async def health(self, timeout=5):
+        if self.status is None:
+            raise ConnectionError("Connection refused")
+        await asyncio.sleep(self.delay)
+        return {"status": self.status, "connections": self.connections}
+
+    async def ensure_initialized(self):
+        pass
+
+    async def call_tool(self, name, arguments=None, affinity_key=None, meta=None):
+        self.calls.append(name)
+        return {"content": [{"type": "text", "text": "Found 0 invoices:"}]}
+
+
+def _probed_federation(**kwargs):
+    federation = McpFederation([McpServerConfig("billy", "http://billy")])
+    client = federation.clients["billy"] = FakeClient()
+    return federation, client, HealthProber(federation, **kwargs)
+
+
+def test_servers_move_between_up_degraded_and_down():
+    async def run():
+        states = [prober.state("billy")]
+        await prober.probe_once()
+        states.append(prober.state("billy"))
+        client.delay = 0.05
+        await prober.probe_once()
+        states.append(prober.state("billy"))
+        client.delay, client.connections = 0.0, 10
+        await prober.probe_once()
+        states.append(prober.state("billy"))
+        client.status = None
+        # One failed probe is not enough to call a server down
+        await prober.probe_once()
+        states.append(prober.state("billy"))
+        await prober.probe_once()
+        states.append(prober.state("billy"))
+        client.status, client.connections = "ok", 2
+        await prober.probe_once()
+        states.append(prober.state("billy"))
+        return states
+
+    federation, client, prober = _probed_federation(degraded_latency_ms=30, max_connections=5)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        states = asyncio.run(run())
+    log = output.getvalue()
+
+    assert states == [UNKNOWN, UP, DEGRADED, DEGRADED, DEGRADED, DOWN, UP]
+    # Every change but the first is logged
+    assert log.count("🩺") == 3
+    assert "'billy' is down (was degraded): Connection refused" in log and "is up (was down)" in log
+    metrics = prober.metrics()["billy"]
+    assert metrics["probes"] == 6 and metrics["failures"] == 2 and metrics["consecutive_failures"] == 0
+    assert federation.health["billy"]["status"] == "ok"
+
+
+def test_calls_fail_fast_while_down_and_pass_after_recovery():
+    async def run():
+        client.status = None
+        await prober.probe_once()
+        await prober.probe_once()
+        try:
+            await federation.call_tool("listInvoices")
+            refused = None
+        except McpServerUnavailable as e:
+            refused = e
+        calls_while_down = list(client.calls)
+        client.status = "ok"
+        await prober.probe_once()
+        result = await federation.call_tool("listInvoices")
+        return refused, calls_while_down, result
+
+    federation, client, prober = _probed_federation()
+    refused, calls_while_down, result = asyncio.run(run())
+    assert refused is not None and "Connection refused" in str(refused)
+    assert calls_while_down == [] and client.calls == ["listInvoices"]
+    assert federation.server_state("listInvoices") == UP and "Found 0 invoices" in result["content"][0]["text"]
+
+
+def _health_server(status, code=200):
+    """HTTP server whose /health answers with status and code"""
+    async def health(request):
+        return web.json_response({"status": status, "connections": 3}, status=code)
+
+    app = web.Application()
+    app.router.add_get("/health", health)
+    return TestServer(app)
+
+
+def _closed_port_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}/mcp"
+
+
+def test_reported_status_is_classified_through_the_real_client():
+    async def probe(url, times=2):
+        federation = McpFederation([McpServerConfig("billy", url)])
+        prober = HealthProber(federation)
+        for _ in range(times):
+            await prober.probe_once()
+        await federation.close()
+        return prober.state("billy"), federation
+
+    async def run():
+        degraded, ok = _health_server("degraded", 503), _health_server("ok")
+        await degraded.start_server()
+        await ok.start_server()
+        closed = _closed_port_url()
+        try:
+            states = {
+                "degraded": await probe(str(degraded.make_url("/mcp"))),
+                # One replica answers ok, the other does not answer at all
+                "replica down": await probe(f"{ok.make_url('/mcp')}|{closed}"),
+                "unreachable": await probe(closed),
+            }
+        finally:
+            await degraded.close()
+            await ok.close()
+        return states
+
+    states = asyncio.run(run())
+    state, federation = states["degraded"]
+    assert state == DEGRADED and federation.health["billy"] == {
+        "status": "degraded", "connections": 3, "latency_ms": federation.health["billy"]["latency_ms"]}
+    # A degraded server still takes calls
+    federation.check_available("billy")
+    assert states["replica down"][0] == DEGRADED
+    assert states["unreachable"][0] == DOWN
+
+
+def test_console_prints_the_server_health():
+    async def run():
+        await prober.probe_once()
+        return await run_console(agent, read_line, commands={"health": prober.report})
+
+    lines = iter(["health", "exit"])
+
+    async def read_line(prompt):
+        return next(lines)
+
+    federation, client, prober = _probed_federation()
+    agent = LlmAgent(name="billy_test", model="openai/gpt-4o-mini", instruction="Answer")
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        asyncio.run(run())
+    assert "billy: up for 0s" in output.getvalue() and "2 connections, 1 probes, 0 failures" in output.getvalue()
+
+
+if __name__ == "__main__":
+    test_servers_move_between_up_degraded_and_down()
+    test_calls_fail_fast_while_down_and_pass_after_recovery()
+    test_reported_status_is_classified_through_the_real_client()
+    test_console_prints_the_server_health()
+    print("✅ MCP server health is probed, logged and shown")
@@ -0,0 +1,130 @@
+import asyncio
+import sys
+from types import SimpleNamespace
+
+from google.genai import types
+
+print("🔍 Billy History Compaction Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from google.adk.models.llm_request import LlmRequest
+
+from billy_agent import agent as billy
+from billy_agent import budget, delta, history
+from billy_agent.budget import ResultBudgeter
+from billy_agent.history import HistoryCompactor, contents_tokens
+from billy_agent.result_store import ResultStore
+
+STATES = ("paid", "approved", "draft", "overdue")
+
+
+def _invoices(turn, count=60):
+    lines = [f"Found {count} invoices:"]
+    lines += [f"• Invoice t{turn}i{i:03d}: {1000 + i * 37} DKK - {STATES[i % 4]}" for i in range(count)]
+    return "\n".join(lines)
+
+
+def _turn(index, result=None, call_id=None):
+    """One turn: the user asks, the model lists invoices and answers"""
+    return [
+        types.Content(role="user", parts=[types.Part(text=f"Question {index}: list invoices")]),
+        types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+            id=call_id, name="listInvoices", args={}))]),
+        types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+            id=call_id, name="listInvoices", response={"result": result or _invoices(index)}))]),
+        types.Content(role="model", parts=[types.Part(text=f"Here are the invoices of question {index}.")]),
+    ]
+
+
+def _history(turns):
+    """Contents ADK would send for the model call answering the last question"""
+    contents = [content for index in range(turns) for content in _turn(index)]
+    return contents[:-1]
+
+
+CONTEXT = SimpleNamespace(session=SimpleNamespace(id="session-1"))
+
+
+def _compact(compactor, turns):
+    llm_request = LlmRequest(contents=_history(turns))
+    asyncio.run(compactor.before_model(CONTEXT, llm_request))
+    return llm_request.contents
+
+
+def test_prompt_size_stays_bounded():
+    compactor = HistoryCompactor(threshold=4000, keep_turns=2)
+    sizes = [contents_tokens(_compact(compactor, turns)) for turns in range(1, 41)]
+    uncompacted = contents_tokens(_history(40))
+    print(f"   📉 turn 40: {sizes[-1]} tokens instead of {uncompacted}")
+    assert max(sizes) <= 4000
+    assert uncompacted > 5 * sizes[-1]
+    assert compactor.compactions < 20
+
+
+def test_memory_keeps_topic_and_ids_and_recent_turns_verbatim():
+    compactor = HistoryCompactor(threshold=4000, keep_turns=2)
+    contents = _compact(compactor, 12)
+    memory = contents[0].parts[0].text
+    assert memory.startswith("Memory of the")
+    assert "Topic of those turns: invoices" in memory
+    assert "t4i059 (3183 DKK, overdue)" in memory and "listInvoices x5" in memory
+    # The current turn and the one before it are unchanged
+    assert contents[-7:] == _history(12)[-7:]
+
+
+def test_prefix_is_stable_between_compactions():
+    compactor = HistoryCompactor(threshold=4000, keep_turns=2)
+    before = _compact(compactor, 12)
+    # A short follow-up in the same turn does not move the compaction boundary
+    llm_request = LlmRequest(contents=_history(12) + [types.Content(role="model", parts=[types.Part(text="...")])])
+    asyncio.run(compactor.before_model(CONTEXT, llm_request))
+    assert llm_request.contents[:len(before)] == before
+
+
+def test_memory_and_stubs_read_the_mcp_results_not_the_tables():
+    def fit(index):
+        session, agent = SimpleNamespace(id="session-1"), SimpleNamespace(model="openai/gpt-4o-mini")
+        context = SimpleNamespace(state={}, invocation_id=f"i{index}", function_call_id=f"call-{index}",
+                                  _invocation_context=SimpleNamespace(session=session, agent=agent))
+        return billy._fit_result("listInvoices", {"content": [{"type": "text", "text": _invoices(index)}]}, context)
+
+    compactor = history._history_compactor = HistoryCompactor(threshold=4000, keep_turns=2)
+    budget._result_budgeter = ResultBudgeter(store=ResultStore())
+    delta._delta_renderer = None
+    try:
+        # The default model gets each list as a table
+        turns = [_turn(index, fit(index), f"call-{index}") for index in range(12)]
+    finally:
+        history._history_compactor = budget._result_budgeter = delta._delta_renderer = None
+    llm_request = LlmRequest(contents=[content for turn in turns for content in turn][:-1])
+    asyncio.run(compactor.before_model(CONTEXT, llm_request))
+
+    assert "\t" in turns[0][2].parts[0].function_response.response["result"]
+    memory = llm_request.contents[0].parts[0].text
+    assert "t1i059 (3183 DKK, overdue)" in memory
+    stubs = [part.function_response.response["result"] for content in llm_request.contents
+             for part in content.parts if part.function_response]
+    # Turns 2 to 9 are stubbed with a summary of their invoices
+    assert all("count=60; sum=125490.00 DKK" in stub for stub in stubs[:8])
+    assert "earlier turn" not in stubs[8]
+
+
+def test_compaction_resets_list_diffs():
+    delta._delta_renderer = None
+    renderer = delta.get_delta_renderer()
+    renderer.render("listInvoices", _invoices(0), "session-1")
+    _compact(HistoryCompactor(threshold=4000), 12)
+    assert "session-1" not in renderer.snapshots
+    delta._delta_renderer = None
+
+
+if __name__ == "__main__":
+    test_prompt_size_stays_bounded()
+    test_memory_keeps_topic_and_ids_and_recent_turns_verbatim()
+    test_prefix_is_stable_between_compactions()
+    test_memory_and_stubs_read_the_mcp_results_not_the_tables()
+    test_compaction_resets_list_diffs()
+    print("✅ Long sessions keep a bounded prompt")
@@ -0,0 +1,113 @@
+import asyncio
+import sys
+
+from google.genai import types
+
+print("🔍 Billy Intent Router Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from google.adk.models.llm_request import LlmRequest
+
+from billy_agent.router import Intent, IntentRouter, match_intent
+
+TOOLS = ("listInvoices", "listCustomers", "getInvoice", "totalInvoiceAmount")
+
+RESULTS = {
+    "listInvoices": "Found 3 invoices:\n• Invoice abc123: 1000 DKK - paid\n• Invoice def456: 2500 DKK - draft\n"
+                    "• Invoice ghi789: 750 DKK - sent",
+    "getInvoice": "Invoice #abc123: 1000 DKK - Status: paid\nContact: customer-456\nEntry Date: 2024-01-15",
+    "totalInvoiceAmount": "Total invoice amount from 2024-01-01 to 2024-12-31: 15750 DKK (12 invoices)",
+}
+
+
+def _request(*contents):
+    llm_request = LlmRequest(model="openai/gpt-4o-mini", contents=list(contents))
+    llm_request.tools_dict = {name: None for name in TOOLS}
+    return llm_request
+
+
+def _user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+class FakeBilly:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    async def __call__(self, tool_name, arguments, callback_context=None):
+        self.calls.append((tool_name, arguments))
+        if self.fail:
+            raise ConnectionError("server down")
+        return {"content": [{"type": "text", "text": RESULTS[tool_name]}]}
+
+
+def test_commands_match_the_grammar():
+    assert match_intent("list invoices") == Intent("listInvoices", {})
+    assert match_intent("Show me all my customers, please?") == Intent("listCustomers", {})
+    assert match_intent("invoices") == Intent("listInvoices", {})
+    assert match_intent("show invoice ABC-123") == Intent("getInvoice", {"id": "ABC-123"})
+    assert match_intent("open invoice #abcdef") == Intent("getInvoice", {"id": "abcdef"})
+    assert match_intent("get invoice id 42") == Intent("getInvoice", {"id": "42"})
+    assert match_intent("Total from 2024-01-01 to 2024-12-31") == Intent(
+        "totalInvoiceAmount", {"startDate": "2024-01-01", "endDate": "2024-12-31"})
+    for text in ("list overdue invoices", "show me the latest one", "total from 2024-12-31 to 2024-01-01",
+                 "total from 2024-02-30 to 2024-03-01", "create an invoice for customer-456",
+                 "list invoices and customers",
+                 # Words after "invoice" that are not IDs
+                 "show invoice details", "get invoice status", "show the invoice please", "open invoice pdf"):
+        assert match_intent(text) is None, text
+
+
+def test_routed_commands_skip_the_model():
+    async def run():
+        billy = FakeBilly()
+        router = IntentRouter(billy)
+        listed = await router.before_model(None, _request(_user("list invoices")))
+        shown = await router.before_model(None, _request(_user("show invoice abc123")))
+        total = await router.before_model(None, _request(_user("total from 2024-01-01 to 2024-12-31")))
+        return billy, router, listed, shown, total
+
+    billy, router, listed, shown, total = asyncio.run(run())
+    assert billy.calls == [("listInvoices", {}), ("getInvoice", {"id": "abc123"}),
+                           ("totalInvoiceAmount", {"startDate": "2024-01-01", "endDate": "2024-12-31"})]
+    assert listed.content.parts[0].text.splitlines() == [
+        "Here are your 3 invoices:", "• Invoice abc123: 1000 DKK - paid", "• Invoice def456: 2500 DKK - draft",
+        "• Invoice ghi789: 750 DKK - sent"]
+    assert shown.content.parts[0].text.startswith("Invoice abc123: 1000 DKK, status paid.")
+    assert total.content.parts[0].text == ("The total invoice amount from 2024-01-01 to 2024-12-31 "
+                                           "is 15750 DKK across 12 invoices.")
+    assert router.stats() == {"routed": 3, "fallbacks": 0}
+
+
+def test_everything_else_falls_back_to_the_model():
+    async def run():
+        billy = FakeBilly()
+        router = IntentRouter(billy)
+        results = [
+            await router.before_model(None, _request(_user("which customer owes us the most?"))),
+            # Not a tool of this agent
+            await router.before_model(None, _request(_user("list products"))),
+            # The model already called a tool in this turn
+            await router.before_model(None, _request(_user("list invoices"), types.Content(
+                role="user", parts=[types.Part(function_response=types.FunctionResponse(
+                    name="listInvoices", response={"result": "..."}))]))),
+        ]
+        failing = IntentRouter(FakeBilly(fail=True))
+        results.append(await failing.before_model(None, _request(_user("list invoices"))))
+        return billy, failing, results
+
+    billy, failing, results = asyncio.run(run())
+    assert results == [None, None, None, None]
+    assert billy.calls == []
+    assert failing.stats() == {"routed": 0, "fallbacks": 1}
+
+
+if __name__ == "__main__":
+    test_commands_match_the_grammar()
+    test_routed_commands_skip_the_model()
+    test_everything_else_falls_back_to_the_model()
+    print("✅ Unambiguous commands are answered without the model")
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from google.genai import types
+
+print("🔍 Billy LLM Response Cache Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from billy_agent.llm_cache import LlmResponseCache
+
+
+def _request(call_id):
+    """A request after one tool round trip; ADK gives every call a fresh id"""
+    return LlmRequest(
+        model="openai/gpt-4o-mini",
+        config=types.GenerateContentConfig(system_instruction="You are Billy."),
+        contents=[
+            types.Content(role="user", parts=[types.Part(text="Total invoiced in January?")]),
+            types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+                id=call_id, name="totalInvoiceAmount", args={"startDate": "2024-01-01", "endDate": "2024-01-31"}))]),
+            types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+                id=call_id, name="totalInvoiceAmount", response={"result": "12500 DKK"}))]),
+        ],
+    )
+
+
+ANSWER = LlmResponse(content=types.Content(role="model", parts=[types.Part(text="You invoiced 12,500 DKK.")]))
+
+
+async def _model_call(cache, llm_request, invocation_id):
+    """Run the cache callbacks around a model call; return (response, was_cached)"""
+    context = SimpleNamespace(invocation_id=invocation_id)
+    cached = await cache.before_model(context, llm_request)
+    if cached is not None:
+        return cached, True
+    await cache.after_model(context, ANSWER)
+    return ANSWER, False
+
+
+def test_identical_requests_hit_across_sessions():
+    async def run():
+        cache = LlmResponseCache()
+        _, first_cached = await _model_call(cache, _request("adk-call-1"), "inv-1")
+        started = time.perf_counter()
+        response, second_cached = await _model_call(cache, _request("adk-call-2"), "inv-2")
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        print(f"   ⚡ cache hit in {elapsed_ms:.2f} ms")
+        assert not first_cached and second_cached
+        assert response.content.parts[0].text == "You invoiced 12,500 DKK."
+        assert elapsed_ms < 50
+
+        other = _request("adk-call-3")
+        other.contents[2].parts[0].function_response.response = {"result": "9000 DKK"}
+        assert (await _model_call(cache, other, "inv-3"))[1] is False
+        assert cache.stats()["hits"] == 1
+
+    asyncio.run(run())
+
+
+def test_write_tools_ttl_and_partial_responses():
+    async def run():
+        cache = LlmResponseCache(ttl=60)
+        await _model_call(cache, _request("a"), "inv-1")
+        cache.invalidate()
+        assert (await _model_call(cache, _request("b"), "inv-2"))[1] is False
+
+        cache.ttl = 0
+        time.sleep(0.01)
+        assert (await _model_call(cache, _request("c"), "inv-3"))[1] is False
+
+        cache = LlmResponseCache()
+        context = SimpleNamespace(invocation_id="inv-4")
+        await cache.before_model(context, _request("d"))
+        await cache.after_model(context, LlmResponse(content=ANSWER.content, partial=True))
+        assert cache.stats()["entries"] == 0
+
+    asyncio.run(run())
+
+
+def test_sqlite_backend_survives_restart():
+    async def run(path):
+        await _model_call(LlmResponseCache(path=path), _request("a"), "inv-1")
+        return await _model_call(LlmResponseCache(path=path), _request("b"), "inv-2")
+
+    with tempfile.TemporaryDirectory() as directory:
+        _, cached = asyncio.run(run(os.path.join(directory, "cache.sqlite")))
+    assert cached
+
+
+if __name__ == "__main__":
+    test_identical_requests_hit_across_sessions()
+    test_write_tools_ttl_and_partial_responses()
+    test_sqlite_backend_survives_restart()
+    print("✅ Identical model requests are answered from the cache")
@@ -0,0 +1,114 @@
+import asyncio
+import sys
+import time
+
+from google.genai import types
+
+print("🔍 Billy LLM Scheduler Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+import litellm  # noqa: F401  (import LiteLLM before the event loop starts)
+from google.adk.models.lite_llm import LiteLlm
+from google.adk.models.llm_request import LlmRequest
+
+from billy_agent.scheduler import LlmScheduler, ScheduledLiteLLMClient, parse_reset
+
+
+def test_queued_calls_are_admitted_in_order_at_the_rate():
+    async def run():
+        # 10 requests per second, bucket empty
+        scheduler = LlmScheduler(rpm=600)
+        scheduler.requests.level = 0
+        order = []
+
+        async def call(name):
+            await scheduler.acquire(10)
+            order.append(name)
+
+        calls = []
+        for i in range(3):
+            calls.append(asyncio.create_task(call(f"call{i}")))
+            await asyncio.sleep(0.01)
+        started = time.perf_counter()
+        await asyncio.gather(*calls)
+        return order, time.perf_counter() - started, scheduler.stats()
+
+    order, elapsed, stats = asyncio.run(run())
+    print(f"   ⏱️  3 calls admitted in {elapsed:.2f}s at 10 requests/s")
+    assert order == ["call0", "call1", "call2"]
+    assert 0.2 <= elapsed < 0.6
+    assert stats["granted"] == 3 and stats["queued"] == 0
+
+
+def test_token_budget_paces_large_calls():
+    async def run():
+        # 1000 tokens per second
+        scheduler = LlmScheduler(rpm=10_000, tpm=60_000)
+        await scheduler.acquire(60_000)
+        started = time.perf_counter()
+        await scheduler.acquire(300)
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(run())
+    assert 0.25 <= elapsed < 0.6
+
+
+def test_buckets_follow_rate_limit_headers():
+    scheduler = LlmScheduler(rpm=500, tpm=200_000)
+    scheduler.observe({"x-ratelimit-limit-requests": "5000", "x-ratelimit-remaining-requests": "4999",
+                       "llm_provider-x-ratelimit-limit-tokens": "2000000",
+                       "llm_provider-x-ratelimit-remaining-tokens": "100"})
+    now = time.monotonic()
+    assert scheduler.requests.limit == 5000 and scheduler.tokens.limit == 2_000_000
+    assert scheduler.tokens.wait_time(100, now) == 0
+    assert scheduler.tokens.wait_time(1100, now) > 0
+
+    scheduler.on_rate_limit({"x-ratelimit-reset-requests": "2s", "x-ratelimit-reset-tokens": "150ms"})
+    now = time.monotonic()
+    assert 1.9 < scheduler.requests.wait_time(1, now) < 2.1
+    assert parse_reset("6m0s") == 360 and parse_reset("20ms") == 0.02 and parse_reset("1.5") == 1.5
+
+
+def test_litellm_calls_go_through_the_scheduler():
+    async def run():
+        scheduler = LlmScheduler()
+        model = LiteLlm(model="openai/gpt-4o-mini", api_key="sk-test", mock_response="Found 3 invoices.",
+                        llm_client=ScheduledLiteLLMClient(scheduler))
+        llm_request = LlmRequest(model="openai/gpt-4o-mini", contents=[
+            types.Content(role="user", parts=[types.Part(text="How many invoices?")])])
+        responses = [response async for response in model.generate_content_async(llm_request)]
+        return responses[-1], scheduler
+
+    response, scheduler = asyncio.run(run())
+    assert response.content.parts[0].text == "Found 3 invoices."
+    assert scheduler.stats()["granted"] == 1
+    # The completion allowance was returned once the real usage was known
+    assert scheduler.tokens.level > scheduler.tokens.limit - 100
+
+
+def test_streamed_calls_settle_from_the_final_chunk():
+    async def run():
+        scheduler = LlmScheduler()
+        model = LiteLlm(model="openai/gpt-4o-mini", api_key="sk-test", mock_response="Found 3 invoices.",
+                        llm_client=ScheduledLiteLLMClient(scheduler))
+        llm_request = LlmRequest(model="openai/gpt-4o-mini", contents=[
+            types.Content(role="user", parts=[types.Part(text="How many invoices?")])])
+        responses = [response async for response in model.generate_content_async(llm_request, stream=True)]
+        return responses, scheduler
+
+    responses, scheduler = asyncio.run(run())
+    assert len(responses) > 1 and responses[-1].content.parts[0].text == "Found 3 invoices."
+    assert responses[-1].usage_metadata.total_token_count
+    assert scheduler.tokens.level > scheduler.tokens.limit - 100
+
+
+if __name__ == "__main__":
+    test_queued_calls_are_admitted_in_order_at_the_rate()
+    test_token_budget_paces_large_calls()
+    test_buckets_follow_rate_limit_headers()
+    test_litellm_calls_go_through_the_scheduler()
+    test_streamed_calls_settle_from_the_final_chunk()
+    print("✅ Model calls stay within the provider's limits")
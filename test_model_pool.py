@@ -0,0 +1,104 @@
+import asyncio
+import sys
+import time
+
+from google.genai import types
+
+print("🔍 Billy Model Pool Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from google.adk.models.llm_request import LlmRequest
+
+from billy_agent.pool import MockLlm, ModelPool, create_model
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class RateLimitedLlm(MockLlm):
+    async def generate_content_async(self, llm_request, stream=False):
+        raise RateLimitError("429 Too Many Requests")
+        yield
+
+
+def _request():
+    return LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text="list invoices")])])
+
+
+async def _answer(pool):
+    return [response.content.parts[0].text async for response in pool.generate_content_async(_request())][-1]
+
+
+def _mock(name, delay=0.0, error_rate=0.0):
+    return MockLlm(model=f"mock/{name}", delay=delay, error_rate=error_rate, text=name)
+
+
+def test_calls_go_to_the_fastest_healthy_deployment():
+    async def run():
+        pool = ModelPool(model="mock/slow", deployments=[_mock("slow", 0.03), _mock("fast", 0.001)])
+        # Both are measured first, then the fast one is preferred
+        return [await _answer(pool) for _ in range(5)], pool.stats()
+
+    answers, stats = asyncio.run(run())
+    assert answers == ["slow", "fast", "fast", "fast", "fast"]
+    assert stats["deployments"]["mock/fast"]["mean_latency"] < stats["deployments"]["mock/slow"]["mean_latency"]
+
+
+def test_failures_fail_over_and_cool_down():
+    async def run():
+        pool = ModelPool(model="mock/broken", deployments=[_mock("broken", error_rate=1.0), _mock("backup")])
+        limited = ModelPool(model="mock/limited", deployments=[RateLimitedLlm(model="mock/limited"),
+                                                                 _mock("backup")])
+        answers = [await _answer(pool) for _ in range(3)]
+        await _answer(limited)
+        return answers, pool, limited
+
+    answers, pool, limited = asyncio.run(run())
+    assert answers == ["backup", "backup", "backup"]
+    # One failure puts the broken deployment behind the backup
+    assert pool.stats()["deployments"]["mock/broken"]["error_rate"] == 1.0
+    assert [state.name for state in pool.ranked()] == ["mock/backup", "mock/broken"]
+    # Rate limited deployments cool down at once
+    assert not limited.stats()["deployments"]["mock/limited"]["healthy"]
+    assert [state.name for state in limited.ranked()] == ["mock/backup", "mock/limited"]
+
+
+def test_slow_calls_are_hedged():
+    async def run():
+        primary = _mock("primary", 0.001)
+        pool = ModelPool(model="mock/primary", deployments=[primary, _mock("secondary", 0.01)],
+                         hedge=True, hedge_min_delay=0.02)
+        for _ in range(8):
+            await _answer(pool)
+        # The primary stalls far past its p95
+        primary.delay = 1.0
+        started = time.perf_counter()
+        answer = await _answer(pool)
+        return answer, time.perf_counter() - started, pool.stats()
+
+    answer, elapsed, stats = asyncio.run(run())
+    print(f"   ⏱️  hedged call answered in {elapsed * 1000:.0f} ms")
+    assert answer == "secondary"
+    assert elapsed < 0.5
+    assert stats["hedges"] == 1
+
+
+def test_deployments_from_spec():
+    pool = create_model("mock/a?delay=0.01, mock/b?error_rate=0.5&text=hi", hedge=True)
+    assert isinstance(pool, ModelPool) and pool.hedge
+    assert [(llm.model, llm.delay, llm.error_rate) for llm in pool.deployments] == [
+        ("mock/a", 0.01, 0.0), ("mock/b", 0.0, 0.5)]
+    assert pool.deployments[1].text == "hi"
+    assert create_model("openai/gpt-4o-mini").model == "openai/gpt-4o-mini"
+
+
+if __name__ == "__main__":
+    test_calls_go_to_the_fastest_healthy_deployment()
+    test_failures_fail_over_and_cool_down()
+    test_slow_calls_are_hedged()
+    test_deployments_from_spec()
+    print("✅ Model calls go to the fastest healthy deployment")
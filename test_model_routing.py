@@ -0,0 +1,111 @@
+import asyncio
+import sys
+from typing import AsyncGenerator
+
+from google.genai import types
+
+print("🔍 Billy Model Routing Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from billy_agent.models import ANSWER_ROUTE, TOOL_ROUTE, RoutedLlm, choose_route
+
+
+class FakeModel(BaseLlm):
+    """Answers with its own name after delay seconds, or fails"""
+    delay: float = 0.0
+    fail: bool = False
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        assert llm_request.model == self.model
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("rate limited")
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=self.model)]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(prompt_token_count=1000,
+                                                                      candidates_token_count=100))
+
+
+def _user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def _call(name, args):
+    return types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))])
+
+
+def _result(name):
+    return types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+        name=name, response={"result": "..."}))])
+
+
+def _total(start, end):
+    return _call("totalInvoiceAmount", {"startDate": start, "endDate": end})
+
+
+def _routed(**kwargs):
+    models = {"tool_model": FakeModel(model="openai/gpt-4o-mini"), "answer_model": FakeModel(model="openai/gpt-4o"),
+              "fallback_model": FakeModel(model="openai/gpt-3.5-turbo")}
+    models.update(kwargs)
+    return RoutedLlm(model="openai/gpt-4o-mini", **models)
+
+
+async def _answer(llm, *contents):
+    responses = [response async for response in llm.generate_content_async(LlmRequest(contents=list(contents)))]
+    return responses[-1].content.parts[0].text
+
+
+def test_routes_by_step_and_question():
+    lookup = [_user("show invoice abc123"), _call("getInvoice", {"id": "abc123"}), _result("getInvoice")]
+    comparison = [_user("How did Q1 revenue compare to Q2?"), _total("2024-01-01", "2024-03-31"),
+                  _result("totalInvoiceAmount")]
+    two_periods = [_user("Totals for January and February please"), _total("2024-01-01", "2024-01-31"),
+                   _result("totalInvoiceAmount"), _total("2024-02-01", "2024-02-29"), _result("totalInvoiceAmount")]
+    assert choose_route(LlmRequest(contents=[_user("How did Q1 revenue compare to Q2?")])) == TOOL_ROUTE
+    assert choose_route(LlmRequest(contents=lookup)) == TOOL_ROUTE
+    assert choose_route(LlmRequest(contents=comparison)) == ANSWER_ROUTE
+    assert choose_route(LlmRequest(contents=two_periods)) == ANSWER_ROUTE
+
+
+def test_failures_and_timeouts_fall_back():
+    async def run():
+        comparison = [_user("Compare 2023 and 2024"), _total("2023-01-01", "2023-12-31"),
+                      _result("totalInvoiceAmount")]
+        slow = _routed(answer_model=FakeModel(model="openai/gpt-4o", delay=1.0), answer_timeout=0.05)
+        failing = _routed(tool_model=FakeModel(model="openai/gpt-4o-mini", fail=True))
+        return (await _answer(slow, *comparison), await _answer(failing, _user("list invoices")),
+                slow.stats(), failing.stats())
+
+    slow_answer, failing_answer, slow_stats, failing_stats = asyncio.run(run())
+    assert slow_answer == "openai/gpt-4o-mini"
+    assert failing_answer == "openai/gpt-3.5-turbo"
+    assert slow_stats[ANSWER_ROUTE]["fallbacks"] == 1 and slow_stats[ANSWER_ROUTE]["calls"] == 1
+    assert failing_stats[TOOL_ROUTE]["prompt_tokens"] == 1000
+
+
+def test_cost_is_tracked_per_route():
+    async def run():
+        llm = _routed()
+        await _answer(llm, _user("list invoices"))
+        await _answer(llm, _user("Why did revenue drop?"), _call("listInvoices", {}), _result("listInvoices"))
+        return llm.stats()
+
+    stats = asyncio.run(run())
+    assert stats[TOOL_ROUTE]["calls"] == 1 and stats[ANSWER_ROUTE]["calls"] == 1
+    # The answer model costs more per token than the tool model
+    assert stats[ANSWER_ROUTE]["cost"] > stats[TOOL_ROUTE]["cost"] > 0
+
+
+if __name__ == "__main__":
+    test_routes_by_step_and_question()
+    test_failures_and_timeouts_fall_back()
+    test_cost_is_tracked_per_route()
+    print("✅ Model calls are routed by step, with timeouts and fallbacks")
@@ -0,0 +1,56 @@
+import sys
+
+print("🔍 Billy Tool Text Parsing Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent.parsing import parse_tool_text
+
+AMOUNTS = {
+    "1000": 1000.0,
+    "1000.50": 1000.5,
+    "1000,50": 1000.5,
+    "1,000": 1000.0,
+    "1.000": 1000.0,
+    "1,000.50": 1000.5,
+    "1.234,50": 1234.5,
+    "1,000,000": 1000000.0,
+    "1.000.000": 1000000.0,
+    "1.234.567,89": 1234567.89,
+    "-1.500": -1500.0,
+    "12.5": 12.5,
+    "0,75": 0.75,
+}
+
+
+def _invoice_amount(amount):
+    parsed = parse_tool_text("getInvoice", f"Invoice #abc123: {amount} DKK - Status: paid")
+    return parsed and parsed.records[0].amount
+
+
+def test_every_amount_format_is_parsed():
+    for text, amount in AMOUNTS.items():
+        assert _invoice_amount(text) == amount, text
+
+
+def test_amounts_in_lists_and_totals():
+    parsed = parse_tool_text("listInvoices", "Found 2 invoices:\n• Invoice abc123: 1,000 DKK - paid\n"
+                                             "• Invoice def456: 1.234,50 DKK - draft")
+    assert [invoice.amount for invoice in parsed.records] == [1000.0, 1234.5]
+    total = parse_tool_text("totalInvoiceAmount",
+                            "Total invoice amount from 2024-01-01 to 2024-12-31: 12.500 DKK (3 invoices)")
+    assert total.records[0].amount == 12500.0 and total.records[0].count == 3
+
+
+def test_unrecognized_amounts_fall_back_to_the_text():
+    for text in ("1.000.00", "1,00,000", "1,000.000.0", "1..0"):
+        assert _invoice_amount(text) is None, text
+
+
+if __name__ == "__main__":
+    test_every_amount_format_is_parsed()
+    test_amounts_in_lists_and_totals()
+    test_unrecognized_amounts_fall_back_to_the_text()
+    print("✅ Amounts are parsed in English and Danish formats")
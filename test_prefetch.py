@@ -0,0 +1,170 @@
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+print("🔍 Billy Predictive Prefetch Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent import agent as billy
+from billy_agent import prefetch
+from billy_agent.prefetch import Prefetcher
+
+NO_ARGUMENTS = {"type": "object", "properties": {}}
+BY_ID = {"type": "object", "properties": {"id": {"type": "string"}}, "required": ["id"]}
+SCHEMAS = {"listInvoices": NO_ARGUMENTS, "listCustomers": NO_ARGUMENTS, "listProducts": NO_ARGUMENTS,
+           "getInvoice": BY_ID, "createInvoice": {"type": "object", "required": ["contactId", "amount"],
+                                                  "properties": {"contactId": {"type": "string"},
+                                                                 "amount": {"type": "number"}}}}
+INVOICES = ("Found 4 invoices:\n• Invoice abc123: 1000 DKK - paid\n• Invoice def456: 2500 DKK - draft\n"
+            "• Invoice ghi789: 750 DKK - sent\n• Invoice jkl012: 300 DKK - paid")
+CREATED = "Invoice created successfully!\nInvoice #new001: 500 DKK - Status: draft"
+# Every fake MCP call takes this long
+TOOL_DELAY = 0.2
+
+
+def _text(text):
+    return {"content": [{"type": "text", "text": text}]}
+
+
+class FakeFederation:
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, name, arguments=None, affinity_key=None):
+        self.calls.append((name, arguments))
+        await asyncio.sleep(TOOL_DELAY)
+        if name == "getInvoice":
+            return _text(f"Invoice #{arguments['id']}: 1000 DKK - Status: paid\nContact: customer-456")
+        return _text({"listInvoices": INVOICES, "createInvoice": CREATED}.get(name, f"Found 0 {name[4:].lower()}"))
+
+    def server_state(self, name):
+        return None
+
+
+def _prefetcher(federation, **kwargs):
+    async def call_tool(name, arguments, session_id):
+        return await federation.call_tool(name, arguments)
+
+    prefetcher = Prefetcher(call_tool, **kwargs)
+    for name, schema in SCHEMAS.items():
+        prefetcher.register(name, schema)
+    return prefetcher
+
+
+def test_list_invoices_prefetches_the_first_invoices_within_budget():
+    async def run():
+        federation = FakeFederation()
+        prefetcher = _prefetcher(federation, max_concurrent=2)
+        prefetcher.after_call("s1", "listInvoices", None, _text(INVOICES))
+        started = time.perf_counter()
+        result = await prefetcher.take("getInvoice", {"id": "abc123"})
+        waited = time.perf_counter() - started
+        missed = await prefetcher.take("getInvoice", {"id": "zzz999"})
+        return federation, prefetcher, result, waited, missed
+
+    federation, prefetcher, result, waited, missed = asyncio.run(run())
+    assert federation.calls == [("getInvoice", {"id": "abc123"}), ("getInvoice", {"id": "def456"})]
+    assert "abc123" in result["content"][0]["text"] and missed is None
+    assert waited < TOOL_DELAY * 1.5
+    assert prefetcher.stats()["hits"] == 1 and prefetcher.stats()["skipped"] == 1
+    # Writes are never prefetched
+    assert all(name != "createInvoice" for name, _ in prefetcher.predict("listCustomers"))
+
+
+def test_transitions_are_learned_per_deployment():
+    async def run():
+        federation = FakeFederation()
+        prefetcher = _prefetcher(federation)
+        assert prefetcher.predict("listCustomers") == []
+        for session in ("s1", "s2", "s3", "s4"):
+            prefetcher.after_call(session, "listCustomers", None, _text("Found 0 customers"))
+            prefetcher.after_call(session, "listProducts", None, _text("Found 0 products"))
+        prefetcher.invalidate()
+        federation.calls.clear()
+        prefetcher.after_call("s5", "listCustomers", None, _text("Found 0 customers"))
+        await asyncio.sleep(0)
+        return federation, prefetcher
+
+    federation, prefetcher = asyncio.run(run())
+    assert round(prefetcher.probability("listCustomers", "listProducts"), 2) == round(4 / 9, 2)
+    assert federation.calls == [("listProducts", {})]
+    assert prefetcher.stats()["transitions"]["listCustomers"] == {"listProducts": 4}
+
+
+def test_writes_drop_prefetched_results():
+    async def run():
+        federation = FakeFederation()
+        prefetcher = _prefetcher(federation)
+        prefetcher.after_call("s1", "listInvoices", None, _text(INVOICES))
+        prefetcher.after_call("s1", "createInvoice", {"contactId": "customer-456", "amount": 500}, _text(CREATED))
+        stale = await prefetcher.take("getInvoice", {"id": "abc123"})
+        fresh = await prefetcher.take("getInvoice", {"id": "new001"})
+        return prefetcher, stale, fresh
+
+    prefetcher, stale, fresh = asyncio.run(run())
+    assert stale is None
+    assert "new001" in fresh["content"][0]["text"]
+    assert prefetcher.stats()["wasted"] == 3
+
+
+def test_tools_not_known_to_be_read_only_are_never_prefetched():
+    async def run():
+        federation = FakeFederation()
+        prefetcher = _prefetcher(federation)
+        prefetcher.register("markInvoicePaid", BY_ID)
+        for session in ("s1", "s2", "s3", "s4"):
+            prefetcher.after_call(session, "listInvoices", None, _text(INVOICES))
+            prefetcher.after_call(session, "markInvoicePaid", {"id": "abc123"}, _text("Invoice abc123 marked as paid"))
+        await asyncio.sleep(0)
+        return federation, prefetcher
+
+    federation, prefetcher = asyncio.run(run())
+    # The write follows every list, yet it is never called ahead of the model
+    assert prefetcher.stats()["transitions"]["listInvoices"] == {"markInvoicePaid": 4}
+    assert "markInvoicePaid" not in dict(prefetcher.predict("listInvoices"))
+    assert all(name == "getInvoice" for name, _ in federation.calls)
+    # and, like any write, it drops what was prefetched before it
+    assert prefetcher.stats()["pending"] == 0
+
+
+def test_next_tool_call_is_served_from_the_prefetch():
+    async def run():
+        prefetch._prefetcher = Prefetcher(billy._call_speculative_tool)
+        list_invoices = billy.create_dynamic_tool_function("listInvoices", "List invoices", NO_ARGUMENTS)
+        get_invoice = billy.create_dynamic_tool_function("getInvoice", "Get an invoice", BY_ID)
+        context = SimpleNamespace(state={}, invocation_id="i1", _invocation_context=SimpleNamespace(
+            session=SimpleNamespace(id="s1"), agent=SimpleNamespace(model="openai/gpt-4o-mini")))
+        await list_invoices(tool_context=context)
+        # The model takes a while to decide on the next call
+        await asyncio.sleep(TOOL_DELAY * 1.5)
+        started = time.perf_counter()
+        text = await get_invoice(tool_context=context, id="def456")
+        return text, time.perf_counter() - started, prefetch._prefetcher.stats()
+
+    federation = FakeFederation()
+    get_mcp_federation = billy.get_mcp_federation
+    billy.get_mcp_federation = lambda: federation
+    try:
+        text, elapsed, stats = asyncio.run(run())
+    finally:
+        billy.get_mcp_federation = get_mcp_federation
+        prefetch._prefetcher = None
+
+    print(f"   ⚡ getInvoice answered in {elapsed * 1000:.0f} ms from the prefetch")
+    assert "def456" in text
+    assert elapsed < TOOL_DELAY / 2
+    assert [name for name, _ in federation.calls].count("getInvoice") == 3
+    assert stats["hits"] == 1
+
+
+if __name__ == "__main__":
+    test_list_invoices_prefetches_the_first_invoices_within_budget()
+    test_transitions_are_learned_per_deployment()
+    test_writes_drop_prefetched_results()
+    test_tools_not_known_to_be_read_only_are_never_prefetched()
+    test_next_tool_call_is_served_from_the_prefetch()
+    print("✅ Likely next tool calls are prefetched")
@@ -0,0 +1,78 @@
+import asyncio
+import sys
+
+from google.genai import types
+
+print("🔍 Billy Stable Prompt Prefix Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from billy_agent.llm_cache import request_key
+from billy_agent.mcp_tool import McpFunctionTool
+from billy_agent.prompt import PromptCacheStats, stabilize_request
+
+INSTRUCTION = "You are Billy, a helpful AI assistant."
+
+
+def _tool(name, schema):
+    async def call(tool_context=None, **kwargs):
+        return {"tool": name, "arguments": kwargs}
+
+    call.__name__ = name
+    return McpFunctionTool(call, f"{name} tool", schema)
+
+
+def _request(tools):
+    llm_request = LlmRequest(model="openai/gpt-4o-mini",
+                             config=types.GenerateContentConfig(system_instruction=INSTRUCTION))
+    llm_request.append_tools(tools)
+    return llm_request
+
+
+INVOICE_SCHEMA = {"type": "object", "properties": {"id": {"type": "string"}, "format": {"type": "string"}},
+                  "required": ["id", "format"]}
+# The same schema as a server may send it on another run
+INVOICE_SCHEMA_REORDERED = {"required": ["format", "id"], "$schema": "http://json-schema.org/draft-07/schema#",
+                            "properties": {"format": {"type": "string"}, "id": {"type": "string"}}, "type": "object"}
+
+
+def test_discovery_order_does_not_change_the_prefix():
+    first = _request([_tool("listInvoices", {}), _tool("getInvoice", INVOICE_SCHEMA)])
+    second = _request([_tool("getInvoice", INVOICE_SCHEMA_REORDERED), _tool("listInvoices", {})])
+    assert request_key(first) != request_key(second)
+
+    stabilize_request(first)
+    stabilize_request(second)
+    assert request_key(first) == request_key(second)
+    declarations = first.config.tools[0].function_declarations
+    assert [declaration.name for declaration in declarations] == ["getInvoice", "listInvoices"]
+    assert first.config.system_instruction == INSTRUCTION
+
+
+def test_mcp_tools_declare_and_pass_their_arguments():
+    tool = _tool("getInvoice", INVOICE_SCHEMA)
+    declaration = tool._get_declaration()
+    assert declaration.parameters_json_schema["required"] == ["format", "id"]
+    result = asyncio.run(tool.run_async(args={"id": "abc123", "format": "pdf"}, tool_context=None))
+    assert result["arguments"] == {"id": "abc123", "format": "pdf"}
+
+
+def test_cached_token_share_is_reported():
+    stats = PromptCacheStats()
+    for cached in (0, 1024, 1536):
+        usage = types.GenerateContentResponseUsageMetadata(prompt_token_count=2048,
+                                                           cached_content_token_count=cached)
+        asyncio.run(stats.after_model(None, LlmResponse(usage_metadata=usage)))
+    assert stats.stats() == {"calls": 3, "prompt_tokens": 6144, "cached_tokens": 2560, "cached_share": 0.417}
+
+
+if __name__ == "__main__":
+    test_discovery_order_does_not_change_the_prefix()
+    test_mcp_tools_declare_and_pass_their_arguments()
+    test_cached_token_share_is_reported()
+    print("✅ Model requests keep a stable prefix")
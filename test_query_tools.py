@@ -0,0 +1,132 @@
+import asyncio
+import os
+import sys
+
+from aiohttp import web
+
+print("🔍 Billy Local Query Tools Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent import federation, health, query
+from billy_agent.query import query_customers, query_invoices
+
+STATES = ("paid", "draft", "sent")
+INVOICES = 300
+
+
+def _invoice_list():
+    lines = [f"Found {INVOICES} invoices:"]
+    for i in range(INVOICES):
+        lines.append(f"• Invoice inv{i:03d}: {1000 + i * 10} DKK - {STATES[i % 3]} "
+                     f"(contact: c{i % 7}, 2024-{1 + i % 12:02d}-{1 + i % 28:02d})")
+    return "\n".join(lines)
+
+
+TEXTS = {
+    "listInvoices": _invoice_list(),
+    "listCustomers": "Found 3 customers:\n• John Doe (customer-456)\n• Jane Smith (customer-789)\n"
+                     "• Hansen ApS (customer-901) - info@hansen.dk",
+    "createInvoice": "✅ Invoice created successfully! Invoice #new1: 99999 DKK - Status: draft",
+}
+
+
+async def _start_fake_mcp_server(calls):
+    """Start a fake Billy.dk MCP server that counts tools/call requests"""
+    async def mcp(request):
+        body = await request.json()
+        result = {}
+        if body["method"] == "tools/call":
+            name = body["params"]["name"]
+            calls.append(name)
+            result = {"content": [{"type": "text", "text": TEXTS[name]}]}
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": result})
+
+    app = web.Application()
+    app.router.add_post("/mcp", mcp)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def _use_server(url):
+    """Point a fresh federation and replica at the fake server"""
+    os.environ["MCP_SERVER_URL"] = url
+    os.environ.pop("MCP_SERVERS", None)
+    federation._mcp_federation = None
+    health._health_prober = None
+    query._billy_replica = None
+
+
+def test_query_invoices_returns_top_rows():
+    """queryInvoices filters, sorts and limits over one replicated list fetch"""
+    async def run():
+        calls = []
+        runner, url = await _start_fake_mcp_server(calls)
+        _use_server(url)
+        try:
+            latest = await query_invoices(limit=3)
+            paid_large = await query_invoices(state="paid", min_amount=3000, sort_by="amount",
+                                              descending=False, limit=2)
+            by_contact = await query_invoices(contact_id="c3", date_from="2024-06-01",
+                                              date_to="2024-06-30")
+            customers = await query_customers(sort_by="position", descending=True, limit=2)
+        finally:
+            await federation.get_mcp_federation().close()
+            await runner.cleanup()
+
+        print(f"   📋 {latest}")
+        # One list fetch per kind serves every query
+        assert calls == ["listInvoices", "listCustomers"]
+
+        rows = latest.splitlines()
+        assert rows[0].startswith("3 of 300 matching invoices")
+        dates = [row.split(" | ")[1] for row in rows[1:]]
+        assert dates == sorted(dates, reverse=True) and dates[0] == "2024-12-28"
+
+        rows = paid_large.splitlines()[1:]
+        assert [row.split(" | ")[0] for row in rows] == ["inv201", "inv204"]
+
+        rows = by_contact.splitlines()[1:]
+        assert rows and all(" | c3" in row and " | 2024-06-" in row for row in rows)
+
+        assert customers.splitlines()[1:] == ["customer-901 | Hansen ApS | info@hansen.dk",
+                                              "customer-789 | Jane Smith"]
+
+    asyncio.run(run())
+
+
+def test_writes_refresh_the_replica():
+    """A write marks the list stale, so the next query fetches it again"""
+    async def run():
+        calls = []
+        runner, url = await _start_fake_mcp_server(calls)
+        _use_server(url)
+        try:
+            replica = query.get_billy_replica()
+            replica.observe("listInvoices", {"content": [{"type": "text", "text": TEXTS["listInvoices"]}]})
+            largest = await query_invoices(sort_by="amount", limit=1)
+            assert calls == [] and largest.splitlines()[1].startswith("inv299")
+
+            replica.observe("createInvoice", {"content": [{"type": "text", "text": TEXTS["createInvoice"]}]})
+            assert replica.age("invoices") is None
+            largest = await query_invoices(sort_by="amount", limit=1)
+        finally:
+            await federation.get_mcp_federation().close()
+            await runner.cleanup()
+
+        assert calls == ["listInvoices"]
+        assert largest.splitlines()[1].startswith("inv299")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_query_invoices_returns_top_rows()
+    test_writes_refresh_the_replica()
+    print("✅ Local query tools return only the top rows")
@@ -0,0 +1,76 @@
+import sys
+
+print("🔍 Billy Tool Result Token Budget Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent.budget import ResultBudgeter, count_tokens
+
+STATES = ("paid", "draft", "sent")
+
+
+def _invoice_list(count):
+    lines = [f"Found {count} invoices:"]
+    for i in range(count):
+        lines.append(f"• Invoice inv{i:05d}: {1000 + i} DKK - {STATES[i % 3]} "
+                     f"(contact: c{i % 7}, 2024-{1 + i % 12:02d}-{1 + i % 28:02d})")
+    return "\n".join(lines)
+
+
+def test_large_list_keeps_head_rows_and_summary():
+    """A list over budget keeps head rows, a summary of all rows and a paging hint"""
+    budgeter = ResultBudgeter(tool_budget=500)
+    text = _invoice_list(3000)
+    fitted = budgeter.fit("listInvoices", text)
+
+    stats = budgeter.stats()
+    print(f"   ✂️  listInvoices: {stats['tokens_in']} → {stats['tokens_out']} tokens "
+          f"({stats['tokens_saved']} saved)")
+    assert count_tokens(fitted) <= 500
+    lines = fitted.splitlines()
+    assert lines[0] == "Found 3000 invoices:"
+    assert lines[1].startswith("• Invoice inv00000:")
+    assert "more rows not shown. Use queryInvoices" in fitted
+    assert lines[-1] == ("Summary: count=3000; sum=7498500.00 DKK; dates=2024-01-01..2024-12-28; "
+                         "states=paid:1000, draft:1000, sent:1000")
+    assert stats["truncated"] == 1 and stats["tokens_saved"] > 0.9 * stats["tokens_in"]
+
+
+def test_small_results_pass_through():
+    budgeter = ResultBudgeter(tool_budget=500)
+    text = _invoice_list(3)
+    assert budgeter.fit("listInvoices", text) == text
+    assert budgeter.stats()["tokens_saved"] == 0
+
+
+def test_turn_budget_is_shared_by_calls_of_one_invocation():
+    """Later results of a turn get what is left of the turn budget"""
+    budgeter = ResultBudgeter(tool_budget=2000, turn_budget=2500, min_budget=200)
+    text = _invoice_list(1000)
+    first = budgeter.fit("listInvoices", text, invocation_id="turn-1")
+    remaining = 2500 - count_tokens(first)
+    second = budgeter.fit("listInvoices", text, invocation_id="turn-1")
+    other_turn = budgeter.fit("listInvoices", text, invocation_id="turn-2")
+
+    assert count_tokens(second) <= remaining < count_tokens(first)
+    assert count_tokens(other_turn) == count_tokens(first)
+    # An exhausted turn still gets the minimum budget
+    assert budgeter.budget_for("listInvoices", "turn-1") == 200
+
+
+def test_unparsed_text_is_cut_at_budget():
+    budgeter = ResultBudgeter(tool_budget=100, tool_budgets={"getInvoice": 50})
+    text = "word " * 1000
+    fitted = budgeter.fit("getInvoice", text)
+    assert fitted.endswith(f"[truncated, {count_tokens(text)} tokens in full]")
+    assert count_tokens(fitted) <= 50 + 15
+
+
+if __name__ == "__main__":
+    test_large_list_keeps_head_rows_and_summary()
+    test_small_results_pass_through()
+    test_turn_budget_is_shared_by_calls_of_one_invocation()
+    test_unparsed_text_is_cut_at_budget()
+    print("✅ Tool results fit their token budgets")
@@ -0,0 +1,73 @@
+import asyncio
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+print("🔍 Billy Result Store Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent import result_store
+from billy_agent.budget import ResultBudgeter, count_tokens
+from billy_agent.result_store import ResultStore, read_result_page
+
+
+def _invoice_list(count):
+    lines = [f"Found {count} invoices:"]
+    lines += [f"• Invoice inv{i:05d}: {1000 + i} DKK - paid" for i in range(count)]
+    return "\n".join(lines)
+
+
+def _tool_context(session_id):
+    """Minimal stand-in for the ADK ToolContext of one session"""
+    return SimpleNamespace(_invocation_context=SimpleNamespace(session=SimpleNamespace(id=session_id)))
+
+
+def test_pages_from_memory_and_disk():
+    """Results over the memory limit are spilled and still paged correctly"""
+    with tempfile.TemporaryDirectory() as spill_dir:
+        store = ResultStore(spill_dir=spill_dir, memory_limit=100_000)
+        rows = [f"row {i}" for i in range(10_000)]
+        first = store.put("s1", "listInvoices", "", rows)
+        second = store.put("s1", "listInvoices", "", rows)
+
+        assert (first, second) == ("r1", "r2")
+        assert store.sessions["s1"]["r1"].path and os.path.exists(store.sessions["s1"]["r1"].path)
+        assert store.sessions["s1"]["r2"].rows is not None
+        for handle in (first, second):
+            _, page = store.read("s1", handle, offset=9_998, limit=5)
+            assert page == ["row 9998", "row 9999"]
+
+        # Handles are per session
+        assert store.read("s2", first) is None
+        store.close()
+        assert os.listdir(spill_dir) == []
+
+
+def test_budgeter_stores_large_results_for_paging():
+    """A shortened result names a handle that readResultPage pages through"""
+    store = result_store._result_store = ResultStore()
+    budgeter = ResultBudgeter(tool_budget=300, store=store)
+    fitted = budgeter.fit("listInvoices", _invoice_list(2000), session_id="s1")
+
+    assert count_tokens(fitted) <= 300
+    assert 'readResultPage(handle="r1", offset=' in fitted
+    shown = len([line for line in fitted.splitlines() if line.startswith("•")])
+
+    page = asyncio.run(read_result_page("r1", offset=shown, limit=3, tool_context=_tool_context("s1")))
+    print(f"   📄 {page.splitlines()[0]}")
+    assert page.splitlines() == [f"Found 2000 invoices - Rows {shown + 1}-{shown + 3} of 2000 (r1):"] + [
+        f"• Invoice inv{i:05d}: {1000 + i} DKK - paid" for i in range(shown, shown + 3)]
+
+    missing = asyncio.run(read_result_page("r1", tool_context=_tool_context("other")))
+    assert missing.startswith("❌")
+    result_store._result_store = None
+
+
+if __name__ == "__main__":
+    test_pages_from_memory_and_disk()
+    test_budgeter_stores_large_results_for_paging()
+    print("✅ Large results are stored out of band and paged")
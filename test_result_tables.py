@@ -0,0 +1,55 @@
+import os
+import sys
+
+print("🔍 Billy Tabular Result Rendering Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent.budget import ResultBudgeter
+from billy_agent.parsing import parse_tool_text
+from billy_agent.tables import CSV, TEXT, TSV, render_table, result_format_for
+
+
+def test_invoice_table_drops_empty_columns_and_shared_currency():
+    parsed = parse_tool_text("listInvoices", "Found 3 invoices:\n• Invoice abc123: 1000 DKK - paid\n"
+                                             "• Invoice def456: 2500.50 DKK - draft\n• Invoice ghi789: 750 DKK - sent")
+    assert render_table(parsed, TSV) == ("3 invoices, amounts in DKK:\n"
+                                         "id\tamount\tstate\n"
+                                         "abc123\t1000\tpaid\n"
+                                         "def456\t2500.50\tdraft\n"
+                                         "ghi789\t750\tsent")
+
+
+def test_csv_quotes_values_with_commas():
+    parsed = parse_tool_text("listCustomers", "Found 1 customers:\n• Hansen, Jensen & Co (customer-1)")
+    assert render_table(parsed, CSV) == '1 customers:\nid,name\ncustomer-1,"Hansen, Jensen & Co"'
+
+
+def test_format_is_chosen_per_model():
+    os.environ["BILLY_RESULT_FORMATS"] = "gpt-4o-mini=csv"
+    os.environ.pop("BILLY_RESULT_FORMAT", None)
+    try:
+        assert result_format_for("openai/gpt-4o-mini") == CSV
+        assert result_format_for("openai/gpt-4o") == TSV
+        assert result_format_for("openai/gpt-3.5-turbo") == TEXT
+    finally:
+        del os.environ["BILLY_RESULT_FORMATS"]
+
+
+def test_budget_pages_table_rows():
+    text = "Found 500 invoices:\n" + "\n".join(f"• Invoice inv{i:03d}: {i} DKK - paid" for i in range(500))
+    parsed = parse_tool_text("listInvoices", text)
+    fitted = ResultBudgeter(tool_budget=200).fit("listInvoices", render_table(parsed, TSV), parsed=parsed)
+    lines = fitted.splitlines()
+    assert lines[:3] == ["500 invoices, amounts in DKK:", "id\tamount\tstate", "inv000\t0\tpaid"]
+    assert lines[-1].startswith("Summary: count=500; sum=124750.00 DKK")
+
+
+if __name__ == "__main__":
+    test_invoice_table_drops_empty_columns_and_shared_currency()
+    test_csv_quotes_values_with_commas()
+    test_format_is_chosen_per_model()
+    test_budget_pages_table_rows()
+    print("✅ Parsed results render as compact tables")
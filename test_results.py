@@ -0,0 +1,78 @@
+import base64
+import sys
+
+print("🔍 Billy Tool Result Rendering Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent.results import render_tool_result, result_text
+
+PNG = base64.b64encode(b"\x89PNG" + b"\x00" * 96).decode()
+
+
+def test_all_parts_are_kept_in_order():
+    result = {"content": [
+        {"type": "text", "text": "Found 1 invoices:"},
+        {"type": "text", "text": "• Invoice abc123: 1000 DKK - paid\n"},
+        {"type": "image", "data": PNG, "mimeType": "image/png"},
+        {"type": "resource_link", "uri": "billy://invoices/abc123.pdf", "name": "abc123.pdf"},
+    ]}
+    assert render_tool_result(result) == ("Found 1 invoices:\n• Invoice abc123: 1000 DKK - paid\n"
+                                          "[image: image/png, 100 bytes]\n"
+                                          "[resource billy://invoices/abc123.pdf: abc123.pdf]")
+    assert result_text(result) == "Found 1 invoices:\n• Invoice abc123: 1000 DKK - paid\n"
+
+
+def test_pretty_json_text_is_compacted():
+    result = {"content": [{"type": "text", "text": '{\n  "id": "abc123",\n  "amount": 1000,\n  "note": "Bøde"\n}'}]}
+    assert render_tool_result(result) == '{"id":"abc123","amount":1000,"note":"Bøde"}'
+    # Text that only looks like JSON is kept as it is
+    assert render_tool_result({"content": [{"type": "text", "text": "[draft]\nnot json"}]}) == "[draft]\nnot json"
+
+
+def test_structured_content_replaces_the_text_parts():
+    result = {
+        "structuredContent": {"invoices": [{"id": "abc123", "amount": 1000}]},
+        "content": [{"type": "text", "text": '{"invoices": [{"id": "abc123", "amount": 1000}]}'},
+                    {"type": "resource_link", "uri": "billy://invoices"}],
+    }
+    assert render_tool_result(result) == '{"invoices":[{"id":"abc123","amount":1000}]}\n[resource billy://invoices]'
+    # Parsers still read the text parts
+    assert result_text(result) == '{"invoices": [{"id": "abc123", "amount": 1000}]}'
+
+
+def test_resources_and_blobs_are_summarized():
+    result = {"content": [
+        {"type": "resource", "resource": {"uri": "billy://invoices/abc123", "text": "Invoice #abc123: 1000 DKK"}},
+        {"type": "resource", "resource": {"uri": "billy://invoices/abc123.pdf", "mimeType": "application/pdf",
+                                          "blob": base64.b64encode(b"%PDF" + b"\x00" * 1020).decode()}},
+        {"type": "audio", "data": base64.b64encode(b"\x00" * 10).decode(), "mimeType": "audio/wav"},
+        {"type": "chart", "title": "Revenue", "data": PNG},
+    ]}
+    assert render_tool_result(result).splitlines() == [
+        "Invoice #abc123: 1000 DKK",
+        "[resource billy://invoices/abc123.pdf: application/pdf, 1024 bytes]",
+        "[audio: audio/wav, 10 bytes]",
+        '{"type":"chart","title":"Revenue"}',
+    ]
+    assert result_text(result) == ""
+
+
+def test_errors_and_empty_results():
+    error = {"content": [{"type": "text", "text": "Invoice zzz999 not found"}], "isError": True}
+    assert render_tool_result(error) == "❌ Error: Invoice zzz999 not found"
+    assert result_text(error) == "Invoice zzz999 not found"
+    assert render_tool_result({"content": [], "isError": True}) == "❌ Error: (no content)"
+    assert render_tool_result({"content": None}) == "(no content)"
+    assert render_tool_result("plain text") == result_text("plain text") == "plain text"
+
+
+if __name__ == "__main__":
+    test_all_parts_are_kept_in_order()
+    test_pretty_json_text_is_compacted()
+    test_structured_content_replaces_the_text_parts()
+    test_resources_and_blobs_are_summarized()
+    test_errors_and_empty_results()
+    print("✅ MCP tool results are rendered compactly")
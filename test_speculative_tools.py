@@ -0,0 +1,176 @@
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+from google.genai import types
+
+print("🔍 Billy Speculative Tool Dispatch Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+import litellm  # noqa: F401  (import LiteLLM before the event loop starts)
+from litellm.types.utils import Delta, ModelResponseStream, StreamingChoices
+from google.adk.agents import LlmAgent
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.models.lite_llm import LiteLlm, LiteLLMClient
+from google.adk.runners import InMemoryRunner
+
+from billy_agent import agent as billy
+from billy_agent import speculation
+from billy_agent.mcp_tool import McpFunctionTool
+from billy_agent.speculation import ArgumentStream, SpeculativeDispatcher, SpeculativeLiteLLMClient, \
+    is_speculation_safe
+
+GET_INVOICE = {"type": "object", "properties": {"id": {"type": "string"}}, "required": ["id"]}
+# The model keeps streaming this long after the arguments are complete
+STREAM_TAIL = 0.3
+# Every fake MCP call takes this long
+TOOL_DELAY = 0.2
+
+
+def _chunk(delta, finish_reason=None):
+    return ModelResponseStream(model="gpt-4o", choices=[StreamingChoices(index=0, delta=delta,
+                                                                         finish_reason=finish_reason)])
+
+
+def _tool_call(name=None, arguments=""):
+    function = {"arguments": arguments}
+    if name:
+        function["name"] = name
+    return Delta(tool_calls=[{"index": 0, "id": "call_1" if name else None, "type": "function",
+                              "function": function}])
+
+
+class StreamingClient(LiteLLMClient):
+    """Streams a getInvoice call in fragments, then the answer once the tool result is in"""
+
+    def __init__(self):
+        self.finished = []
+
+    async def _stream(self, answered: bool):
+        if answered:
+            for text in ("Invoice inv-1 ", "is paid."):
+                yield _chunk(Delta(content=text))
+            yield _chunk(Delta(), "stop")
+            return
+        for delta in (_tool_call("getInvoice"), _tool_call(arguments='{"i'), _tool_call(arguments='d": "inv'),
+                      _tool_call(arguments='-1"}')):
+            await asyncio.sleep(0.01)
+            yield _chunk(delta)
+        await asyncio.sleep(STREAM_TAIL)
+        self.finished.append(time.perf_counter())
+        yield _chunk(Delta(), "tool_calls")
+
+    async def acompletion(self, model, messages, tools, **kwargs):
+        return self._stream(any(message.get("role") == "tool" for message in messages))
+
+
+class FakeFederation:
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, name, arguments=None, affinity_key=None):
+        self.calls.append((name, arguments, time.perf_counter()))
+        await asyncio.sleep(TOOL_DELAY)
+        return {"content": [{"type": "text", "text": f"Invoice {arguments['id']}: 100 DKK, paid"}]}
+
+
+def test_argument_stream_detects_complete_json():
+    stream = ArgumentStream()
+    fragments = ['{"query": "a {b', '} \\"c\\"", "limit"', ': 5', '}']
+    results = [stream.feed(fragment) for fragment in fragments]
+    assert results == [None, None, None, {"query": 'a {b} "c"', "limit": 5}]
+    assert not stream.changed
+    # Anything after the closing brace means the parsed arguments were not final
+    assert stream.feed(', "x": 1}') is None and stream.changed
+
+    trailing = ArgumentStream()
+    assert trailing.feed('{"id": "1"} x') is None and trailing.changed
+
+
+def test_only_read_only_tools_with_scalar_arguments_are_safe():
+    assert is_speculation_safe("getInvoice", GET_INVOICE)
+    assert is_speculation_safe("listInvoices", {"type": "object", "properties": {}})
+    assert not is_speculation_safe("createInvoice", GET_INVOICE)
+    # A tool not known to be read-only could be a write whatever its name
+    assert not is_speculation_safe("markInvoicePaid", GET_INVOICE)
+    assert not is_speculation_safe("queryInvoices", {"type": "object", "properties": {
+        "filters": {"type": "array", "items": {"type": "object"}}}})
+
+
+def test_changed_arguments_discard_the_speculative_call():
+    async def run():
+        called = []
+
+        async def call_tool(name, arguments, session_id):
+            called.append(arguments)
+            await asyncio.sleep(1)
+
+        dispatcher = SpeculativeDispatcher(call_tool)
+        dispatcher.register("getInvoice", GET_INVOICE)
+        dispatcher.dispatch(("inv-a", "s1"), "getInvoice", {"id": "inv-1"})
+        dispatcher.dispatch(("inv-a", "s1"), "createInvoice", {"id": "inv-1"})
+        await asyncio.sleep(0)
+        task = next(iter(dispatcher.pending.values()))[0]
+        assert dispatcher.claim("inv-a", "getInvoice", {"id": "inv-2"}) is None
+        # The next model call of the turn drops what the tools did not claim
+        await dispatcher.before_model(SimpleNamespace(invocation_id="inv-a", session=None), None)
+        await asyncio.sleep(0)
+        return dispatcher, called, task
+
+    dispatcher, called, task = asyncio.run(run())
+    assert called == [{"id": "inv-1"}]
+    assert task.cancelled()
+    assert dispatcher.stats() == {"dispatched": 1, "used": 0, "discarded": 1, "pending": 0,
+                                  "head_start_seconds": 0.0}
+
+
+def test_tool_call_starts_before_the_model_finishes():
+    async def run():
+        dispatcher = speculation._speculative_dispatcher = SpeculativeDispatcher(billy._call_speculative_tool)
+        tool = McpFunctionTool(billy.create_dynamic_tool_function("getInvoice", "Get an invoice", GET_INVOICE),
+                               "Get an invoice", GET_INVOICE)
+        client = StreamingClient()
+        agent = LlmAgent(name="billy_test", instruction="Answer about invoices", tools=[tool],
+                         model=LiteLlm(model="openai/gpt-4o", api_key="sk-test",
+                                       llm_client=SpeculativeLiteLLMClient(client, dispatcher)),
+                         before_model_callback=[dispatcher.before_model])
+        runner = InMemoryRunner(agent=agent, app_name="billy_test")
+        session = await runner.session_service.create_session(app_name="billy_test", user_id="user")
+        message = types.Content(role="user", parts=[types.Part(text="Show invoice inv-1")])
+        events = [event async for event in runner.run_async(
+            user_id="user", session_id=session.id, new_message=message,
+            run_config=RunConfig(streaming_mode=StreamingMode.SSE))]
+        await runner.close()
+        return dispatcher, client, events
+
+    federation = FakeFederation()
+    get_mcp_federation = billy.get_mcp_federation
+    billy.get_mcp_federation = lambda: federation
+    try:
+        dispatcher, client, events = asyncio.run(run())
+    finally:
+        billy.get_mcp_federation = get_mcp_federation
+        speculation._speculative_dispatcher = None
+
+    responses = [part.function_response for event in events for part in event.content.parts or ()
+                 if part.function_response]
+    assert len(responses) == 1 and "100 DKK" in str(responses[0].response)
+    assert events[-1].content.parts[0].text == "Invoice inv-1 is paid."
+    # One MCP call, started while the model was still streaming
+    assert [(name, arguments) for name, arguments, _ in federation.calls] == [("getInvoice", {"id": "inv-1"})]
+    head_start = client.finished[0] - federation.calls[0][2]
+    print(f"   ⚡ Tool call started {head_start * 1000:.0f} ms before the model finished")
+    assert head_start > STREAM_TAIL * 0.8
+    assert dispatcher.stats()["used"] == 1 and dispatcher.stats()["discarded"] == 0
+
+
+if __name__ == "__main__":
+    test_argument_stream_detects_complete_json()
+    test_only_read_only_tools_with_scalar_arguments_are_safe()
+    test_changed_arguments_discard_the_speculative_call()
+    test_tool_call_starts_before_the_model_finishes()
+    print("✅ Read-only tool calls start as soon as their arguments are complete")
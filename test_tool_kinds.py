@@ -0,0 +1,68 @@
+import os
+import sys
+
+print("🔍 Billy Tool Kinds Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent import federation as federation_module
+from billy_agent import tool_kinds
+from billy_agent.federation import McpFederation, McpServerConfig
+from billy_agent.tool_kinds import is_read_only_tool, is_write_tool
+
+
+def test_write_names_are_recognized():
+    assert is_write_tool("createInvoice") and is_write_tool("crm_deleteContact")
+    assert not is_write_tool("listInvoices") and not is_write_tool("totalInvoiceAmount")
+
+
+def test_only_known_read_tools_are_read_only():
+    assert is_read_only_tool("listInvoices") and is_read_only_tool("getInvoice")
+    assert is_read_only_tool("totalInvoiceAmount")
+    # Writes whose names the write pattern does not know are not treated as reads
+    for name in ("markInvoicePaid", "cancelSubscription", "archiveContact", "issueCreditNote", "postJournal",
+                 "createInvoice"):
+        assert not is_read_only_tool(name), name
+
+
+def test_annotations_and_namespaces_of_federated_tools():
+    federation = McpFederation([McpServerConfig("billy", "http://billy"), McpServerConfig("crm", "http://crm")])
+    federation._merge(federation.servers[0], [{"name": "listInvoices"}])
+    federation._merge(federation.servers[1], [
+        {"name": "listInvoices"},
+        {"name": "searchContacts", "annotations": {"readOnlyHint": True}},
+        {"name": "getInvoice", "annotations": {"readOnlyHint": False}},
+        {"name": "sendReminder", "annotations": {"readOnlyHint": True}},
+    ])
+    saved = federation_module._mcp_federation
+    federation_module._mcp_federation = federation
+    try:
+        assert is_read_only_tool("crm_listInvoices") and is_read_only_tool("crm_searchContacts")
+        # The server's annotation wins over the configured names, but not over a write name
+        assert not is_read_only_tool("crm_getInvoice") and not is_read_only_tool("crm_sendReminder")
+    finally:
+        federation_module._mcp_federation = saved
+
+
+def test_read_only_tools_are_configurable():
+    saved = os.environ.get("BILLY_READ_ONLY_TOOLS")
+    os.environ["BILLY_READ_ONLY_TOOLS"] = "listInvoices, searchContacts"
+    tool_kinds._read_only_tools = None
+    try:
+        assert is_read_only_tool("searchContacts") and not is_read_only_tool("getInvoice")
+    finally:
+        if saved is None:
+            os.environ.pop("BILLY_READ_ONLY_TOOLS", None)
+        else:
+            os.environ["BILLY_READ_ONLY_TOOLS"] = saved
+        tool_kinds._read_only_tools = None
+
+
+if __name__ == "__main__":
+    test_write_names_are_recognized()
+    test_only_known_read_tools_are_read_only()
+    test_annotations_and_namespaces_of_federated_tools()
+    test_read_only_tools_are_configurable()
+    print("✅ Read-only tools are told apart from writes")
@@ -0,0 +1,342 @@
+import asyncio
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+print("🔍 Billy Write Outbox Test")
+print("=" * 50)
+
+# Add current directory to Python path
+sys.path.insert(0, '.')
+
+from billy_agent import agent as billy
+from billy_agent import outbox as outbox_module
+from billy_agent import prefetch, speculation
+from billy_agent.mcp_client import McpServerUnavailable
+from billy_agent.outbox import DONE, FAILED, IDEMPOTENCY_META, SENDING, WriteOutbox, get_write_status
+
+CREATE = {"contactId": "customer-456", "amount": 500}
+
+
+def _context(call_id):
+    return SimpleNamespace(state={}, invocation_id="i1", function_call_id=call_id, _invocation_context=SimpleNamespace(
+        session=SimpleNamespace(id="s1"), agent=SimpleNamespace(model="openai/gpt-4o-mini")))
+
+
+def _text(text):
+    return {"content": [{"type": "text", "text": text}]}
+
+
+class FakeBilly:
+    """
+    Fake Billy.dk MCP server; failures say how each create call fails: down, dropped (before creating),
+    foreign (dropped, while someone else creates an invoice of the same amount) or lost
+    """
+
+    def __init__(self, *failures):
+        self.failures = list(failures)
+        self.invoices = [("abc123", 1000, "customer-456"), ("def456", 500, "customer-456")]
+        self.calls = []
+        self.keys = []
+        self.delay = 0.0
+        self.list_contacts = True
+
+    def listing(self):
+        lines = [f"Found {len(self.invoices)} invoices:"]
+        lines += [f"• Invoice {id}: {amount} DKK - draft"
+                  + (f" (contact: {contact})" if self.list_contacts else "") for id, amount, contact in self.invoices]
+        return _text("\n".join(lines))
+
+    def _get(self, invoice_id):
+        for id, amount, contact in self.invoices:
+            if id == invoice_id:
+                return _text(f"Invoice #{id}: {amount} DKK - Status: draft\nContact: {contact}")
+        return {**_text(f"Invoice {invoice_id} not found"), "isError": True}
+
+    def _write(self, name, arguments):
+        if name == "deleteInvoice":
+            self.invoices = [invoice for invoice in self.invoices if invoice[0] != arguments["id"]]
+            return _text(f"Invoice {arguments['id']} deleted")
+        if name == "updateInvoice":
+            self.invoices = [(id, arguments["amount"] if id == arguments["id"] else amount, contact)
+                             for id, amount, contact in self.invoices]
+            return self._get(arguments["id"])
+        id = f"new{len(self.invoices):03d}"
+        self.invoices.append((id, arguments["amount"], arguments["contactId"]))
+        return _text(f"Invoice created successfully!\nInvoice #{id}: {arguments['amount']} DKK - Status: draft")
+
+    async def call_tool(self, name, arguments=None, affinity_key=None, meta=None):
+        self.calls.append(name)
+        if name == "listInvoices":
+            return self.listing()
+        if name == "getInvoice":
+            return self._get(arguments["id"])
+        self.keys.append((meta or {}).get(IDEMPOTENCY_META))
+        failure = self.failures.pop(0) if self.failures else None
+        if failure == "down":
+            raise McpServerUnavailable("billy", "Connection refused")
+        await asyncio.sleep(self.delay)
+        if failure == "foreign":
+            self.invoices.append(("other01", arguments["amount"], "customer-999"))
+        if failure in ("dropped", "foreign"):
+            raise asyncio.TimeoutError()
+        result = self._write(name, arguments)
+        if failure == "lost":
+            raise asyncio.TimeoutError()
+        return result
+
+    def server_state(self, name):
+        return None
+
+
+def _outbox(billy_fake, listed=True, **kwargs):
+    """Outbox sending to billy_fake; listed: the conversation has seen the invoice list, as the agent tells it"""
+    async def call_tool(name, arguments, key):
+        return await billy_fake.call_tool(name, arguments, meta={IDEMPOTENCY_META: key} if name != "listInvoices"
+                                          else None)
+
+    outbox = WriteOutbox(call_tool, retry_delay=0.05, **kwargs)
+    for name in ("listInvoices", "getInvoice", "createInvoice", "updateInvoice", "deleteInvoice"):
+        outbox.register(name)
+    if listed:
+        outbox.observe("listInvoices", billy_fake.listing())
+    return outbox
+
+
+def test_lost_create_responses_are_reconciled_not_repeated():
+    async def run():
+        fake = FakeBilly("lost")
+        outbox = _outbox(fake)
+        result = await outbox.call("createInvoice", CREATE, "s1")
+        outbox.stop()
+        return fake, outbox, result
+
+    fake, outbox, result = asyncio.run(run())
+    key = fake.keys[0]
+    print(f"   📮 {' -> '.join(outbox.journal(key))}")
+    # The list is only read when the response is lost
+    assert fake.calls == ["createInvoice", "listInvoices"]
+    assert len(fake.invoices) == 3 and "new002" in result["content"][0]["text"]
+    assert outbox.journal(key) == ["queued", "sent", "no response", "reconciled"]
+    assert outbox.status(key)["state"] == DONE and outbox.stats()["reconciled"] == 1
+
+
+def test_lost_creates_that_cannot_be_checked_are_not_repeated():
+    async def run():
+        fake = FakeBilly("lost")
+        outbox = WriteOutbox(_outbox(fake).call_tool, retry_delay=0.05)
+        outbox.register("createInvoice")
+        result = await outbox.call("createInvoice", CREATE, "s1")
+        outbox.stop()
+        return fake, result
+
+    fake, result = asyncio.run(run())
+    assert fake.calls == ["createInvoice"]
+    assert result["isError"] and "Check Billy.dk before repeating it" in result["content"][0]["text"]
+
+
+def test_new_records_must_match_the_contact_and_amount():
+    async def run(fake):
+        outbox = _outbox(fake)
+        result = await outbox.call("createInvoice", CREATE, "s1")
+        outbox.stop()
+        return outbox, result
+
+    # Someone else's invoice of the same amount is not taken for the lost create
+    foreign = FakeBilly("foreign")
+    outbox, result = asyncio.run(run(foreign))
+    assert outbox.journal(foreign.keys[0]) == ["queued", "sent", "no response", "not found", "sent", "confirmed"]
+    assert [invoice[0] for invoice in foreign.invoices] == ["abc123", "def456", "other01", "new003"]
+    # The confirmed invoice joins the snapshot the next create is reconciled against
+    assert {"other01", "new003"} <= outbox.lists["listInvoices"][0]
+
+    # A new invoice whose contact the list does not show may or may not be the create's
+    unlisted = FakeBilly("lost")
+    unlisted.list_contacts = False
+    outbox, result = asyncio.run(run(unlisted))
+    assert outbox.journal(unlisted.keys[0]) == ["queued", "sent", "no response", "unknown outcome"]
+    assert result["isError"] and "could not be compared" in result["content"][0]["text"]
+    assert unlisted.calls.count("createInvoice") == 1
+
+
+def test_lost_creates_without_an_earlier_list_are_only_sent_again_if_nothing_matches():
+    async def run(fake):
+        outbox = _outbox(fake, listed=False)
+        result = await outbox.call("createInvoice", CREATE, "s1")
+        outbox.stop()
+        return outbox, result
+
+    # No invoice of that contact and amount: the create did not go through
+    missing = FakeBilly("dropped")
+    missing.invoices = [("abc123", 1000, "customer-456")]
+    outbox, result = asyncio.run(run(missing))
+    assert outbox.journal(missing.keys[0]) == ["queued", "sent", "no response", "not found", "sent", "confirmed"]
+    assert len(missing.invoices) == 2
+
+    # def456 matches too, and without an earlier list it could be the create's record
+    matching = FakeBilly("lost")
+    outbox, result = asyncio.run(run(matching))
+    assert outbox.journal(matching.keys[0]) == ["queued", "sent", "no response", "unknown outcome"]
+    assert "may or may not be this one" in result["content"][0]["text"] and len(matching.invoices) == 3
+
+
+def test_undelivered_and_missing_writes_are_sent_again():
+    async def run():
+        fake = FakeBilly("down", "dropped")
+        outbox = _outbox(fake)
+        # The server is down: the caller is told at once that the write is queued
+        queued = await outbox.call("createInvoice", CREATE, "s1")
+        result = await outbox.wait(fake.keys[0], 2)
+        outbox.stop()
+        return fake, outbox, queued, result
+
+    fake, outbox, queued, result = asyncio.run(run())
+    key = fake.keys[0]
+    assert "saved in the outbox" in queued["content"][0]["text"]
+    assert len(fake.invoices) == 3 and "Invoice created successfully" in result["content"][0]["text"]
+    # Every attempt carried the same idempotency key
+    assert fake.keys == [key, key, key]
+    assert outbox.journal(key) == ["queued", "sent", "not delivered", "sent", "no response", "not found",
+                                   "sent", "confirmed"]
+    assert outbox.status(key)["attempts"] == 2
+
+
+def test_lost_updates_and_deletes_are_read_back_not_repeated():
+    async def run(fake, tool_name, arguments):
+        outbox = _outbox(fake)
+        result = await outbox.call(tool_name, arguments, "s1")
+        outbox.stop()
+        return outbox.journal(fake.keys[0]), result
+
+    deleted = FakeBilly("lost")
+    journal, result = asyncio.run(run(deleted, "deleteInvoice", {"id": "abc123"}))
+    assert journal == ["queued", "sent", "no response", "reconciled"]
+    assert deleted.calls == ["deleteInvoice", "getInvoice"] and "abc123 is gone" in result["content"][0]["text"]
+
+    # The invoice is still there, so the delete never happened and is sent again
+    kept = FakeBilly("dropped")
+    journal, result = asyncio.run(run(kept, "deleteInvoice", {"id": "abc123"}))
+    assert journal == ["queued", "sent", "no response", "not applied", "sent", "confirmed"]
+    assert [invoice[0] for invoice in kept.invoices] == ["def456"]
+
+    updated = FakeBilly("lost")
+    journal, result = asyncio.run(run(updated, "updateInvoice", {"id": "abc123", "amount": 1200}))
+    assert journal == ["queued", "sent", "no response", "reconciled"]
+    assert updated.calls == ["updateInvoice", "getInvoice"] and "1200 DKK" in result["content"][0]["text"]
+
+    # getInvoice does not show the due date, so the update cannot be checked
+    unchecked = FakeBilly("lost")
+    journal, result = asyncio.run(run(unchecked, "updateInvoice", {"id": "abc123", "amount": 1200,
+                                                                   "dueDate": "2026-11-01"}))
+    assert journal == ["queued", "sent", "no response", "unknown outcome"]
+    assert result["isError"] and unchecked.calls.count("updateInvoice") == 1
+
+
+def test_writes_survive_a_restart():
+    async def run(path):
+        fake = FakeBilly()
+        first = _outbox(fake, path=path)
+        key = first.submit("createInvoice", CREATE, "s1")
+        # The process died while the create was being sent, after Billy.dk stored it
+        first._transition(key, SENDING, "sent", snapshot='["abc123", "def456"]', attempts=1)
+        fake.invoices.append(("new002", 500, "customer-456"))
+        # A write a script made outside any conversation is not replayed
+        scripted = first.submit("createInvoice", {"contactId": "c1", "amount": 100})
+        first.db.close()
+
+        restarted = _outbox(fake, path=path)
+        restarted.ensure_started()
+        result = await restarted.wait(key, 2)
+        restarted.stop()
+        return fake, restarted, key, result, restarted.status(scripted)["state"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        fake, restarted, key, result, scripted = asyncio.run(run(os.path.join(directory, "outbox.sqlite")))
+        journal = restarted.journal(key)
+        restarted.db.close()
+
+    assert "new002" in result["content"][0]["text"] and len(fake.invoices) == 3
+    assert fake.calls == ["listInvoices"]
+    assert journal == ["queued", "sent", "recovered", "reconciled"]
+    assert scripted == FAILED
+
+
+def test_agent_returns_before_slow_writes_are_confirmed():
+    async def run():
+        create_invoice = billy.create_dynamic_tool_function("createInvoice", "Create an invoice", {
+            "type": "object", "properties": {"contactId": {"type": "string"}, "amount": {"type": "number"}}})
+        billy.create_dynamic_tool_function("listInvoices", "List invoices", {"type": "object", "properties": {}})
+        outbox = outbox_module._write_outbox
+        outbox.call_tool = billy._call_outbox_tool
+        outbox.on_complete = lambda name, arguments, result: completed.append(name)
+        text = await create_invoice(tool_context=_context("call-1"), **CREATE)
+        # The same tool call run again while it is queued does not create a second invoice
+        again = await create_invoice(tool_context=_context("call-1"), **CREATE)
+        key = fake.keys[0]
+        before = await get_write_status(key)
+        await outbox.wait(key, 2)
+        after = await get_write_status(key)
+        outbox.stop()
+        return text, again, before, after
+
+    fake = FakeBilly()
+    fake.delay = 0.5
+    completed = []
+    saved = billy.get_mcp_federation, billy.PREFETCH, billy.SPECULATIVE_TOOLS, billy.CACHE_WARMER
+    billy.get_mcp_federation = lambda: fake
+    billy.PREFETCH = billy.SPECULATIVE_TOOLS = billy.CACHE_WARMER = False
+    outbox_module._write_outbox = WriteOutbox(ack_timeout=0.1)
+    try:
+        text, again, before, after = asyncio.run(run())
+    finally:
+        billy.get_mcp_federation, billy.PREFETCH, billy.SPECULATIVE_TOOLS, billy.CACHE_WARMER = saved
+        outbox_module._write_outbox = None
+        # The tools registered above must not reach other tests
+        prefetch._prefetcher = speculation._speculative_dispatcher = None
+
+    assert "saved in the outbox" in text and fake.keys[0] in text
+    assert "saved in the outbox" in again and fake.keys[0] in again
+    assert "still" in before and "Invoice created successfully" in after
+    assert fake.calls.count("createInvoice") == 1 and fake.keys[0] is not None
+    assert completed == ["createInvoice"]
+
+
+def test_identical_tool_calls_are_separate_writes():
+    async def run():
+        outbox = _outbox(fake)
+        outbox_module._write_outbox = outbox
+        outbox.register("createInvoice")
+        # The hardcoded tools used when discovery fails take the outbox too
+        first, second = await asyncio.gather(
+            billy.create_invoice("customer-456", 500, tool_context=_context("call-1")),
+            billy.create_invoice("customer-456", 500, tool_context=_context("call-2")))
+        outbox.stop()
+        return first, second
+
+    fake = FakeBilly()
+    saved = billy.get_mcp_federation, billy.PREFETCH, billy.SPECULATIVE_TOOLS, billy.CACHE_WARMER
+    billy.get_mcp_federation = lambda: fake
+    billy.PREFETCH = billy.SPECULATIVE_TOOLS = billy.CACHE_WARMER = False
+    try:
+        first, second = asyncio.run(run())
+    finally:
+        billy.get_mcp_federation, billy.PREFETCH, billy.SPECULATIVE_TOOLS, billy.CACHE_WARMER = saved
+        outbox_module._write_outbox = None
+
+    assert "Invoice created successfully" in first and "Invoice created successfully" in second
+    assert len(fake.invoices) == 4 and fake.calls.count("createInvoice") == 2
+    assert len(set(fake.keys)) == 2 and None not in fake.keys
+
+
+if __name__ == "__main__":
+    test_lost_create_responses_are_reconciled_not_repeated()
+    test_lost_creates_that_cannot_be_checked_are_not_repeated()
+    test_new_records_must_match_the_contact_and_amount()
+    test_lost_creates_without_an_earlier_list_are_only_sent_again_if_nothing_matches()
+    test_undelivered_and_missing_writes_are_sent_again()
+    test_lost_updates_and_deletes_are_read_back_not_repeated()
+    test_writes_survive_a_restart()
+    test_agent_returns_before_slow_writes_are_confirmed()
+    test_identical_tool_calls_are_separate_writes()
+    print("✅ Writes go through the durable outbox")